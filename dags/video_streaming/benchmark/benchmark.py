@@ -4,12 +4,20 @@ import psycopg2
 import psycopg2.extras
 import json
 import csv
+import sys
 from pymongo import MongoClient, ASCENDING
 from pathlib import Path
-from data_generator import generate_data
+from data_generator import generate_data, read_json_records
 import os
 import plotly.graph_objects as go
 
+# Reuse the pipeline's binary COPY encoder
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from utils.pg_copy import BinaryCopyBuffer
+
+COPY_COLUMNS = ['id', 'name', 'age', 'city', 'hobbies']
+COPY_TYPES = ['integer', 'text', 'integer', 'text', 'text']
+
 
 def timed_execution(func, *args, **kwargs):
     """Helper to time execution of a function."""
@@ -19,7 +27,7 @@ def timed_execution(func, *args, **kwargs):
     return result, elapsed
 
 
-def run_benchmark(n: int):
+def run_benchmark(n: int, json_format: str = 'json'):
     logging.info(f"Starting benchmark for n={n}")
 
     # Directories
@@ -28,7 +36,7 @@ def run_benchmark(n: int):
     data_dir.mkdir(exist_ok=True)
 
     # Generate data
-    csv_path, json_path = generate_data(n, data_dir)
+    csv_path, json_path = generate_data(n, data_dir, json_format=json_format)
 
     # DB connections
     try:
@@ -125,12 +133,68 @@ def run_benchmark(n: int):
             'update': update_time
         }
 
+        # -------------------------
+        # PostgreSQL (RDBMS) - COPY text vs binary
+        # -------------------------
+        # Same rows, no indexes: the COPY time difference is the server-side parsing saved
+        # by binary COPY; encoding the binary payload is timed separately (client side)
+        logging.info("Starting PostgreSQL COPY format benchmark...")
+        with pg_conn.cursor() as cur:
+            for table in ('copy_text_table', 'copy_binary_table'):
+                cur.execute(f"DROP TABLE IF EXISTS {table}")
+                cur.execute(f"""
+                    CREATE TABLE {table} (
+                        id INTEGER NOT NULL,
+                        name TEXT NOT NULL,
+                        age INTEGER NOT NULL,
+                        city TEXT NOT NULL,
+                        hobbies TEXT NOT NULL
+                    )
+                """)
+            pg_conn.commit()
+
+        def copy_text_pg():
+            with pg_conn.cursor() as cur, open(csv_path, 'r', encoding='utf-8') as f:
+                cur.copy_expert(
+                    "COPY copy_text_table (id, name, age, city, hobbies) FROM STDIN WITH CSV HEADER",
+                    f
+                )
+                pg_conn.commit()
+
+        def encode_binary():
+            buffer = BinaryCopyBuffer('copy_binary_table', COPY_COLUMNS, COPY_TYPES)
+            with open(csv_path, 'r', newline='', encoding='utf-8') as f:
+                reader = csv.reader(f)
+                next(reader)
+                for row in reader:
+                    buffer.write(row)
+            return buffer
+
+        def copy_binary_pg(buffer):
+            with pg_conn.cursor() as cur:
+                buffer.flush(cur)
+                pg_conn.commit()
+
+        _, text_copy_time = timed_execution(copy_text_pg)
+        binary_buffer, encode_time = timed_execution(encode_binary)
+        _, binary_copy_time = timed_execution(copy_binary_pg, binary_buffer)
+
+        with pg_conn.cursor() as cur:
+            cur.execute("DROP TABLE copy_text_table")
+            cur.execute("DROP TABLE copy_binary_table")
+            pg_conn.commit()
+
+        results['RDBMS_COPY_FORMAT'] = {
+            'text_copy': text_copy_time,
+            'binary_encode': encode_time,
+            'binary_copy': binary_copy_time
+        }
+
         # -------------------------
         # PostgreSQL (RDBMS) - JSON
         # -------------------------
         logging.info("Starting PostgreSQL JSON benchmark...")
-        with open(json_path, 'r', encoding='utf-8') as f:
-            data_json = json.load(f)
+        data_json = read_json_records(json_path)
 
         with pg_conn.cursor() as cur:
             cur.execute("DROP TABLE IF EXISTS json_table")
@@ -349,12 +413,15 @@ def plot_results(results: dict):
     """Generate interactive bar charts with Plotly."""
     db_types = {
         "RDBMS": ["RDBMS_CSV", "RDBMS_JSON"],
-        "NoSQL": ["NoSQL_CSV", "NoSQL_JSON"]
+        "NoSQL": ["NoSQL_CSV", "NoSQL_JSON"],
+        "RDBMS COPY format": ["RDBMS_COPY_FORMAT"]
     }
 
     for db, keys in db_types.items():
         fig = go.Figure()
         for k in keys:
+            if k not in results:
+                continue
             fig.add_trace(go.Bar(
                 x=list(results[k].keys()),
                 y=list(results[k].values()),
@@ -375,5 +442,5 @@ def plot_results(results: dict):
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
-    res = run_benchmark(5000)
+    res = run_benchmark(5000, json_format=os.getenv("BENCHMARK_JSON_FORMAT", "json"))
     plot_results(res)
\ No newline at end of file
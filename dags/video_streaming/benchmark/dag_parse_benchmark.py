@@ -0,0 +1,76 @@
+"""
+Benchmark: cold parse time of dag.py, as the Airflow DAG processor sees it.
+
+Each repeat starts a fresh interpreter (the DAG processor parses files in child
+processes, so nothing the DAG file imports is cached between loops), imports Airflow
+and the operator modules every DAG shares, then times DagBag collecting the DAG file
+alone. Reports the median and best time and which heavy driver modules the parse
+pulled in.
+Run with the Python environment Airflow is installed in.
+
+Usage:
+    python dag_parse_benchmark.py --dag ../dag.py --repeats 7
+"""
+import argparse
+import json
+import logging
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+PIPELINE_ROOT = Path(__file__).resolve().parent.parent
+
+HEAVY_MODULES = ("psycopg2", "pymongo", "pandas", "numpy", "pyarrow")
+
+PARSE_SNIPPET = """
+import json, logging, sys, time
+logging.disable(logging.CRITICAL)
+from airflow.models.dagbag import DagBag
+from airflow.decorators import task_group
+from airflow.models.baseoperator import chain
+from airflow.operators.bash import BashOperator
+from airflow.operators.python import PythonOperator
+start = time.perf_counter()
+bag = DagBag(dag_folder=sys.argv[1], include_examples=False)
+elapsed = time.perf_counter() - start
+print(json.dumps({"seconds": elapsed, "errors": {k: str(v) for k, v in bag.import_errors.items()},
+                  "modules": [m for m in sys.argv[2:] if m in sys.modules]}))
+"""
+
+
+def parse_once(dag_path: Path) -> dict:
+    """Parse the DAG file in a fresh interpreter and return its timing record."""
+    out = subprocess.run([sys.executable, "-c", PARSE_SNIPPET, str(dag_path), *HEAVY_MODULES],
+                         capture_output=True, text=True, check=True)
+    record = json.loads(out.stdout.strip().splitlines()[-1])
+    if record["errors"]:
+        raise RuntimeError(f"DAG import errors: {record['errors']}")
+    return record
+
+
+def run_benchmark(dag_path: Path, repeats: int = 7) -> dict:
+    """Return median/best parse seconds and the heavy modules imported while parsing."""
+    records = [parse_once(dag_path) for _ in range(repeats)]
+    seconds = [r["seconds"] for r in records]
+    result = {
+        "median_seconds": statistics.median(seconds),
+        "best_seconds": min(seconds),
+        "modules": records[-1]["modules"],
+    }
+    logging.info(f"{dag_path.name}: median {result['median_seconds'] * 1000:.0f} ms, "
+                 f"best {result['best_seconds'] * 1000:.0f} ms over {repeats} cold parses; "
+                 f"heavy modules imported: {', '.join(result['modules']) or 'none'}")
+    return result
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dag", type=Path, default=PIPELINE_ROOT / "dag.py")
+    parser.add_argument("--repeats", type=int, default=7)
+    args = parser.parse_args()
+
+    if not args.dag.exists():
+        parser.error(f"DAG file not found: {args.dag}")
+    run_benchmark(args.dag.resolve(), args.repeats)
@@ -1,127 +1,169 @@
+from itertools import combinations
 from pathlib import Path
 import json
 import csv
-import random
+import io
 import logging
+import os
 
+import numpy as np
 
-def generate_data(n: int, data_dir: Path):
+# Records generated and written per batch
+CHUNK_SIZE = int(os.getenv('BENCHMARK_CHUNK_SIZE', '200000'))
+
+# Datos más diversos para pruebas realistas
+CITIES = [
+    'New York', 'Los Angeles', 'Chicago', 'Houston', 'Phoenix',
+    'Philadelphia', 'San Antonio', 'San Diego', 'Dallas', 'San Jose',
+    'Austin', 'Jacksonville', 'Fort Worth', 'Columbus', 'Charlotte'
+]
+
+HOBBIES_OPTIONS = [
+    'reading', 'sports', 'music', 'travel', 'cooking',
+    'photography', 'gaming', 'hiking', 'painting', 'dancing',
+    'yoga', 'cycling', 'swimming', 'gardening', 'writing'
+]
+
+FIRST_NAMES = [
+    'James', 'Mary', 'John', 'Patricia', 'Robert', 'Jennifer',
+    'Michael', 'Linda', 'William', 'Elizabeth', 'David', 'Barbara',
+    'Richard', 'Susan', 'Joseph', 'Jessica', 'Thomas', 'Sarah',
+    'Charles', 'Karen', 'Christopher', 'Nancy', 'Daniel', 'Lisa'
+]
+
+LAST_NAMES = [
+    'Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia',
+    'Miller', 'Davis', 'Rodriguez', 'Martinez', 'Hernandez',
+    'Lopez', 'Gonzalez', 'Wilson', 'Anderson', 'Thomas', 'Taylor'
+]
+
+# Edad con distribución más realista: 18-70, más peso entre 25-45, luego 20-50
+AGES = np.arange(18, 71)
+AGE_WEIGHTS = np.where((AGES >= 25) & (AGES <= 45), 3, np.where((AGES >= 20) & (AGES <= 50), 2, 1))
+
+# Personas mayores tienden a tener menos hobbies: 1..max(1, 6 - age // 15), so at most 5
+MAX_HOBBIES = 5
+
+
+def _csv_field(value: str) -> str:
+    """A value quoted the way csv.writer quotes it."""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow([value])
+    return buffer.getvalue().rstrip('\r\n')
+
+
+class _Vocabulary:
+    """
+    Every name and hobby set as ready-to-write CSV and JSON text, so a chunk of records is
+    assembled by array lookups. Hobby sets are all subsets of HOBBIES_OPTIONS of each size
+    (grouped by size), so picking a uniform index within a size group equals random.sample.
+    """
+
+    def __init__(self):
+        names = [f"{first} {last}" for first in FIRST_NAMES for last in LAST_NAMES]
+        self.names_csv = np.array([_csv_field(name) for name in names], dtype=object)
+        self.names_json = np.array([json.dumps(name) for name in names], dtype=object)
+        self.cities_csv = np.array([_csv_field(city) for city in CITIES], dtype=object)
+        self.cities_json = np.array([json.dumps(city) for city in CITIES], dtype=object)
+        hobby_sets = [list(c) for k in range(1, MAX_HOBBIES + 1) for c in combinations(HOBBIES_OPTIONS, k)]
+        self.hobbies_csv = np.array([_csv_field(','.join(h)) for h in hobby_sets], dtype=object)
+        self.hobbies_json = np.array([json.dumps(h) for h in hobby_sets], dtype=object)
+        sizes = np.array([len(list(combinations(HOBBIES_OPTIONS, k))) for k in range(1, MAX_HOBBIES + 1)])
+        # Index of the first set of each size (1-based sizes)
+        self.hobby_offsets = np.concatenate([[0, 0], np.cumsum(sizes)[:-1]])
+        self.hobby_counts = np.concatenate([[0], sizes])
+
+
+def _generate_chunk(rng: np.random.Generator, vocab: _Vocabulary, start: int, size: int) -> dict:
+    """One batch of records as column arrays (ids start at `start`)."""
+    ages = AGES[np.searchsorted(np.cumsum(AGE_WEIGHTS / AGE_WEIGHTS.sum()), rng.random(size), side='right')]
+    num_hobbies = rng.integers(1, np.maximum(1, 6 - ages // 15) + 1)
+    hobby_sets = vocab.hobby_offsets[num_hobbies] + (rng.random(size) * vocab.hobby_counts[num_hobbies]).astype(np.int64)
+    return {
+        'id': np.arange(start, start + size),
+        'name': rng.integers(0, len(vocab.names_csv), size),
+        'age': ages,
+        'city': rng.integers(0, len(CITIES), size),
+        'hobbies': hobby_sets,
+        'created_year': rng.integers(2020, 2025, size),
+        'active': rng.random(size) < 0.5,
+        'score': np.round(rng.uniform(1.0, 10.0, size), 2),
+    }
+
+
+def _csv_lines(vocab: _Vocabulary, chunk: dict) -> list:
+    """The chunk's records as CSV rows (same text csv.writer gives)."""
+    return [
+        f'{i},{name},{age},{city},{hobbies}\r\n'
+        for i, name, age, city, hobbies in zip(
+            chunk['id'].tolist(), vocab.names_csv[chunk['name']], chunk['age'].tolist(),
+            vocab.cities_csv[chunk['city']], vocab.hobbies_csv[chunk['hobbies']])
+    ]
+
+
+def _json_lines(vocab: _Vocabulary, chunk: dict) -> list:
+    """The chunk's records as compact JSON objects (same text json.dumps gives)."""
+    return [
+        f'{{"id": {i}, "name": {name}, "age": {age}, "city": {city}, "hobbies": {hobbies}, '
+        f'"metadata": {{"created_year": {year}, "active": {"true" if active else "false"}, "score": {score}}}}}'
+        for i, name, age, city, hobbies, year, active, score in zip(
+            chunk['id'].tolist(), vocab.names_json[chunk['name']], chunk['age'].tolist(),
+            vocab.cities_json[chunk['city']], vocab.hobbies_json[chunk['hobbies']],
+            chunk['created_year'].tolist(), chunk['active'].tolist(), chunk['score'].tolist())
+    ]
+
+
+def generate_data(n: int, data_dir: Path, seed: int = 42, json_format: str = 'json',
+                  chunk_size: int = CHUNK_SIZE):
     """
     Generate CSV and JSON files with n records.
     CSV: Flat with hobbies as comma-separated string.
-    JSON: With hobbies as list for nesting (mejor para MongoDB).
-    
-    Incluye más variedad en los datos para hacer pruebas más realistas.
+    JSON: With hobbies as list for nesting (mejor para MongoDB), plus a metadata object.
+    json_format='ndjson' writes one document per line (data.ndjson) instead of an array.
+
+    Both files hold the same records. Columns are drawn in batches from a seeded NumPy
+    generator (the same seed gives the same files) and written chunk by chunk.
     """
+    if json_format not in ('json', 'ndjson'):
+        raise ValueError(f"Unknown json_format {json_format!r}, expected 'json' or 'ndjson'")
     logging.info(f"Generating {n} records...")
-    
+
     csv_path = data_dir / 'data.csv'
-    json_path = data_dir / 'data.json'
-    
-    # Datos más diversos para pruebas realistas
-    cities = [
-        'New York', 'Los Angeles', 'Chicago', 'Houston', 'Phoenix',
-        'Philadelphia', 'San Antonio', 'San Diego', 'Dallas', 'San Jose',
-        'Austin', 'Jacksonville', 'Fort Worth', 'Columbus', 'Charlotte'
-    ]
-    
-    hobbies_options = [
-        'reading', 'sports', 'music', 'travel', 'cooking',
-        'photography', 'gaming', 'hiking', 'painting', 'dancing',
-        'yoga', 'cycling', 'swimming', 'gardening', 'writing'
-    ]
-    
-    first_names = [
-        'James', 'Mary', 'John', 'Patricia', 'Robert', 'Jennifer',
-        'Michael', 'Linda', 'William', 'Elizabeth', 'David', 'Barbara',
-        'Richard', 'Susan', 'Joseph', 'Jessica', 'Thomas', 'Sarah',
-        'Charles', 'Karen', 'Christopher', 'Nancy', 'Daniel', 'Lisa'
-    ]
-    
-    last_names = [
-        'Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia',
-        'Miller', 'Davis', 'Rodriguez', 'Martinez', 'Hernandez',
-        'Lopez', 'Gonzalez', 'Wilson', 'Anderson', 'Thomas', 'Taylor'
-    ]
-    
+    json_path = data_dir / f'data.{json_format}'
+    rng = np.random.default_rng(seed)
+    vocab = _Vocabulary()
+
     try:
-        # Generate CSV
-        with open(csv_path, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            writer.writerow(['id', 'name', 'age', 'city', 'hobbies'])
-            
-            for i in range(1, n + 1):
-                # Nombres más realistas
-                full_name = f"{random.choice(first_names)} {random.choice(last_names)}"
-                
-                # Edad con distribución más realista (más personas entre 25-45)
-                # Rango: 18-70 (53 valores)
-                age_range = list(range(18, 71))
-                # Crear pesos: menos peso a extremos, más peso al centro
-                weights = []
-                for age in age_range:
-                    if 25 <= age <= 45:
-                        weights.append(3)  # Más probable
-                    elif 20 <= age <= 50:
-                        weights.append(2)  # Probable
-                    else:
-                        weights.append(1)  # Menos probable
-                
-                age = random.choices(age_range, weights=weights, k=1)[0]
-                
-                # Hobbies: personas mayores tienden a tener menos hobbies
-                num_hobbies = random.randint(1, max(1, 6 - (age // 15)))
-                hobbies_str = ','.join(random.sample(hobbies_options, num_hobbies))
-                
-                city = random.choice(cities)
-                
-                writer.writerow([i, full_name, age, city, hobbies_str])
-        
-        # Generate JSON
-        data = []
-        for i in range(1, n + 1):
-            full_name = f"{random.choice(first_names)} {random.choice(last_names)}"
-            
-            # Misma distribución de edad
-            age_range = list(range(18, 71))
-            weights = []
-            for age in age_range:
-                if 25 <= age <= 45:
-                    weights.append(3)
-                elif 20 <= age <= 50:
-                    weights.append(2)
+        with open(csv_path, 'w', newline='', encoding='utf-8') as csv_file, \
+                open(json_path, 'w', encoding='utf-8') as json_file:
+            csv.writer(csv_file).writerow(['id', 'name', 'age', 'city', 'hobbies'])
+            if json_format == 'json':
+                json_file.write('[')
+
+            for start in range(1, n + 1, chunk_size):
+                chunk = _generate_chunk(rng, vocab, start, min(chunk_size, n + 1 - start))
+                csv_file.write(''.join(_csv_lines(vocab, chunk)))
+                lines = _json_lines(vocab, chunk)
+                if json_format == 'json':
+                    json_file.write(('\n' if start == 1 else ',\n') + ',\n'.join(lines))
                 else:
-                    weights.append(1)
-            
-            age = random.choices(age_range, weights=weights, k=1)[0]
-            
-            num_hobbies = random.randint(1, max(1, 6 - (age // 15)))
-            hobbies_list = random.sample(hobbies_options, num_hobbies)
-            
-            city = random.choice(cities)
-            
-            # JSON con estructura más rica (ventaja para NoSQL)
-            doc = {
-                'id': i,
-                'name': full_name,
-                'age': age,
-                'city': city,
-                'hobbies': hobbies_list,  # Array nativo
-                'metadata': {  # Objeto anidado adicional
-                    'created_year': random.randint(2020, 2024),
-                    'active': random.choice([True, False]),
-                    'score': round(random.uniform(1.0, 10.0), 2)
-                }
-            }
-            data.append(doc)
-        
-        with open(json_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-        
+                    json_file.write('\n'.join(lines) + '\n')
+
+            if json_format == 'json':
+                json_file.write('\n]\n')
+
         logging.info("Data generation completed successfully.")
-        
+
     except Exception as e:
         logging.error(f"Error generating data: {e}")
         raise
-    
-    return csv_path, json_path
\ No newline at end of file
+
+    return csv_path, json_path
+
+
+def read_json_records(json_path: Path) -> list:
+    """Load the generated documents from a JSON array or NDJSON file."""
+    with open(json_path, 'r', encoding='utf-8') as f:
+        if json_path.suffix == '.ndjson':
+            return [json.loads(line) for line in f if line.strip()]
+        return json.load(f)
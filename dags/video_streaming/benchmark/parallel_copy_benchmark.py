@@ -0,0 +1,134 @@
+"""
+Benchmark: chunked parallel COPY of viewing_sessions.csv as the worker count scales.
+
+Each run recreates an unlogged staging table and loads the whole file with
+copy_csv_chunks_parallel (the same routine load_csvs_to_postgres uses).
+Workers check connections out of the shared pool, which is sized from the largest
+worker count (or POSTGRES_POOL_MAX, whichever is larger).
+
+--generate N first writes a seeded synthetic dataset with N sessions (utils/synthetic_data.py)
+and benchmarks its viewing_sessions.csv, so the load can be measured at any scale.
+
+Usage:
+    python parallel_copy_benchmark.py --csv ../data/raw/viewing_sessions.csv --workers 1 2 4 8
+    python parallel_copy_benchmark.py --generate 50000000 --workers 1 2 4 8 16
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+import plotly.graph_objects as go
+
+# Reuse the pipeline's connection and COPY helpers
+PIPELINE_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PIPELINE_ROOT))
+
+from utils.db_connections import POSTGRES_POOL_MAX, get_postgres_connection, get_postgres_pool, postgres_connection
+from utils.pg_copy import copy_csv_chunks_parallel
+from utils.synthetic_data import generate_dataset
+
+BENCH_TABLE = "bench_viewing_sessions"
+COLUMNS = ("session_id, user_id, content_id, watch_date, watch_duration_minutes, "
+           "completion_percentage, device_type, quality_level")
+
+
+def reset_table():
+    """Recreate the unlogged benchmark staging table."""
+    conn = get_postgres_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(f"DROP TABLE IF EXISTS {BENCH_TABLE}")
+            cur.execute(f"""
+                CREATE UNLOGGED TABLE {BENCH_TABLE} (
+                    session_id VARCHAR(50),
+                    user_id VARCHAR(50),
+                    content_id VARCHAR(50),
+                    watch_date DATE,
+                    watch_duration_minutes INTEGER,
+                    completion_percentage FLOAT,
+                    device_type VARCHAR(50),
+                    quality_level VARCHAR(20)
+                )
+            """)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def run_benchmark(csv_path: Path, worker_counts, repeats: int = 1) -> dict:
+    """Return {workers: best load time in seconds}."""
+    size_mb = csv_path.stat().st_size / 1024 / 1024
+    # Every worker gets a connection without waiting, so timings measure COPY and not the pool
+    get_postgres_pool(maxconn=max([POSTGRES_POOL_MAX, *worker_counts]))
+    results = {}
+    for workers in worker_counts:
+        best = None
+        for _ in range(repeats):
+            reset_table()
+            start = time.perf_counter()
+            rows = copy_csv_chunks_parallel(csv_path, BENCH_TABLE, COLUMNS, workers, postgres_connection)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        results[workers] = best
+        logging.info(f"workers={workers}: {rows} rows in {best:.2f}s "
+                     f"({rows / best:,.0f} rows/sec, {size_mb / best:.1f} MB/sec)")
+
+    conn = get_postgres_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(f"DROP TABLE IF EXISTS {BENCH_TABLE}")
+        conn.commit()
+    finally:
+        conn.close()
+    return results
+
+
+def plot_results(results: dict):
+    """Load time and speedup per worker count."""
+    workers = list(results.keys())
+    baseline = results[workers[0]]
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        x=[str(w) for w in workers],
+        y=list(results.values()),
+        text=[f"{t:.2f} s ({baseline / t:.1f}x)" for t in results.values()],
+        textposition="auto",
+        name="Load time"
+    ))
+    fig.update_layout(
+        title="Parallel COPY - viewing_sessions load time by worker count",
+        xaxis_title="Workers",
+        yaxis_title="Time (seconds)",
+        template="plotly_dark",
+        height=600
+    )
+    fig.show()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", type=Path,
+                        default=PIPELINE_ROOT / os.getenv("RAW_DATA_DIR", "data/raw") / "viewing_sessions.csv")
+    parser.add_argument("--generate", type=int, metavar="SESSIONS",
+                        help="generate a synthetic dataset with this many sessions into --synthetic-dir first")
+    parser.add_argument("--synthetic-dir", type=Path, default=PIPELINE_ROOT / "data" / "synthetic")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--repeats", type=int, default=1)
+    parser.add_argument("--no-plot", action="store_true")
+    args = parser.parse_args()
+
+    if args.generate:
+        # One user per 50 sessions, roughly the sample data's ratio
+        paths = generate_dataset(args.synthetic_dir, users=max(1, args.generate // 50), movies=2000, series=1000,
+                                 sessions=args.generate, seed=args.seed, logger=logging.getLogger(__name__))
+        args.csv = paths["viewing_sessions.csv"]
+    if not args.csv.exists():
+        parser.error(f"CSV not found: {args.csv}")
+    res = run_benchmark(args.csv, args.workers, args.repeats)
+    if not args.no_plot:
+        plot_results(res)
@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 
+import os
 import sys
 from pathlib import Path
 
@@ -13,14 +14,40 @@ import pendulum
 from airflow import DAG
 from airflow.operators.python import PythonOperator
 from airflow.operators.bash import BashOperator
+from airflow.models.baseoperator import chain
+from airflow.decorators import task_group
+
+from utils.task_callables import lazy_callable
+
+# Stage callables, imported only when their task runs: parsing this file stays free of
+# the scripts and their database drivers
+create_postgres_tables_main = lazy_callable("scripts.create_postgres_tables:main")
+create_mongodb_collections_main = lazy_callable("scripts.create_mongodb_collections:main")
+load_csvs_to_postgres_main = lazy_callable("scripts.load_csvs_to_postgres:main")
+load_json_to_mongo_main = lazy_callable("scripts.load_json_to_mongo:main")
+extract_mongo_to_csv_main = lazy_callable("scripts.extract_mongo_to_csv:extract_and_normalize")
+prepare_normalized_load_main = lazy_callable("scripts.load_normalized_jsons_to_postgres:prepare_load")
+stage_normalized_table_main = lazy_callable("scripts.load_normalized_jsons_to_postgres:stage_table")
+publish_normalized_load_main = lazy_callable("scripts.load_normalized_jsons_to_postgres:publish_load")
+stream_mongo_to_postgres_main = lazy_callable("scripts.stream_mongo_to_postgres:main")
+incremental_content_sync_main = lazy_callable("scripts.incremental_content_sync:main")
+refresh_rollups_main = lazy_callable("scripts.refresh_rollups:main")
+refresh_mongo_summaries_main = lazy_callable("scripts.refresh_mongo_summaries:main")
+export_analytical_tables_main = lazy_callable("scripts.export_analytical_tables:main")
+
+# Content branch mode: 'csv' (extract to data/processed/, then COPY),
+# 'stream' (normalize Mongo documents straight into Postgres in one task) or
+# 'incremental' (upsert only documents changed since the last watermark)
+CONTENT_LOAD_MODE = os.getenv('CONTENT_LOAD_MODE', 'csv')
+
+# The Mongo branch fans out per collection (dynamic task mapping): each collection is
+# loaded, and in csv mode extracted, by its own task instances. Each load_json_to_mongo
+# instance still parses all of content.json (skipping the other arrays), and the tasks hand
+# files over through data/: the extract parts (data/processed/parts/) that prepare_normalized_load
+# merges and the CSVs stage_normalized_table reads. They share it through the dags bind mount in
+# docker-compose.yaml; with workers on several hosts, data/ must be a shared volume as well.
+CONTENT_COLLECTIONS = ['movies', 'series']
 
-# Import scripts
-from scripts.create_postgres_tables import main as create_postgres_tables_main
-from scripts.create_mongodb_collections import main as create_mongodb_collections_main
-from scripts.load_csvs_to_postgres import main as load_csvs_to_postgres_main
-from scripts.load_json_to_mongo import main as load_json_to_mongo_main
-from scripts.extract_mongo_to_csv import extract_and_normalize as extract_mongo_to_csv_main
-from scripts.load_normalized_jsons_to_postgres import main as load_normalized_jsons_to_postgres_main
 default_args = {
     'owner': 'data_engineer',
     'depends_on_past': False,
@@ -61,27 +88,100 @@ load_csvs_task = PythonOperator(
     dag=dag,
 )
 
-# Task 4: Load JSON to Mongo
-load_json_task = PythonOperator(
-    task_id='load_json_to_mongo',
-    python_callable=load_json_to_mongo_main,
+# Task 3b: Refresh the reporting rollups for the months the load touched
+refresh_rollups_task = PythonOperator(
+    task_id='refresh_rollups',
+    python_callable=refresh_rollups_main,
     dag=dag,
 )
 
-# Task 5: Extract MongoDB to CSV
-extract_mongo_task = PythonOperator(
-    task_id='extract_mongo_to_csv',
-    python_callable=extract_mongo_to_csv_main,
+# Task 4: Load JSON to Mongo, one pipeline per collection.
+# In csv mode the pipeline also extracts its collection to part CSVs (Task 5)
+@task_group(group_id='collection_pipeline', dag=dag)
+def collection_pipeline(collection):
+    load_json_task = PythonOperator(
+        task_id='load_json_to_mongo',
+        python_callable=load_json_to_mongo_main,
+        op_kwargs={'collections': [collection]},
+        dag=dag,
+    )
+    if CONTENT_LOAD_MODE not in ('stream', 'incremental'):
+        extract_mongo_task = PythonOperator(
+            task_id='extract_mongo_to_csv',
+            python_callable=extract_mongo_to_csv_main,
+            op_kwargs={'collections': [collection]},
+            dag=dag,
+        )
+        load_json_task >> extract_mongo_task
+
+collection_tasks = collection_pipeline.expand(collection=CONTENT_COLLECTIONS)
+load_json_task = dag.get_task('collection_pipeline.load_json_to_mongo')
+
+# Task 4b: Merge changed documents into the Mongo summary collections
+refresh_mongo_summaries_task = PythonOperator(
+    task_id='refresh_mongo_summaries',
+    python_callable=refresh_mongo_summaries_main,
     dag=dag,
 )
 
-# Task 6: Load Normalized JSONs to Postgres
-load_normalized_json_task = PythonOperator(
-    task_id='load_normalized_jsons_to_postgres',
-    python_callable=load_normalized_jsons_to_postgres_main,
+if CONTENT_LOAD_MODE == 'stream':
+    # Task 5: Stream MongoDB straight into the normalized Postgres tables
+    stream_mongo_task = PythonOperator(
+        task_id='stream_mongo_to_postgres',
+        python_callable=stream_mongo_to_postgres_main,
+        dag=dag,
+    )
+    content_chain = [stream_mongo_task]
+elif CONTENT_LOAD_MODE == 'incremental':
+    # Task 5: Upsert new/changed MongoDB documents into the normalized Postgres tables
+    incremental_sync_task = PythonOperator(
+        task_id='incremental_content_sync',
+        python_callable=incremental_content_sync_main,
+        dag=dag,
+    )
+    content_chain = [incremental_sync_task]
+else:
+    # Task 6: Join the collection pipelines: merge their parts and prepare the staging schema
+    prepare_normalized_task = PythonOperator(
+        task_id='prepare_normalized_load',
+        python_callable=prepare_normalized_load_main,
+        dag=dag,
+    )
+
+    # Task 6b: COPY each normalized table into its staged table, one mapped task per table
+    stage_normalized_task = PythonOperator.partial(
+        task_id='stage_normalized_table',
+        python_callable=stage_normalized_table_main,
+        dag=dag,
+    ).expand(op_kwargs=prepare_normalized_task.output)
+
+    # Task 6c: Rebuild the staged constraints and publish all tables at once
+    publish_normalized_task = PythonOperator(
+        task_id='publish_normalized_load',
+        python_callable=publish_normalized_load_main,
+        op_kwargs={
+            'ddl': prepare_normalized_task.output['ddl'],
+            'fingerprints': prepare_normalized_task.output['fingerprints'],
+            'staged': stage_normalized_task.output,
+            'quarantines': prepare_normalized_task.output['quarantines'],
+        },
+        dag=dag,
+    )
+    content_chain = [prepare_normalized_task, stage_normalized_task, publish_normalized_task]
+
+# Task 7: Export the analytical tables to columnar files for the dashboard and notebooks
+export_task = PythonOperator(
+    task_id='export_analytical_tables',
+    python_callable=export_analytical_tables_main,
+    # Runs when the normalized load was skipped because nothing changed
+    trigger_rule='none_failed',
     dag=dag,
 )
 
 # Dependencies: Parallel creation, then parallel loads, then extract
-create_postgres_task >> load_csvs_task
-create_mongo_task >> load_json_task >> extract_mongo_task >> load_normalized_json_task
\ No newline at end of file
+create_postgres_task >> load_csvs_task >> refresh_rollups_task
+# The content branch must not run alongside create_postgres_tables' DDL
+create_postgres_task >> content_chain[0]
+chain(create_mongo_task, collection_tasks, *content_chain)
+load_json_task >> refresh_mongo_summaries_task
+[refresh_rollups_task, content_chain[-1]] >> export_task
\ No newline at end of file
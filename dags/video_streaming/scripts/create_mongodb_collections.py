@@ -17,10 +17,12 @@ sys.path.insert(0, str(PROJECT_ROOT))
 # Now you can import from utils
 from utils.db_connections import get_mongo_client
 from utils.logger import setup_logger
+from utils.metrics import instrumented
 
 from pymongo import MongoClient
 from pymongo.errors import OperationFailure
 
+@instrumented("create_mongodb_collections")
 def main():
     logger = setup_logger(__name__, log_file=PROJECT_ROOT / "logs" / "create_collections.log")
     
@@ -56,9 +58,6 @@ def main():
     except Exception as e:
         logger.error(f"Error creating collections: {e}")
         sys.exit(1)
-    finally:
-        if 'client' in locals():
-            client.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
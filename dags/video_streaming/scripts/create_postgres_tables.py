@@ -15,18 +15,22 @@ sys.path.insert(0, str(PROJECT_ROOT))
 # Now you can import from utils
 from utils.db_connections import get_postgres_connection
 from utils.logger import setup_logger
+from utils.metrics import instrumented
 
 import psycopg2
 
 # SQL directory
 SQL_DIR = PROJECT_ROOT / "sql"
 
+@instrumented("create_postgres_tables")
 def main():
     logger = setup_logger(__name__, log_file=PROJECT_ROOT / "logs" / "create_tables.log")
     
     try:
         conn = get_postgres_connection()
         cursor = conn.cursor()
+        # Keep the "already exists, skipping" notices of IF NOT EXISTS out of the log
+        cursor.execute("SET client_min_messages = warning")
         
         # List SQL files for table creation
         sql_files = sorted(SQL_DIR.glob("create_*.sql"))
@@ -38,6 +42,10 @@ def main():
             with open(sql_file, 'r') as f:
                 sql_content = f.read()
             cursor.execute(sql_content)
+            # Migrations in the SQL files report what they changed with RAISE WARNING
+            for notice in conn.notices:
+                logger.warning(notice.strip().split(':  ', 1)[-1])
+            del conn.notices[:]
             logger.info(f"Successfully executed: {sql_file.name}")
         
         conn.commit()
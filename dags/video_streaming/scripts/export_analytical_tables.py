@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Script to export the analytical tables to compressed columnar files in data/exports/
+for the Tableau dashboard and the notebooks.
+Rows are streamed through a named (server-side) cursor EXPORT_ITERSIZE rows at a time and
+written as Parquet row groups of EXPORT_ROW_GROUP_ROWS rows (EXPORT_FORMAT=arrow writes Arrow
+IPC files instead), so memory stays bounded by one row group however large the table is.
+Run via Airflow: Automated and scheduled via DAG.
+Best practices: Error handling, structured logging, modular connections, pathlib for paths.
+"""
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, List, Sequence
+
+# Add project root to sys.path for module imports
+SCRIPT_PATH = Path(__file__).resolve()
+PROJECT_ROOT = SCRIPT_PATH.parent.parent  # scripts -> video_streaming_pipeline
+sys.path.insert(0, str(PROJECT_ROOT))
+
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+
+from utils.db_connections import postgres_connection
+from utils.logger import setup_logger
+from utils.metrics import count, instrumented, span
+
+# Project root for pathlib
+DATA_EXPORT_DIR = PROJECT_ROOT / "data" / "exports"
+
+# Export settings
+EXPORT_TABLES = [t.strip() for t in os.getenv(
+    'EXPORT_TABLES',
+    'users,viewing_sessions,content,movie_details,series_details,content_genres,series_episodes,'
+    'rollup_top_content_by_country,rollup_retention_by_subscription'
+).split(',') if t.strip()]
+EXPORT_ITERSIZE = int(os.getenv('EXPORT_ITERSIZE', '50000'))
+EXPORT_ROW_GROUP_ROWS = int(os.getenv('EXPORT_ROW_GROUP_ROWS', '500000'))
+EXPORT_FORMAT = os.getenv('EXPORT_FORMAT', 'parquet').lower()
+EXPORT_COMPRESSION = os.getenv('EXPORT_COMPRESSION', 'zstd')
+
+# PostgreSQL type OIDs -> Arrow types (anything else is exported as text)
+PG_ARROW_TYPES = {
+    16: pa.bool_(),
+    20: pa.int64(),
+    21: pa.int16(),
+    23: pa.int32(),
+    700: pa.float32(),
+    701: pa.float64(),
+    1082: pa.date32(),
+    1114: pa.timestamp('us'),
+    1184: pa.timestamp('us', tz='UTC'),
+}
+PG_NUMERIC_OID = 1700
+
+def arrow_schema(description) -> pa.Schema:
+    """Arrow schema for a cursor description; numeric keeps its declared precision and scale."""
+    fields = []
+    for column in description:
+        if column.type_code == PG_NUMERIC_OID:
+            if column.precision and column.scale is not None and column.precision <= 38:
+                arrow_type = pa.decimal128(column.precision, column.scale)
+            else:
+                arrow_type = pa.float64()
+        else:
+            arrow_type = PG_ARROW_TYPES.get(column.type_code, pa.string())
+        fields.append(pa.field(column.name, arrow_type))
+    return pa.schema(fields)
+
+def rows_to_batch(rows: List[Sequence[Any]], schema: pa.Schema) -> pa.RecordBatch:
+    columns = list(zip(*rows)) if rows else [[] for _ in schema]
+    arrays = []
+    for values, field in zip(columns, schema):
+        if pa.types.is_floating(field.type):
+            values = [None if v is None else float(v) for v in values]
+        elif pa.types.is_string(field.type):
+            values = [None if v is None else str(v) for v in values]
+        arrays.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+class ColumnarWriter:
+    """Writes record batches to a Parquet or Arrow IPC file, one row group per flush."""
+
+    def __init__(self, path: Path, schema: pa.Schema, file_format: str = EXPORT_FORMAT,
+                 compression: str = EXPORT_COMPRESSION):
+        self.schema = schema
+        self.format = file_format
+        if file_format == 'arrow':
+            options = ipc.IpcWriteOptions(compression=compression if compression in ('zstd', 'lz4') else None)
+            self._writer = ipc.new_file(str(path), schema, options=options)
+        else:
+            self._writer = pq.ParquetWriter(str(path), schema, compression=compression)
+
+    def write_row_group(self, batches: List[pa.RecordBatch]) -> None:
+        table = pa.Table.from_batches(batches, schema=self.schema)
+        if self.format == 'arrow':
+            self._writer.write_table(table)
+        else:
+            self._writer.write_table(table, row_group_size=table.num_rows)
+
+    def close(self) -> None:
+        self._writer.close()
+
+def export_query(sql: str, path: Path, name: str, logger, itersize: int = EXPORT_ITERSIZE,
+                 row_group_rows: int = EXPORT_ROW_GROUP_ROWS) -> int:
+    """Stream a query into a columnar file through a server-side cursor. Returns rows written."""
+    tmp_path = path.with_name(path.name + ".tmp")
+    rows_written = 0
+    start = time.perf_counter()
+    with postgres_connection() as conn:
+        # Named cursors only live inside a transaction; fetches are FETCH FORWARD itersize
+        with conn.cursor(name=f"export_{name}") as cursor:
+            cursor.itersize = itersize
+            cursor.execute(sql)
+            writer = None
+            batches: List[pa.RecordBatch] = []
+            pending = 0
+            try:
+                while True:
+                    with span("fetch"):
+                        rows = cursor.fetchmany(itersize)
+                    if writer is None:
+                        # The description is only available after the first fetch
+                        schema = arrow_schema(cursor.description)
+                        writer = ColumnarWriter(tmp_path, schema)
+                    if rows:
+                        with span("convert"):
+                            batches.append(rows_to_batch(rows, schema))
+                        pending += len(rows)
+                    if batches and (pending >= row_group_rows or not rows):
+                        with span("write"):
+                            writer.write_row_group(batches)
+                        rows_written += pending
+                        batches, pending = [], 0
+                    if not rows:
+                        break
+                writer.close()
+            except BaseException:
+                if writer is not None:
+                    writer.close()
+                tmp_path.unlink(missing_ok=True)
+                raise
+        conn.commit()
+    os.replace(tmp_path, path)
+
+    elapsed = time.perf_counter() - start
+    count("rows", rows_written)
+    count("bytes", path.stat().st_size)
+    size_mb = path.stat().st_size / 1024 / 1024
+    logger.info(f"Exported {rows_written} rows to {path.name} ({size_mb:.1f} MB) in {elapsed:.2f}s "
+                f"({rows_written / max(elapsed, 1e-9):,.0f} rows/sec)")
+    return rows_written
+
+@instrumented("export_analytical_tables")
+def main():
+    logger = setup_logger(__name__, log_file=PROJECT_ROOT / "logs" / "export_analytical_tables.log")
+
+    # Ensure logs and export dirs exist
+    (PROJECT_ROOT / "logs").mkdir(exist_ok=True)
+    DATA_EXPORT_DIR.mkdir(parents=True, exist_ok=True)
+
+    try:
+        extension = 'arrow' if EXPORT_FORMAT == 'arrow' else 'parquet'
+        with postgres_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT t FROM unnest(%s::text[]) AS t WHERE to_regclass(t) IS NOT NULL", (EXPORT_TABLES,))
+            tables = [row[0] for row in cursor.fetchall()]
+            cursor.close()
+        for table in EXPORT_TABLES:
+            if table not in tables:
+                logger.warning(f"Table {table} does not exist, skipping export")
+                continue
+            export_query(f"SELECT * FROM {table}", DATA_EXPORT_DIR / f"{table}.{extension}", table, logger)
+        logger.info("Analytical table export completed")
+
+    except Exception as e:
+        logger.error(f"Error exporting analytical tables: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,3 @@
-
 #!/usr/bin/env python3
 """
 Script to extract data from MongoDB (movies and series collections),
@@ -10,14 +9,25 @@ Normalized tables:
 - content_genres.csv: content_id, genre
 - series_episodes.csv: content_id, season, episode_count
 
+Documents are read through batched cursors (projected to the normalized fields only)
+and streamed through a generator pipeline, so memory stays bounded by the cursor
+batch size instead of the collection size.
+
+extract_and_normalize(collections=[...]) extracts only some collections into
+data/processed/parts/<collection>/, so the DAG can run one task per collection;
+merge_normalized_parts() then concatenates the parts into data/processed/.
+
 Run via Airflow: Can be orchestrated in DAG.
 Best practices: Error handling, structured logging, modular connections, pathlib for paths.
 """
 import csv
 import os
+import shutil
 import sys
+import time
+from contextlib import ExitStack
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
 # Add project root to sys.path for module imports
 SCRIPT_PATH = Path(__file__).resolve()
@@ -26,117 +36,277 @@ sys.path.insert(0, str(PROJECT_ROOT))
 
 # Now you can import from utils
 from utils.db_connections import get_mongo_client
-from utils.logger import setup_logger
+from utils.logger import log_rate_limited, setup_logger
+from utils.metrics import count, instrumented, span, timed_iter
 
 from pymongo import MongoClient
 
 # Project root for pathlib
 PROJECT_ROOT = Path(__file__).parent.parent
 DATA_PROCESSED_DIR = PROJECT_ROOT / "data" / "processed"
+DATA_PARTS_DIR = DATA_PROCESSED_DIR / "parts"
 LOGS_DIR = PROJECT_ROOT / "logs"
 
-def extract_and_normalize() -> None:
+# Cursor batch size and progress reporting interval (in documents)
+MONGO_BATCH_SIZE = int(os.getenv('MONGO_BATCH_SIZE', '1000'))
+PROGRESS_EVERY = int(os.getenv('EXTRACT_PROGRESS_EVERY', '10000'))
+
+# Normalized tables: table name -> CSV header (column order)
+NORMALIZED_TABLES: Dict[str, List[str]] = {
+    'content': ['content_id', 'title', 'type', 'rating', 'production_budget'],
+    'movie_details': ['content_id', 'duration_minutes', 'release_year', 'views_count'],
+    'series_details': ['content_id', 'seasons', 'avg_episode_duration', 'total_views'],
+    'content_genres': ['content_id', 'genre'],
+    'series_episodes': ['content_id', 'season', 'episode_count'],
+}
+
+# Projections: fetch only the fields that end up in the normalized tables
+MOVIE_PROJECTION = {
+    '_id': 0, 'content_id': 1, 'title': 1, 'rating': 1, 'production_budget': 1, 'genre': 1,
+    'duration_minutes': 1, 'release_year': 1, 'views_count': 1,
+}
+SERIES_PROJECTION = {
+    '_id': 0, 'content_id': 1, 'title': 1, 'rating': 1, 'production_budget': 1, 'genre': 1,
+    'seasons': 1, 'avg_episode_duration': 1, 'total_views': 1, 'episodes_per_season': 1,
+}
+
+NormalizedRow = Tuple[str, List[Any]]
+
+
+def normalize_movie(movie: Dict[str, Any]) -> Iterator[NormalizedRow]:
+    """Yield (table, row) pairs for a single movie document."""
+    content_id = movie['content_id']
+    yield 'content', [
+        content_id,
+        movie['title'],
+        'movie',
+        movie['rating'],
+        movie['production_budget']
+    ]
+    yield 'movie_details', [
+        content_id,
+        movie['duration_minutes'],
+        movie['release_year'],
+        movie['views_count']
+    ]
+    for genre in movie.get('genre', []):
+        yield 'content_genres', [content_id, genre]
+
+
+def normalize_series(ser: Dict[str, Any], logger) -> Iterator[NormalizedRow]:
+    """Yield (table, row) pairs for a single series document."""
+    content_id = ser['content_id']
+    yield 'content', [
+        content_id,
+        ser['title'],
+        'series',
+        ser['rating'],
+        ser['production_budget']
+    ]
+    yield 'series_details', [
+        content_id,
+        ser['seasons'],
+        ser['avg_episode_duration'],
+        ser['total_views']
+    ]
+    for genre in ser.get('genre', []):
+        yield 'content_genres', [content_id, genre]
+    episodes_per_season = ser.get('episodes_per_season', [])
+    if len(episodes_per_season) != ser['seasons']:
+        log_rate_limited(logger, "seasons_mismatch", f"Mismatch in seasons and episodes list for {content_id}")
+    for season_num, ep_count in enumerate(episodes_per_season, start=1):
+        yield 'series_episodes', [content_id, season_num, ep_count]
+
+
+# Collection name -> (projection, normalizer)
+COLLECTIONS: Dict[str, Tuple[Dict[str, int], Callable[..., Iterator[NormalizedRow]]]] = {
+    'movies': (MOVIE_PROJECTION, normalize_movie),
+    'series': (SERIES_PROJECTION, normalize_series),
+}
+
+
+def iter_normalized_rows(db, logger, collections: Iterable[str] = ('movies', 'series'),
+                         batch_size: int = MONGO_BATCH_SIZE,
+                         queries: Optional[Dict[str, Dict[str, Any]]] = None,
+                         on_document: Optional[Callable[[str, Dict[str, Any]], None]] = None
+                         ) -> Iterator[NormalizedRow]:
+    """
+    Stream (table, row) pairs from the given collections.
+    Each document is normalized as soon as its cursor batch arrives.
+    queries optionally filters each collection; on_document(collection, doc) is called
+    for every document, which then also carries its _id and updated_at fields.
+    """
+    for collection in collections:
+        projection, normalize = COLLECTIONS[collection]
+        if on_document:
+            projection = {**projection, '_id': 1, 'updated_at': 1}
+        query = (queries or {}).get(collection, {})
+        cursor = db[collection].find(query, projection, batch_size=batch_size)
+        try:
+            for doc in timed_iter(cursor, "extract"):
+                if on_document:
+                    on_document(collection, doc)
+                # Only the series normalizer has data problems to report
+                yield from normalize(doc, logger) if normalize is normalize_series else normalize(doc)
+        finally:
+            cursor.close()
+
+
+class NormalizedCsvWriter:
+    """
+    One CSV writer per normalized table, opened on the table's first row.
+    Rows go to a temporary file that is moved into place on close().
+    """
+
+    def __init__(self, output_dir: Path):
+        self.output_dir = output_dir
+        self.row_counts: Dict[str, int] = {}
+        self._writers: Dict[str, Any] = {}
+        self._stack = ExitStack()
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+    def write(self, table: str, row: List[Any]) -> None:
+        writer = self._writers.get(table)
+        if writer is None:
+            tmp_path = self.output_dir / f"{table}.csv.tmp"
+            f = self._stack.enter_context(open(tmp_path, 'w', newline='', encoding='utf-8'))
+            writer = csv.writer(f)
+            writer.writerow(NORMALIZED_TABLES[table])
+            self._writers[table] = writer
+            self.row_counts[table] = 0
+        writer.writerow(row)
+        self.row_counts[table] += 1
+
+    def close(self, logger) -> Dict[str, int]:
+        """Close all files, move them into place and return rows written per table."""
+        self._stack.close()
+        for table in NORMALIZED_TABLES:
+            if table not in self.row_counts:
+                logger.info(f"No data for {table}.csv, skipping")
+                continue
+            path = self.output_dir / f"{table}.csv"
+            os.replace(self.output_dir / f"{table}.csv.tmp", path)
+            logger.info(f"Wrote {self.row_counts[table]} rows to {path}")
+        return self.row_counts
+
+    def abort(self) -> None:
+        """Close all files and discard the temporary output."""
+        self._stack.close()
+        for table in self.row_counts:
+            (self.output_dir / f"{table}.csv.tmp").unlink(missing_ok=True)
+
+
+def write_normalized_csvs(rows: Iterable[NormalizedRow], output_dir: Path, logger) -> Dict[str, int]:
+    """
+    Write streamed (table, row) pairs to one CSV per normalized table.
+    Returns the number of rows written per table.
+    """
+    writer = NormalizedCsvWriter(output_dir)
+    docs = 0
+    total_rows = 0
+    start = time.perf_counter()
+
+    try:
+        for table, row in rows:
+            writer.write(table, row)
+            total_rows += 1
+
+            # Every document yields exactly one content row
+            if table == 'content':
+                docs += 1
+                if docs % PROGRESS_EVERY == 0:
+                    elapsed = time.perf_counter() - start
+                    logger.info(f"Processed {docs} documents, {total_rows} rows "
+                                f"({total_rows / elapsed:,.0f} rows/sec)")
+    except BaseException:
+        writer.abort()
+        raise
+    with span("close"):
+        row_counts = writer.close(logger)
+
+    elapsed = time.perf_counter() - start
+    count("documents", docs)
+    count("rows", total_rows)
+    if total_rows:
+        logger.info(f"Normalized {docs} documents into {total_rows} rows in {elapsed:.2f}s "
+                    f"({total_rows / max(elapsed, 1e-9):,.0f} rows/sec)")
+    return row_counts
+
+
+def merge_normalized_parts(output_dir: Path = DATA_PROCESSED_DIR, parts_dir: Path = DATA_PARTS_DIR,
+                           logger=None) -> Dict[str, int]:
+    """
+    Concatenate the per-collection part CSVs (parts_dir/<collection>/<table>.csv) into
+    output_dir/<table>.csv, in COLLECTIONS order so the result matches a single extract,
+    then remove the parts. Tables without parts keep their current file.
+    Returns the number of part files merged per table.
+    """
+    if not parts_dir.exists():
+        return {}
+    order = list(COLLECTIONS)
+    part_dirs = sorted((p for p in parts_dir.iterdir() if p.is_dir()),
+                       key=lambda p: (order.index(p.name) if p.name in order else len(order), p.name))
+    merged: Dict[str, int] = {}
+    for table in NORMALIZED_TABLES:
+        parts = [d / f"{table}.csv" for d in part_dirs if (d / f"{table}.csv").exists()]
+        if not parts:
+            continue
+        tmp_path = output_dir / f"{table}.csv.tmp"
+        try:
+            with open(tmp_path, 'wb') as out:
+                for i, part in enumerate(parts):
+                    with open(part, 'rb') as f:
+                        header = f.readline()
+                        if i == 0:
+                            out.write(header)
+                        shutil.copyfileobj(f, out)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        os.replace(tmp_path, output_dir / f"{table}.csv")
+        merged[table] = len(parts)
+        if logger:
+            logger.info(f"Merged {len(parts)} parts into {output_dir / f'{table}.csv'}")
+    shutil.rmtree(parts_dir)
+    return merged
+
+
+@instrumented("extract_mongo_to_csv")
+def extract_and_normalize(collections: Optional[List[str]] = None) -> None:
     """
     Extract from MongoDB, normalize, and write to CSVs.
+    With `collections`, only those are extracted, into a part directory for merge_normalized_parts().
     """
     logger = setup_logger(__name__, log_file=LOGS_DIR / "extract_mongo_to_csv.log")
-    
+
     # Ensure directories exist
     DATA_PROCESSED_DIR.mkdir(parents=True, exist_ok=True)
     LOGS_DIR.mkdir(exist_ok=True)
-    
+
+    output_dir = DATA_PROCESSED_DIR
+    if collections:
+        # Start from an empty part so a table this run has no rows for is not merged from a stale file
+        output_dir = DATA_PARTS_DIR / "_".join(collections)
+        shutil.rmtree(output_dir, ignore_errors=True)
+
     try:
         client = get_mongo_client()
         db = client[os.getenv('MONGO_DB', 'video_streaming')]
-        
-        # Fetch all documents
-        movies: List[Dict[str, Any]] = list(db['movies'].find())
-        series: List[Dict[str, Any]] = list(db['series'].find())
-        
-        if not movies and not series:
+
+        with span("stream"):
+            rows = iter_normalized_rows(db, logger, collections or tuple(COLLECTIONS))
+            row_counts = write_normalized_csvs(rows, output_dir, logger)
+        count("bytes", sum((output_dir / f"{table}.csv").stat().st_size for table in row_counts))
+
+        if not row_counts:
             logger.warning("No data found in MongoDB collections")
             return
-        
-        logger.info(f"Fetched {len(movies)} movies and {len(series)} series")
-        
-        # Prepare data structures
-        content_rows: List[List[Any]] = []
-        movie_details_rows: List[List[Any]] = []
-        series_details_rows: List[List[Any]] = []
-        genre_rows: List[List[str]] = []
-        episode_rows: List[List[Any]] = []
-        
-        # Process movies
-        for movie in movies:
-            content_id = movie['content_id']
-            content_rows.append([
-                content_id,
-                movie['title'],
-                'movie',
-                movie['rating'],
-                movie['production_budget']
-            ])
-            movie_details_rows.append([
-                content_id,
-                movie['duration_minutes'],
-                movie['release_year'],
-                movie['views_count']
-            ])
-            for genre in movie.get('genre', []):
-                genre_rows.append([content_id, genre])
-        
-        # Process series
-        for ser in series:
-            content_id = ser['content_id']
-            content_rows.append([
-                content_id,
-                ser['title'],
-                'series',
-                ser['rating'],
-                ser['production_budget']
-            ])
-            series_details_rows.append([
-                content_id,
-                ser['seasons'],
-                ser['avg_episode_duration'],
-                ser['total_views']
-            ])
-            for genre in ser.get('genre', []):
-                genre_rows.append([content_id, genre])
-            episodes_per_season = ser.get('episodes_per_season', [])
-            if len(episodes_per_season) != ser['seasons']:
-                logger.warning(f"Mismatch in seasons and episodes list for {content_id}")
-            for season_num, ep_count in enumerate(episodes_per_season, start=1):
-                episode_rows.append([content_id, season_num, ep_count])
-        
-        # Write CSVs
-        csv_files = {
-            'content.csv': (['content_id', 'title', 'type', 'rating', 'production_budget'], content_rows),
-            'movie_details.csv': (['content_id', 'duration_minutes', 'release_year', 'views_count'], movie_details_rows),
-            'series_details.csv': (['content_id', 'seasons', 'avg_episode_duration', 'total_views'], series_details_rows),
-            'content_genres.csv': (['content_id', 'genre'], genre_rows),
-            'series_episodes.csv': (['content_id', 'season', 'episode_count'], episode_rows),
-        }
-        
-        for filename, (headers, rows) in csv_files.items():
-            if not rows:
-                logger.info(f"No data for {filename}, skipping")
-                continue
-            path = DATA_PROCESSED_DIR / filename
-            with open(path, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                writer.writerow(headers)
-                writer.writerows(rows)
-            logger.info(f"Wrote {len(rows)} rows to {path}")
-        
+
         logger.info("Extraction and normalization completed successfully")
-        
+
     except Exception as e:
         logger.error(f"Error during extraction and normalization: {e}")
         sys.exit(1)
-    finally:
-        if 'client' in locals():
-            client.close()
 
 if __name__ == "__main__":
-    extract_and_normalize()
\ No newline at end of file
+    extract_and_normalize()
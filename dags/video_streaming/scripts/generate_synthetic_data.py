@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Script to generate a synthetic video streaming dataset at any scale.
+Writes users.csv, viewing_sessions.csv and content.json in the layout of data/raw/, with
+seeded NumPy generators (the same seed gives the same files), vectorized per chunk of
+SYNTHETIC_CHUNK_ROWS rows, so hundreds of millions of sessions stream to disk in bounded memory.
+Sessions only reference generated users and titles and never predate the user's registration;
+content popularity and user activity are skewed, and quality and completion depend on the device.
+Point the loaders at the output with RAW_DATA_DIR (default data/raw/, relative to the project root)
+to load or benchmark it.
+Usage: python scripts/generate_synthetic_data.py --sessions 10000000 --users 200000 --output-dir data/synthetic
+Best practices: Error handling, structured logging, pathlib for paths.
+"""
+import argparse
+import os
+import sys
+from datetime import date
+from pathlib import Path
+
+# Add project root to sys.path for module imports
+SCRIPT_PATH = Path(__file__).resolve()
+PROJECT_ROOT = SCRIPT_PATH.parent.parent  # scripts -> video_streaming_pipeline
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from utils.logger import setup_logger
+from utils.metrics import count, instrumented
+from utils.synthetic_data import SYNTHETIC_CHUNK_ROWS, generate_dataset
+
+# Project root for pathlib
+DATA_SYNTHETIC_DIR = PROJECT_ROOT / "data" / "synthetic"
+
+@instrumented("generate_synthetic_data")
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic video streaming dataset")
+    parser.add_argument('--output-dir', type=Path, default=DATA_SYNTHETIC_DIR)
+    parser.add_argument('--users', type=int, default=5000)
+    parser.add_argument('--movies', type=int, default=200)
+    parser.add_argument('--series', type=int, default=100)
+    parser.add_argument('--sessions', type=int, default=250000)
+    parser.add_argument('--seed', type=int, default=int(os.getenv('SYNTHETIC_SEED', '42')))
+    parser.add_argument('--start', type=date.fromisoformat, default=date(2022, 1, 1),
+                        help="first registration date (YYYY-MM-DD)")
+    parser.add_argument('--end', type=date.fromisoformat, default=date(2024, 12, 31),
+                        help="last watch date (YYYY-MM-DD)")
+    parser.add_argument('--chunk-rows', type=int, default=SYNTHETIC_CHUNK_ROWS)
+    args = parser.parse_args(argv)
+
+    logger = setup_logger(__name__, log_file=PROJECT_ROOT / "logs" / "generate_synthetic_data.log")
+
+    # Ensure logs dir exists
+    (PROJECT_ROOT / "logs").mkdir(exist_ok=True)
+
+    try:
+        if args.start >= args.end:
+            raise ValueError(f"--start {args.start} must be before --end {args.end}")
+        paths = generate_dataset(args.output_dir, users=args.users, movies=args.movies, series=args.series,
+                                 sessions=args.sessions, seed=args.seed, start=args.start, end=args.end,
+                                 chunk_rows=args.chunk_rows, logger=logger)
+        count("rows", args.sessions + args.users)
+        count("bytes", sum(path.stat().st_size for path in paths.values()))
+        logger.info(f"Synthetic dataset ready in {args.output_dir} (load it with RAW_DATA_DIR={args.output_dir.resolve()})")
+
+    except Exception as e:
+        logger.error(f"Error generating synthetic data: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
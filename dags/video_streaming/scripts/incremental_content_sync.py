@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Script to incrementally sync MongoDB content (movies and series) into the
+normalized PostgreSQL tables.
+A per-collection watermark (highest updated_at seen) is kept in etl_watermarks; each run
+extracts the documents updated since WATERMARK_OVERLAP_SECONDS before it, COPYs their
+normalized rows into temporary stage_* tables and merges them with set-based upserts
+(sql/merge_normalized_stage.sql). The merge is idempotent, so the overlap only re-merges a few
+documents, while writes committed out of order or with the same timestamp are never skipped.
+Writers must set updated_at (load_json_to_mongo does in both modes); ObjectIds are not used,
+as they are not monotonic across clients.
+The merge and the new watermarks are committed in one transaction.
+Run via Airflow: Incremental alternative to extract_mongo_to_csv + load_normalized_jsons_to_postgres.
+Best practices: Error handling, structured logging, modular connections, idempotency.
+"""
+import os
+import sys
+import time
+from datetime import timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict
+
+# Add project root to sys.path for module imports
+SCRIPT_PATH = Path(__file__).resolve()
+PROJECT_ROOT = SCRIPT_PATH.parent.parent  # scripts -> video_streaming_pipeline
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from utils.db_connections import get_mongo_client, get_postgres_connection
+from utils.etl_state import bump_data_version, ensure_etl_state_tables, get_watermark, reset_watermark, set_watermark
+from utils.logger import setup_logger
+from utils.metrics import add_time, count, instrumented, span
+from utils.pg_copy import open_copy_buffer, use_binary_copy
+from utils.query_cache import invalidate_data_versions
+
+from scripts.extract_mongo_to_csv import COLLECTIONS, NORMALIZED_TABLES, iter_normalized_rows
+from scripts.load_normalized_jsons_to_postgres import SQL_SCHEMA_PATH, execute_schema_file
+
+MERGE_SQL_PATH = PROJECT_ROOT / "sql" / "merge_normalized_stage.sql"
+WATERMARK_PREFIX = "normalized_content"
+
+# Re-read documents updated this long before the watermark (late commits, clock skew)
+WATERMARK_OVERLAP_SECONDS = int(os.getenv('WATERMARK_OVERLAP_SECONDS', '300'))
+
+
+def build_watermark_query(watermark: Dict[str, Any]) -> Dict[str, Any]:
+    """Mongo filter matching documents updated since the watermark, minus the overlap window."""
+    if not watermark['last_updated_at']:
+        return {}
+    return {'updated_at': {'$gte': watermark['last_updated_at'] - timedelta(seconds=WATERMARK_OVERLAP_SECONDS)}}
+
+
+def advance_watermark(watermark: Dict[str, Any], doc: Dict[str, Any]) -> None:
+    """Move the watermark up to the document's updated_at."""
+    updated_at = doc.get('updated_at')
+    if updated_at and updated_at.tzinfo is None:
+        # PyMongo returns naive UTC datetimes; the stored watermark is timezone-aware
+        updated_at = updated_at.replace(tzinfo=timezone.utc)
+    if updated_at and (watermark['last_updated_at'] is None or updated_at > watermark['last_updated_at']):
+        watermark['last_updated_at'] = updated_at
+
+
+@instrumented("incremental_content_sync")
+def main():
+    logger = setup_logger(__name__, log_file=PROJECT_ROOT / "logs" / "incremental_content_sync.log")
+
+    # Ensure logs dir exists
+    (PROJECT_ROOT / "logs").mkdir(exist_ok=True)
+
+    try:
+        client = get_mongo_client()
+        db = client[os.getenv('MONGO_DB', 'video_streaming')]
+        conn = get_postgres_connection()
+        ensure_etl_state_tables(conn)
+        cursor = conn.cursor()
+
+        # Bootstrap the normalized schema, and start over if the tables were rebuilt
+        cursor.execute("SELECT to_regclass('content')")
+        if cursor.fetchone()[0] is None:
+            logger.info(f"Normalized tables missing, executing {SQL_SCHEMA_PATH}")
+            execute_schema_file(conn, SQL_SCHEMA_PATH)
+            full_sync = True
+        else:
+            cursor.execute("SELECT EXISTS (SELECT 1 FROM content)")
+            full_sync = not cursor.fetchone()[0]
+        if full_sync:
+            logger.info("Normalized tables are empty, running a full sync")
+            for collection in COLLECTIONS:
+                reset_watermark(cursor, f"{WATERMARK_PREFIX}:{collection}")
+
+        # Build per-collection filters from the stored watermarks
+        watermarks: Dict[str, Dict[str, Any]] = {}
+        queries: Dict[str, Dict[str, Any]] = {}
+        for collection in COLLECTIONS:
+            db[collection].create_index("updated_at")
+            watermarks[collection] = get_watermark(cursor, f"{WATERMARK_PREFIX}:{collection}")
+            queries[collection] = build_watermark_query(watermarks[collection])
+            logger.info(f"Watermark for '{collection}': {watermarks[collection]}")
+
+        # Temporary stage tables mirror the normalized tables without constraints
+        buffers = {}
+        for table, columns in NORMALIZED_TABLES.items():
+            cursor.execute(f"CREATE TEMP TABLE stage_{table} (LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP")
+            buffers[table] = open_copy_buffer(cursor, f"stage_{table}", columns, binary=use_binary_copy(table))
+
+        changed = {collection: 0 for collection in COLLECTIONS}
+
+        def track(collection: str, doc: Dict[str, Any]) -> None:
+            changed[collection] += 1
+            advance_watermark(watermarks[collection], doc)
+
+        start = time.perf_counter()
+        rows = iter_normalized_rows(db, logger, queries=queries, on_document=track)
+        for table, row in rows:
+            buffer = buffers[table]
+            buffer.write(row)
+            if buffer.is_full():
+                buffer.flush(cursor)
+        for buffer in buffers.values():
+            buffer.flush(cursor)
+        extract_time = time.perf_counter() - start
+        add_time("stream", extract_time)
+
+        total_changed = sum(changed.values())
+        count("documents", total_changed)
+        count("rows", sum(b.rows_copied for b in buffers.values()))
+        if total_changed:
+            with open(MERGE_SQL_PATH, 'r') as f:
+                merge_sql = f.read()
+            merge_start = time.perf_counter()
+            with span("merge"):
+                cursor.execute(merge_sql)
+            bump_data_version(cursor, "content")
+            logger.info(f"Merged {total_changed} changed documents "
+                        f"({', '.join(f'{b.table}={b.rows_copied}' for b in buffers.values())}) "
+                        f"in {time.perf_counter() - merge_start:.2f}s after {extract_time:.2f}s extract")
+        else:
+            logger.info("No new or changed documents since the last run")
+
+        for collection, mark in watermarks.items():
+            set_watermark(cursor, f"{WATERMARK_PREFIX}:{collection}", None, mark['last_updated_at'])
+        with span("commit"):
+            conn.commit()
+        if total_changed:
+            invalidate_data_versions("content")
+        cursor.close()
+
+        logger.info(f"Incremental content sync completed: {changed}")
+
+    except Exception as e:
+        logger.error(f"Error during incremental content sync: {e}")
+        if 'conn' in locals():
+            conn.rollback()
+        sys.exit(1)
+    finally:
+        if 'conn' in locals():
+            conn.close()
+
+if __name__ == "__main__":
+    main()
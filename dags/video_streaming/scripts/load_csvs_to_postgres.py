@@ -1,14 +1,38 @@
 #!/usr/bin/env python3
 """
 Script to load CSV files into PostgreSQL tables using COPY command.
-Assumes CSVs in data/raw/.
-Skips loading if data already exists in tables.
+Assumes CSVs in data/raw/ (RAW_DATA_DIR overrides it, e.g. RAW_DATA_DIR=data/synthetic
+for a synthetic dataset; relative paths are taken from the project root).
+Skips loading when the source file matches its entry in the load ledger (etl_load_ledger);
+changed files are reloaded.
+Large files (PARALLEL_COPY_MIN_BYTES) are split at line boundaries and COPied by
+CSV_LOAD_WORKERS connections into a bare staging table, which is then renamed over the live
+table and gets its keys, indexes and constraints rebuilt in bulk.
+With BULK_LOAD_DEFERRED_DDL=true the reloaded tables' keys, indexes and constraints are
+dropped before loading and rebuilt (and validated) afterwards, in the same transaction.
+Tables listed in BINARY_COPY_TABLES are loaded with binary COPY instead of CSV.
+Range-partitioned tables (viewing_sessions, by month) are split by month into load tables that
+are swapped in with DETACH/ATTACH PARTITION (large files are split by CSV_LOAD_WORKERS
+connections in parallel, each routing its chunk into the shared monthly load tables); PARTITIONED_LOAD_SCOPE=months keeps the months
+not present in the file, and PARTITION_RETENTION_MONTHS drops old partitions after the load.
+In months scope a reloaded users table does not TRUNCATE ... CASCADE into viewing_sessions: its
+foreign key is dropped for the reload, the sessions of users no longer in the file are deleted
+and the key is added back.
+With VALIDATE_BEFORE_LOAD=true each file is first checked against the table's types, constraints
+and foreign keys in pandas batches; failing rows are quarantined (data/quarantine/, etl_quarantine)
+and only the clean rows (data/validated/) are loaded.
+With RESILIENT_COPY=true files are COPied in savepoint-protected chunks: a failing chunk is
+bisected down to the rows Postgres refuses, which go to a reject log (data/quarantine/,
+etl_quarantine) while the rest of the file still loads. Parallel staging is not used in this mode.
 Run via Airflow: Automated and scheduled via DAG.
 Best practices: Error handling, structured logging, modular connections, pathlib for paths, idempotency.
 """
 import os
 import sys
+import time
+from datetime import date
 from pathlib import Path
+from typing import Tuple
 
 # Add project root to sys.path for module imports
 SCRIPT_PATH = Path(__file__).resolve()
@@ -17,12 +41,104 @@ sys.path.insert(0, str(PROJECT_ROOT))
 
 import psycopg2
 
-from utils.db_connections import get_postgres_connection
+from utils.db_connections import get_postgres_connection, pool_stats, pool_worker_slots, postgres_connection
+from utils.deferred_ddl import BULK_LOAD_DEFERRED_DDL, capture_ddl, drop_ddl, restore_ddl
+from utils.etl_state import (
+    bump_data_version,
+    check_source,
+    ensure_etl_state_tables,
+    mark_dirty_months,
+    record_load,
+    table_has_rows,
+)
 from utils.logger import setup_logger
+from utils.metrics import add_time, count, instrumented, span
+from utils.partitions import (
+    PARTITION_RETENTION_MONTHS,
+    PARTITIONED_LOAD_SCOPE,
+    add_months,
+    attach_load_tables,
+    drop_partitions_before,
+    delete_orphans,
+    load_csv_by_partition,
+    month_start,
+    partition_key,
+    partitioned_foreign_keys,
+    stage_csv_by_partition_parallel,
+)
+from utils.pg_copy import copy_csv_binary, copy_csv_chunks_parallel, use_binary_copy
+from utils.query_cache import invalidate_data_versions
+from utils.resilient_copy import RESILIENT_COPY, RejectLog, copy_csv_resilient
+from utils.validation import VALIDATE_BEFORE_LOAD, reference_keys_from, validate_csv
 
 # Project root for pathlib
-DATA_RAW_DIR = PROJECT_ROOT / "data" / "raw"
+# A relative RAW_DATA_DIR is taken from the project root, where generate_synthetic_data writes
+DATA_RAW_DIR = PROJECT_ROOT / os.getenv('RAW_DATA_DIR', "data/raw")
+DATA_VALIDATED_DIR = PROJECT_ROOT / "data" / "validated"
+DATA_QUARANTINE_DIR = PROJECT_ROOT / "data" / "quarantine"
 
+# Parallel bulk-load settings
+CSV_LOAD_WORKERS = int(os.getenv('CSV_LOAD_WORKERS', '1'))
+PARALLEL_COPY_MIN_BYTES = int(os.getenv('PARALLEL_COPY_MIN_BYTES', str(64 * 1024 * 1024)))
+
+def clamp_workers(table_name, workers, logger) -> int:
+    """Limit COPY workers to the free connection pool slots (see pool_worker_slots)."""
+    allowed = pool_worker_slots(workers)
+    if allowed < workers:
+        logger.warning(f"Using {allowed} of {workers} COPY workers for {table_name}: "
+                       f"the connection pool has no more free slots (raise POSTGRES_POOL_MAX)")
+    return allowed
+
+def load_parallel_into_stage(csv_path, table_name, columns, workers, logger) -> Tuple[str, int]:
+    """
+    COPY a CSV into a bare copy of table_name (no keys or indexes) using `workers` connections.
+    Returns the staging table name and row count; the caller swaps it in with swap_in_stage.
+    """
+    stage_table = f"{table_name}_stage"
+    workers = clamp_workers(table_name, workers, logger)
+    with postgres_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"DROP TABLE IF EXISTS {stage_table}")
+        # Logged, since it becomes the live table
+        cursor.execute(f"CREATE TABLE {stage_table} (LIKE {table_name} INCLUDING DEFAULTS)")
+        conn.commit()
+        cursor.close()
+    rows = copy_csv_chunks_parallel(csv_path, stage_table, columns, workers, postgres_connection, logger)
+    logger.info(f"Staged {rows} rows from {csv_path} into {stage_table} with {workers} workers "
+                f"(pool: {pool_stats()})")
+    return stage_table, rows
+
+def load_parallel_into_partitions(csv_path, table_name, columns, workers, logger):
+    """
+    COPY a CSV into per-month load tables of a partitioned table using `workers` connections.
+    Returns {month: (load table, rows)}; the caller swaps them in with attach_load_tables.
+    """
+    workers = clamp_workers(table_name, workers, logger)
+    staged = stage_csv_by_partition_parallel(csv_path, table_name, columns, workers, postgres_connection, logger)
+    logger.info(f"Staged {sum(rows for _, rows in staged.values())} rows from {csv_path} into "
+                f"{len(staged)} monthly load tables of {table_name} with {workers} workers (pool: {pool_stats()})")
+    return staged
+
+def swap_in_stage(cursor, table_name, stage_table, deferred, logger) -> None:
+    """
+    Replace the (truncated) live table with the staged one by rename, instead of a
+    single-threaded INSERT ... SELECT that maintains every index row by row. Keys, indexes,
+    checks and the foreign keys referencing the table are rebuilt on the loaded data, unless
+    BULK_LOAD_DEFERRED_DDL already dropped them (they are then rebuilt with the rest).
+    Privileges and triggers on the live table are not carried over.
+    Runs in the caller's transaction.
+    """
+    own = None
+    if not (deferred and table_name in deferred.tables):
+        own = capture_ddl(cursor, [table_name])
+        drop_ddl(cursor, own)
+    cursor.execute(f"DROP TABLE {table_name}")
+    cursor.execute(f"ALTER TABLE {stage_table} RENAME TO {table_name}")
+    if own:
+        timings = restore_ddl(cursor, own, logger)
+        add_time("restore_ddl", sum(timings.values()))
+
+@instrumented("load_csvs_to_postgres")
 def main():
     logger = setup_logger(__name__, log_file=PROJECT_ROOT / "logs" / "load_csvs.log")
     
@@ -31,6 +147,7 @@ def main():
     
     try:
         conn = get_postgres_connection()
+        ensure_etl_state_tables(conn)
         cursor = conn.cursor()
         
         # CSV mappings: (csv_file, table_name, columns_order)
@@ -39,32 +156,163 @@ def main():
             (DATA_RAW_DIR / "viewing_sessions.csv", "viewing_sessions", "session_id, user_id, content_id, watch_date, watch_duration_minutes, completion_percentage, device_type, quality_level")
         ]
         
+        # Later mappings reference earlier ones (viewing_sessions -> users), so once a
+        # table is reloaded (TRUNCATE ... CASCADE) every table after it is reloaded too
+        reload_downstream = False
+        pending = []
         for csv_path, table_name, columns in csv_mappings:
             if not csv_path.exists():
                 raise FileNotFoundError(f"CSV not found: {csv_path}")
             
-            # Check if table already contains data
-            cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
-            row_count = cursor.fetchone()[0]
-            if row_count > 0:
-                logger.info(f"Table {table_name} already contains {row_count} rows, skipping load")
+            # Skip files that match the ledger, as long as the table still holds data
+            target = f"postgres.{table_name}"
+            unchanged, fingerprint = check_source(cursor, target, csv_path)
+            if unchanged and not reload_downstream and table_has_rows(cursor, table_name):
+                logger.info(f"{csv_path.name} unchanged since last load, skipping {table_name}")
                 continue
-            
-            logger.info(f"Loading {csv_path} into {table_name}")
-            with open(csv_path, 'r') as f:
-                cursor.copy_expert(
-                    f"COPY {table_name} ({columns}) FROM STDIN WITH CSV HEADER",
-                    f
-                )
-            logger.info(f"Successfully loaded {csv_path} into {table_name}")
+            reload_downstream = True
+            pending.append((csv_path, table_name, columns, target, fingerprint))
         
-        conn.commit()
+        # Partitioned tables are loaded month by month (into per-month load tables) instead of through a stage table
+        partitioned = {table_name for _, table_name, _, _, _ in pending if partition_key(cursor, table_name)}
+        
+        # Reject and quarantine files are moved into place only once the load has committed
+        reject_logs = []
+        
+        # Validate in mapping order so foreign keys see the clean keys of tables reloaded in this run
+        load_paths = {}
+        if VALIDATE_BEFORE_LOAD:
+            validate_start = time.perf_counter()
+            results = {}
+            reference_keys = reference_keys_from(cursor, results)
+            for csv_path, table_name, columns, target, fingerprint in pending:
+                results[table_name] = validate_csv(csv_path, table_name, DATA_VALIDATED_DIR, DATA_QUARANTINE_DIR,
+                                                   reference_keys=reference_keys, cursor=cursor, logger=logger)
+                # Quarantined rows are recorded in the load's transaction, and published with it
+                results[table_name].record(cursor)
+                reject_logs.append(results[table_name])
+                load_paths[table_name] = results[table_name].clean_path
+            add_time("validate", time.perf_counter() - validate_start)
+        
+        # Stage large files in parallel before this transaction locks the targets
+        stage_tables = {}
+        partition_stages = {}
+        stage_start = time.perf_counter()
+        for csv_path, table_name, columns, target, fingerprint in pending:
+            load_path = load_paths.get(table_name, csv_path)
+            if CSV_LOAD_WORKERS > 1 and not RESILIENT_COPY and load_path.stat().st_size >= PARALLEL_COPY_MIN_BYTES:
+                if table_name in partitioned:
+                    partition_stages[table_name] = load_parallel_into_partitions(load_path, table_name, columns,
+                                                                                 CSV_LOAD_WORKERS, logger)
+                else:
+                    stage_tables[table_name] = load_parallel_into_stage(load_path, table_name, columns,
+                                                                        CSV_LOAD_WORKERS, logger)
+        add_time("stage", time.perf_counter() - stage_start)
+        
+        # In months scope a reloaded parent must not empty the partitioned tables referencing it
+        # (TRUNCATE ... CASCADE): their foreign keys are dropped for the reload instead (before the
+        # deferred DDL capture, which would drop them too)
+        kept_foreign_keys = {}
+        if PARTITIONED_LOAD_SCOPE == 'months':
+            for _, table_name, _, _, _ in pending:
+                if table_name not in partitioned:
+                    kept_foreign_keys[table_name] = partitioned_foreign_keys(cursor, table_name)
+        
+        deferred = None
+        if BULK_LOAD_DEFERRED_DDL and pending:
+            deferred = capture_ddl(cursor, [table_name for _, table_name, _, _, _ in pending])
+            drop_ddl(cursor, deferred)
+            logger.info(f"Deferred indexes and constraints of {deferred.tables} until after the load")
+        
+        # Watch months the rollups must recompute; any non-monthly reload invalidates all of them
+        dirty_months = set()
+        all_months_dirty = False
+        start = time.perf_counter()
+        for csv_path, table_name, columns, target, fingerprint in pending:
+            load_path = load_paths.get(table_name, csv_path)
+            logger.info(f"Loading {load_path} into {table_name}")
+            if table_name not in partitioned or PARTITIONED_LOAD_SCOPE == 'full':
+                for child, name, _, _, _ in kept_foreign_keys.get(table_name, []):
+                    cursor.execute(f"ALTER TABLE {child} DROP CONSTRAINT IF EXISTS {name}")
+                cursor.execute(f"TRUNCATE {table_name} CASCADE")
+            stage_table = stage_tables.get(table_name)
+            reject_log = None
+            if RESILIENT_COPY:
+                reject_log = RejectLog(table_name, load_path, [c.strip() for c in columns.split(',')], DATA_QUARANTINE_DIR)
+                reject_logs.append(reject_log)
+            if table_name in partitioned:
+                if table_name in partition_stages:
+                    month_rows = attach_load_tables(cursor, table_name, partition_stages[table_name], logger)
+                else:
+                    month_rows = load_csv_by_partition(cursor, load_path, table_name, columns, logger, reject_log)
+                rows_loaded = sum(month_rows.values())
+                dirty_months.update(month_rows)
+                all_months_dirty = all_months_dirty or PARTITIONED_LOAD_SCOPE == 'full'
+            elif stage_table:
+                # Constraints are checked as they are rebuilt on the swapped-in table
+                stage_table, rows_loaded = stage_table
+                swap_in_stage(cursor, table_name, stage_table, deferred, logger)
+            elif reject_log is not None:
+                rows_loaded = copy_csv_resilient(cursor, load_path, table_name, columns, reject_log)
+            elif use_binary_copy(table_name):
+                rows_loaded = copy_csv_binary(cursor, load_path, table_name, columns)
+            else:
+                with open(load_path, 'r') as f:
+                    cursor.copy_expert(
+                        f"COPY {table_name} ({columns}) FROM STDIN WITH CSV HEADER",
+                        f
+                    )
+                rows_loaded = cursor.rowcount
+            for child, name, definition, fk_columns, parent_columns in kept_foreign_keys.get(table_name, []):
+                # As ON DELETE CASCADE: the kept months lose the rows of parents that are gone
+                orphans = delete_orphans(cursor, child, table_name, fk_columns, parent_columns)
+                if not (deferred and (child, name) in [(t, n) for t, n, _ in deferred.foreign_keys]):
+                    cursor.execute(f"ALTER TABLE {child} ADD CONSTRAINT {name} {definition}")
+                logger.info(f"Kept the partitions of {child} through the {table_name} reload "
+                            f"({orphans} rows without a {table_name} row deleted)")
+            # Includes a parent reload in months scope: the kept months join the new parent rows
+            if table_name not in partitioned:
+                all_months_dirty = True
+            if reject_log is not None and reject_log.rejects:
+                reject_log.record(cursor)
+                logger.warning(f"Rejected {len(reject_log.rejects)} rows of {csv_path.name}, see {reject_log.path}")
+            record_load(cursor, target, csv_path, fingerprint, rows_loaded)
+            count("rows", rows_loaded)
+            count("bytes", load_path.stat().st_size)
+            logger.info(f"Successfully loaded {rows_loaded} rows from {csv_path} into {table_name}")
+        if pending:
+            add_time("copy", time.perf_counter() - start)
+            logger.info(f"Loaded {len(pending)} tables in {time.perf_counter() - start:.2f}s")
+            mark_dirty_months(cursor, "load_csvs_to_postgres", None if all_months_dirty else dirty_months)
+            bump_data_version(cursor, *[table_name for _, table_name, _, _, _ in pending])
+        
+        if deferred:
+            timings = restore_ddl(cursor, deferred, logger)
+            add_time("restore_ddl", sum(timings.values()))
+            logger.info(f"Rebuilt indexes and constraints in {sum(timings.values()):.2f}s")
+        
+        # Retention is a DDL operation: whole months are detached and dropped
+        if PARTITION_RETENTION_MONTHS > 0:
+            cutoff = add_months(month_start(date.today()), -PARTITION_RETENTION_MONTHS)
+            for _, table_name, _, _, _ in csv_mappings:
+                if partition_key(cursor, table_name) and drop_partitions_before(cursor, table_name, cutoff, logger):
+                    mark_dirty_months(cursor, "partition_retention")
+                    bump_data_version(cursor, table_name)
+        
+        with span("commit"):
+            conn.commit()
+        for reject_log in reject_logs:
+            reject_log.publish()
+        invalidate_data_versions(*[table_name for _, table_name, _ in csv_mappings])
         logger.info("CSV loading process completed")
         
     except Exception as e:
         logger.error(f"Error loading CSVs: {e}")
         if 'conn' in locals():
             conn.rollback()
+        if 'reject_logs' in locals():
+            for reject_log in reject_logs:
+                reject_log.discard()
         sys.exit(1)
     finally:
         if 'conn' in locals():
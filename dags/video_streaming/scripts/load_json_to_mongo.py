@@ -1,14 +1,27 @@
 #!/usr/bin/env python3
 """
 Script to load JSON file into MongoDB collections (movies and series).
-Assumes JSON in data/raw/content.json.
-Skips loading if data already exists in collections.
+Assumes JSON in data/raw/content.json (RAW_DATA_DIR overrides the directory,
+relative to the project root).
+Skips a collection when content.json matches its entry in the load ledger
+(etl_load_ledger in PostgreSQL); a changed file replaces the collection contents.
+The movies and series arrays are parsed incrementally and handed to one inserter thread
+per collection through bounded queues, so memory stays flat as the file grows.
+MONGO_LOAD_MODE=upsert keeps existing documents and upserts by content_id instead,
+skipping documents whose content hash is unchanged (documents missing from the file are kept).
+main(collections=[...]) loads only some collections, so each can run as its own task.
 Run via Airflow: Automated and scheduled via DAG.
 Best practices: Error handling, structured logging, modular connections, pathlib for paths, idempotency.
 """
+import hashlib
 import json
+import queue
 import sys
+import threading
+import time
+from datetime import datetime, timezone
 from pathlib import Path
+from typing import Any, Dict, List, Optional
 import os
 
 # Add project root to sys.path for module imports
@@ -16,15 +29,143 @@ SCRIPT_PATH = Path(__file__).resolve()
 PROJECT_ROOT = SCRIPT_PATH.parent.parent  # scripts -> video_streaming_pipeline
 sys.path.insert(0, str(PROJECT_ROOT))
 
+from pymongo import ReplaceOne
 from pymongo.errors import BulkWriteError
 
-from utils.db_connections import get_mongo_client
+from utils.db_connections import get_mongo_client, get_postgres_connection
+from utils.etl_state import bump_data_version, check_source, ensure_etl_state_tables, record_load
+from utils.json_stream import iter_top_level_arrays
 from utils.logger import setup_logger
+from utils.metrics import add_time, count, instrumented, timed_iter
+from utils.query_cache import invalidate_data_versions
 
 # Project root for pathlib
-DATA_RAW_DIR = PROJECT_ROOT / "data" / "raw"
+# A relative RAW_DATA_DIR is taken from the project root, where generate_synthetic_data writes
+DATA_RAW_DIR = PROJECT_ROOT / os.getenv('RAW_DATA_DIR', "data/raw")
 
-def main():
+# Documents per unordered insert_many, and batches buffered per collection
+MONGO_INSERT_BATCH_SIZE = int(os.getenv('MONGO_INSERT_BATCH_SIZE', '1000'))
+MONGO_INSERT_QUEUE_BATCHES = int(os.getenv('MONGO_INSERT_QUEUE_BATCHES', '4'))
+
+# 'replace' empties a changed collection and inserts; 'upsert' merges by content_id
+MONGO_LOAD_MODE = os.getenv('MONGO_LOAD_MODE', 'replace').lower()
+
+def content_hash(doc: Dict[str, Any]) -> str:
+    """Stable hash of a source document (key order independent)."""
+    canonical = json.dumps(doc, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+class CollectionInserter(threading.Thread):
+    """
+    Background thread writing batches from a bounded queue into one collection.
+    A full queue blocks the parser, which gives backpressure against a slow server.
+    With upsert=True each batch is merged by content_id and unchanged documents are skipped.
+    """
+
+    def __init__(self, collection, upsert: bool = False):
+        super().__init__(name=f"insert-{collection.name}", daemon=True)
+        self.collection = collection
+        self.upsert = upsert
+        self.batches: "queue.Queue[Optional[List[Dict[str, Any]]]]" = queue.Queue(maxsize=MONGO_INSERT_QUEUE_BATCHES)
+        self.counts = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+        self.busy_seconds = 0.0
+        self.error: Optional[BaseException] = None
+
+    def run(self) -> None:
+        while True:
+            batch = self.batches.get()
+            if batch is None:
+                return
+            if self.error is not None:
+                continue  # Keep draining so the parser never blocks on a dead consumer
+            start = time.perf_counter()
+            try:
+                if self.upsert:
+                    self._upsert(batch)
+                else:
+                    # updated_at feeds the incremental content sync watermark
+                    now = datetime.now(timezone.utc)
+                    for doc in batch:
+                        doc['updated_at'] = now
+                    self.counts['inserted'] += len(self.collection.insert_many(batch, ordered=False).inserted_ids)
+            except BaseException as e:
+                self.error = e
+            self.busy_seconds += time.perf_counter() - start
+
+    def _upsert(self, batch: List[Dict[str, Any]]) -> None:
+        """Replace new or changed documents by content_id in one unordered bulk_write."""
+        # Last occurrence wins when the file repeats a content_id
+        docs = {doc['content_id']: doc for doc in batch}
+        existing = {
+            doc['content_id']: doc.get('content_hash')
+            for doc in self.collection.find({'content_id': {'$in': list(docs)}}, {'content_id': 1, 'content_hash': 1, '_id': 0})
+        }
+        now = datetime.now(timezone.utc)
+        operations = []
+        for content_id, doc in docs.items():
+            digest = content_hash(doc)
+            if existing.get(content_id) == digest:
+                continue
+            # updated_at feeds the incremental content sync watermark
+            replacement = dict(doc, content_hash=digest, updated_at=now)
+            operations.append(ReplaceOne({'content_id': content_id}, replacement, upsert=True))
+        self.counts['unchanged'] += len(docs) - len(operations)
+        if operations:
+            result = self.collection.bulk_write(operations, ordered=False)
+            self.counts['inserted'] += result.upserted_count
+            self.counts['updated'] += result.modified_count
+
+def stream_json_to_collections(json_path: Path, collections: Dict[str, Any], logger,
+                               upsert: bool = False) -> Dict[str, Dict[str, int]]:
+    """
+    Parse json_path incrementally and write the items of each top-level array whose key is
+    in `collections` concurrently, in unordered batches.
+    Returns {key: {'inserted': n, 'updated': n, 'unchanged': n}}.
+    """
+    inserters = {key: CollectionInserter(collection, upsert) for key, collection in collections.items()}
+    batches: Dict[str, List[Dict[str, Any]]] = {key: [] for key in collections}
+    for inserter in inserters.values():
+        inserter.start()
+
+    start = time.perf_counter()
+    try:
+        for key, item in timed_iter(iter_top_level_arrays(json_path), "parse"):
+            batch = batches.get(key)
+            if batch is None:
+                continue
+            batch.append(item)
+            if len(batch) >= MONGO_INSERT_BATCH_SIZE:
+                inserters[key].batches.put(batch)
+                batches[key] = []
+        for key, batch in batches.items():
+            if batch:
+                inserters[key].batches.put(batch)
+    finally:
+        for inserter in inserters.values():
+            inserter.batches.put(None)
+        for inserter in inserters.values():
+            inserter.join()
+
+    for inserter in inserters.values():
+        if inserter.error is not None:
+            raise inserter.error
+    # Inserter threads overlap with parsing, so their busy time is reported as its own span
+    add_time("insert", sum(inserter.busy_seconds for inserter in inserters.values()))
+    elapsed = time.perf_counter() - start
+    counts = {key: inserter.counts for key, inserter in inserters.items()}
+    docs = sum(sum(c.values()) for c in counts.values())
+    count("documents", docs)
+    count("bytes", json_path.stat().st_size)
+    logger.info(f"Processed {docs} documents from {json_path.name} in {elapsed:.2f}s "
+                f"({docs / max(elapsed, 1e-9):,.0f} docs/sec)")
+    return counts
+
+@instrumented("load_json_to_mongo")
+def main(collections: Optional[List[str]] = None):
+    """
+    Load content.json into the given collections (default: movies and series).
+    The DAG maps this task over the collections, one collection per task instance.
+    """
     logger = setup_logger(__name__, log_file=PROJECT_ROOT / "logs" / "load_json.log")
     
     # Ensure logs dir exists
@@ -38,28 +179,43 @@ def main():
         if not json_path.exists():
             raise FileNotFoundError(f"JSON not found: {json_path}")
         
-        with open(json_path, 'r') as f:
-            data = json.load(f)
+        # The load ledger lives in PostgreSQL alongside the table ledgers
+        conn = get_postgres_connection()
+        ensure_etl_state_tables(conn)
+        cursor = conn.cursor()
         
-        # Insert movies
-        if 'movies' in data and data['movies']:
-            movies_collection = db['movies']
-            # Check if collection already contains data
-            if movies_collection.count_documents({}) > 0:
-                logger.info(f"Collection 'movies' already contains {movies_collection.count_documents({})} documents, skipping load")
+        # Collections whose ledger entry is stale (or that were emptied) need a reload
+        fingerprint = None
+        pending = []
+        for collection in collections or ('movies', 'series'):
+            unchanged, fingerprint = check_source(cursor, f"mongo.{collection}", json_path, fingerprint)
+            # estimated_document_count() reads collection metadata, not documents
+            if unchanged and db[collection].estimated_document_count() > 0:
+                logger.info(f"{json_path.name} unchanged since last load, skipping '{collection}'")
             else:
-                movies_collection.insert_many(data['movies'])
-                logger.info(f"Loaded {len(data['movies'])} movies")
+                pending.append(collection)
+        conn.commit()
         
-        # Insert series
-        if 'series' in data and data['series']:
-            series_collection = db['series']
-            # Check if collection already contains data
-            if series_collection.count_documents({}) > 0:
-                logger.info(f"Collection 'series' already contains {series_collection.count_documents({})} documents, skipping load")
-            else:
-                series_collection.insert_many(data['series'])
-                logger.info(f"Loaded {len(data['series'])} series")
+        upsert = MONGO_LOAD_MODE == 'upsert'
+        for collection in pending:
+            target_collection = db[collection]
+            if upsert:
+                # The content_id lookups and replaces rely on this index
+                target_collection.create_index("content_id", unique=True)
+            elif target_collection.estimated_document_count() > 0:
+                deleted = target_collection.delete_many({}).deleted_count
+                logger.info(f"Removed {deleted} stale documents from '{collection}'")
+        
+        if pending:
+            counts = stream_json_to_collections(json_path, {c: db[c] for c in pending}, logger, upsert)
+            for collection in pending:
+                c = counts[collection]
+                record_load(cursor, f"mongo.{collection}", json_path, fingerprint, sum(c.values()))
+                bump_data_version(cursor, f"mongo.{collection}")
+                logger.info(f"Loaded {collection}: {c['inserted']} inserted, {c['updated']} updated, "
+                            f"{c['unchanged']} unchanged")
+            conn.commit()
+            invalidate_data_versions(*[f"mongo.{collection}" for collection in pending])
         
         logger.info("JSON loading process completed")
         
@@ -70,8 +226,8 @@ def main():
         logger.error(f"Error loading JSON: {e}")
         sys.exit(1)
     finally:
-        if 'client' in locals():
-            client.close()
+        if 'conn' in locals():
+            conn.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
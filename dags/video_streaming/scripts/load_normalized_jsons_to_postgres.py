@@ -1,7 +1,30 @@
 #!/usr/bin/env python3
+"""
+Script to load the normalized content CSVs (data/processed/) into PostgreSQL.
+Tables are COPied into a staging schema in dependency order: tables whose parents have
+landed are loaded concurrently, each on its own connection (NORMALIZED_LOAD_WORKERS).
+The staged tables are then published in a single transaction by swapping them into the
+live schema, so readers see either the previous tables or the complete new set.
+With BULK_LOAD_DEFERRED_DDL=true the staged tables are loaded bare (all at once, since no
+foreign keys are enforced yet) and their keys, indexes and constraints are built afterwards.
+Tables listed in BINARY_COPY_TABLES are loaded with binary COPY instead of CSV.
+With VALIDATE_BEFORE_LOAD=true rows failing the table's types, constraints or foreign keys are
+quarantined (data/quarantine/, etl_quarantine) before staging and only the clean rows are loaded.
+With RESILIENT_COPY=true each table is COPied in savepoint-protected chunks and the rows Postgres
+refuses are bisected out into a reject log instead of failing the load.
+For the DAG the load is also split into prepare_load, one stage_table task per table (mapped
+over the tables, loaded bare so they can run in any order) and publish_load, which rebuilds the
+staged DDL and publishes in the same transaction. The stage tasks read the files prepare_load
+left in data/, so on more than one worker host data/ must be a shared volume (see dag.py).
+Run via Airflow: Automated and scheduled via DAG.
+Best practices: Error handling, structured logging, modular connections, idempotency.
+"""
 import os
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
 
 # Add project root to sys.path for module imports
 SCRIPT_PATH = Path(__file__).resolve()
@@ -9,12 +32,36 @@ PROJECT_ROOT = SCRIPT_PATH.parent.parent  # scripts -> video_streaming_pipeline
 sys.path.insert(0, str(PROJECT_ROOT))
 
 import psycopg2
-from utils.db_connections import get_postgres_connection
+from scripts.extract_mongo_to_csv import merge_normalized_parts
+from scripts.load_csvs_to_postgres import clamp_workers
+from utils.db_connections import get_postgres_connection, pool_stats, postgres_connection
+from utils.deferred_ddl import BULK_LOAD_DEFERRED_DDL, DeferredDdl, capture_ddl, drop_ddl, restore_ddl
+from utils.etl_state import bump_data_version, check_source, ensure_etl_state_tables, record_load, table_has_rows
 from utils.logger import setup_logger
+from utils.metrics import add_time, count, instrumented, span
+from utils.pg_copy import copy_csv_binary, use_binary_copy
+from utils.query_cache import invalidate_data_versions
+from utils.resilient_copy import RESILIENT_COPY, RejectLog, copy_csv_resilient
+from utils.validation import VALIDATE_BEFORE_LOAD, ValidationResult, reference_keys_from, series_checks, validate_csv
 
 # Project root for pathlib
 DATA_PROCESSED_DIR = PROJECT_ROOT / "data" / "processed"
-SQL_SCHEMA_PATH = PROJECT_ROOT / "sql" / "create_normalized_tables.sql"
+DATA_VALIDATED_DIR = PROJECT_ROOT / "data" / "validated"
+DATA_QUARANTINE_DIR = PROJECT_ROOT / "data" / "quarantine"
+SQL_SCHEMA_PATH = PROJECT_ROOT / "sql" / "normalized_tables.sql"
+
+# Staging schema the tables are loaded into before being published
+STAGE_SCHEMA = "normalized_stage"
+LOAD_WORKERS = int(os.getenv('NORMALIZED_LOAD_WORKERS', '4'))
+
+# Table mappings: (csv_file, table_name, columns_order, parent_tables)
+NORMALIZED_MAPPINGS = [
+    (DATA_PROCESSED_DIR / "content.csv", "content", "content_id, title, type, rating, production_budget", ()),
+    (DATA_PROCESSED_DIR / "movie_details.csv", "movie_details", "content_id, duration_minutes, release_year, views_count", ("content",)),
+    (DATA_PROCESSED_DIR / "series_details.csv", "series_details", "content_id, seasons, avg_episode_duration, total_views", ("content",)),
+    (DATA_PROCESSED_DIR / "content_genres.csv", "content_genres", "content_id, genre", ("content",)),
+    (DATA_PROCESSED_DIR / "series_episodes.csv", "series_episodes", "content_id, season, episode_count", ("content",)),
+]
 
 def execute_schema_file(conn, schema_path):
     """Execute SQL schema file to create tables and indexes."""
@@ -25,64 +72,365 @@ def execute_schema_file(conn, schema_path):
     conn.commit()
     cursor.close()
 
+def dependency_levels(mappings) -> List[List[tuple]]:
+    """
+    Group mappings into load levels: every table's parents are in an earlier level,
+    so all tables of one level can be loaded at the same time.
+    """
+    remaining = {mapping[1]: mapping for mapping in mappings}
+    loaded = set()
+    levels = []
+    while remaining:
+        level = [m for m in remaining.values() if all(parent in loaded for parent in m[3])]
+        if not level:
+            raise ValueError(f"Circular or missing table dependencies: {sorted(remaining)}")
+        levels.append(level)
+        for mapping in level:
+            loaded.add(mapping[1])
+            del remaining[mapping[1]]
+    return levels
+
+def prepare_stage_schema(conn, schema_path) -> None:
+    """(Re)create the staging schema and the normalized tables inside it."""
+    cursor = conn.cursor()
+    cursor.execute(f"DROP SCHEMA IF EXISTS {STAGE_SCHEMA} CASCADE")
+    cursor.execute(f"CREATE SCHEMA {STAGE_SCHEMA}")
+    cursor.execute(f"SET search_path TO {STAGE_SCHEMA}")
+    with open(schema_path, 'r') as f:
+        cursor.execute(f.read())
+    cursor.execute("RESET search_path")
+    conn.commit()
+    cursor.close()
+
+def copy_into_stage(csv_path: Path, table_name: str, columns: str,
+                    reject_log: Optional[RejectLog] = None) -> Tuple[str, int, int, float]:
+    """
+    COPY one CSV into its staged table on a pooled connection. Returns (table, rows, bytes, seconds).
+    With a reject_log, rows that fail are rejected (and recorded in etl_quarantine) instead.
+    """
+    with postgres_connection() as conn:
+        start = time.perf_counter()
+        cursor = conn.cursor()
+        try:
+            if reject_log is not None:
+                rows_loaded = copy_csv_resilient(cursor, csv_path, f"{STAGE_SCHEMA}.{table_name}", columns,
+                                                 reject_log, binary=use_binary_copy(table_name))
+                reject_log.record(cursor)
+            elif use_binary_copy(table_name):
+                rows_loaded = copy_csv_binary(cursor, csv_path, f"{STAGE_SCHEMA}.{table_name}", columns)
+            else:
+                with open(csv_path, 'r') as f:
+                    cursor.copy_expert(
+                        f"COPY {STAGE_SCHEMA}.{table_name} ({columns}) FROM STDIN WITH CSV HEADER",
+                        f
+                    )
+                rows_loaded = cursor.rowcount
+            conn.commit()
+        except BaseException:
+            if reject_log is not None:
+                reject_log.discard()
+            raise
+        if reject_log is not None:
+            reject_log.publish()
+        cursor.close()
+        return table_name, rows_loaded, csv_path.stat().st_size, time.perf_counter() - start
+
+def publish_stage_schema(cursor, table_names) -> None:
+    """
+    Swap the staged tables into the live schema. Runs in the caller's transaction.
+    Tables are dropped children first without CASCADE: a view or foreign key outside the
+    normalized tables that depends on them makes the publish fail instead of being dropped.
+    """
+    cursor.execute("SELECT current_schema()")
+    live_schema = cursor.fetchone()[0]
+    for table_name in reversed(table_names):
+        cursor.execute(f"DROP TABLE IF EXISTS {live_schema}.{table_name}")
+    for table_name in table_names:
+        cursor.execute(f"ALTER TABLE {STAGE_SCHEMA}.{table_name} SET SCHEMA {live_schema}")
+    cursor.execute(f"DROP SCHEMA {STAGE_SCHEMA} CASCADE")
+
+def check_sources(conn, logger) -> Optional[Dict[str, Dict[str, Any]]]:
+    """
+    Compare every source file against the load ledger. Returns the fingerprints per table,
+    or None when nothing changed and the live tables still hold data.
+    """
+    cursor = conn.cursor()
+    fingerprints = {}
+    all_unchanged = True
+    for csv_path, table_name, columns, parents in NORMALIZED_MAPPINGS:
+        if not csv_path.exists():
+            raise FileNotFoundError(f"CSV not found: {csv_path}")
+        unchanged, fingerprints[table_name] = check_source(cursor, f"postgres.{table_name}", csv_path)
+        all_unchanged = all_unchanged and unchanged
+
+    # The normalized tables are rebuilt as a unit, so skip only when nothing changed
+    cursor.execute("SELECT to_regclass('content')")
+    if all_unchanged and cursor.fetchone()[0] is not None and table_has_rows(cursor, "content"):
+        logger.info("Normalized CSVs unchanged since last load, skipping")
+        fingerprints = None
+    elif all_unchanged:
+        # The ledger says the load happened, so something else dropped or emptied the tables
+        logger.warning("Normalized CSVs unchanged since last load, but content is missing or empty; reloading")
+    conn.commit()
+    cursor.close()
+    return fingerprints
+
+def validate_sources(conn, logger) -> Tuple[Dict[Path, Path], List[ValidationResult]]:
+    """
+    Path to load per source CSV: its validated copy with VALIDATE_BEFORE_LOAD, else the file itself.
+    Also returns the validation results, whose quarantines publish() records and publishes.
+    """
+    load_paths = {csv_path: csv_path for csv_path, _, _, _ in NORMALIZED_MAPPINGS}
+    if not VALIDATE_BEFORE_LOAD:
+        return load_paths, []
+    # Validate parents before children so foreign keys are checked against the clean parent keys
+    validate_start = time.perf_counter()
+    cursor = conn.cursor()
+    results = {}
+    reference_keys = reference_keys_from(cursor, results)
+    for csv_path, table_name, columns, parents in NORMALIZED_MAPPINGS:
+        # Seasons and episodes are cross-checked: series_details against the episode rows,
+        # then series_episodes against the series details that passed
+        details = results.get('series_details')
+        extra_checks = series_checks(table_name, DATA_PROCESSED_DIR / "series_episodes.csv",
+                                     details.clean_path if details else None)
+        results[table_name] = validate_csv(csv_path, table_name, DATA_VALIDATED_DIR, DATA_QUARANTINE_DIR,
+                                           reference_keys=reference_keys, extra_checks=extra_checks,
+                                           cursor=cursor, logger=logger)
+        load_paths[csv_path] = results[table_name].clean_path
+    # Ends the transaction of the duplicate-key temp tables; the quarantines are recorded by publish()
+    conn.commit()
+    cursor.close()
+    add_time("validate", time.perf_counter() - validate_start)
+    return load_paths, list(results.values())
+
+def reject_log_for(load_path: Path, table_name: str, columns: str) -> Optional[RejectLog]:
+    if not RESILIENT_COPY:
+        return None
+    return RejectLog(table_name, load_path, [c.strip() for c in columns.split(',')], DATA_QUARANTINE_DIR)
+
+def log_staged(logger, table_name: str, rows: int, size: int, elapsed: float,
+               reject_log: Optional[RejectLog]) -> None:
+    count("rows", rows)
+    count("bytes", size)
+    logger.info(f"Loaded {rows} rows into {table_name} in {elapsed:.2f}s "
+                f"({rows / max(elapsed, 1e-9):,.0f} rows/sec, "
+                f"{size / max(elapsed, 1e-9) / 1024 / 1024:.1f} MB/sec)")
+    if reject_log is not None and reject_log.rejects:
+        logger.warning(f"Rejected {len(reject_log.rejects)} rows of {table_name}, see {reject_log.path}")
+
+def publish(conn, fingerprints: Dict[str, Dict[str, Any]], rows_loaded: Dict[str, int], logger,
+            quarantines: List[ValidationResult] = ()) -> None:
+    """
+    Publish all staged tables (and their ledger entries and quarantined rows) atomically, with
+    any work pending on conn. The quarantine files are moved into place once that committed.
+    """
+    publish_start = time.perf_counter()
+    cursor = conn.cursor()
+    publish_stage_schema(cursor, [mapping[1] for mapping in NORMALIZED_MAPPINGS])
+    for csv_path, table_name, columns, parents in NORMALIZED_MAPPINGS:
+        record_load(cursor, f"postgres.{table_name}", csv_path, fingerprints[table_name], rows_loaded[table_name])
+    for quarantine in quarantines:
+        quarantine.record(cursor)
+    bump_data_version(cursor, "content")
+    conn.commit()
+    for quarantine in quarantines:
+        quarantine.publish()
+    invalidate_data_versions("content")
+    cursor.close()
+    add_time("publish", time.perf_counter() - publish_start)
+    logger.info(f"Published normalized tables in {time.perf_counter() - publish_start:.2f}s")
+
+@instrumented("load_normalized_jsons_to_postgres")
 def main():
     logger = setup_logger(__name__, log_file=PROJECT_ROOT / "logs" / "load_normalized_csvs.log")
-    
+
     # Ensure logs and sql dirs exist
     (PROJECT_ROOT / "logs").mkdir(exist_ok=True)
     (PROJECT_ROOT / "sql").mkdir(exist_ok=True)
-    
+
     try:
+        # Parts left by a per-collection extract are merged first
+        merge_normalized_parts(logger=logger)
+
         conn = get_postgres_connection()
-        
-        # Execute schema creation
+        ensure_etl_state_tables(conn)
+
+        # Compare every source file against the load ledger
+        fingerprints = check_sources(conn, logger)
+        if fingerprints is None:
+            return
+        load_paths, quarantines = validate_sources(conn, logger)
+
+        # Execute schema creation inside the staging schema
         if not SQL_SCHEMA_PATH.exists():
             raise FileNotFoundError(f"Schema SQL file not found: {SQL_SCHEMA_PATH}")
-        logger.info(f"Executing schema creation from {SQL_SCHEMA_PATH}")
-        execute_schema_file(conn, SQL_SCHEMA_PATH)
-        
-        # CSV mappings: (csv_file, table_name, columns_order)
-        csv_mappings = [
-            (DATA_PROCESSED_DIR / "content.csv", "content", "content_id, title, type, rating, production_budget"),
-            (DATA_PROCESSED_DIR / "movie_details.csv", "movie_details", "content_id, duration_minutes, release_year, views_count"),
-            (DATA_PROCESSED_DIR / "series_details.csv", "series_details", "content_id, seasons, avg_episode_duration, total_views"),
-            (DATA_PROCESSED_DIR / "content_genres.csv", "content_genres", "content_id, genre"),
-            (DATA_PROCESSED_DIR / "series_episodes.csv", "series_episodes", "content_id, season, episode_count")
-        ]
-        
-        for csv_path, table_name, columns in csv_mappings:
-            if not csv_path.exists():
-                raise FileNotFoundError(f"CSV not found: {csv_path}")
-            
-            # Check if table already contains data
+        logger.info(f"Executing schema creation from {SQL_SCHEMA_PATH} in schema {STAGE_SCHEMA}")
+        prepare_stage_schema(conn, SQL_SCHEMA_PATH)
+        table_names = [mapping[1] for mapping in NORMALIZED_MAPPINGS]
+
+        levels = dependency_levels(NORMALIZED_MAPPINGS)
+        if BULK_LOAD_DEFERRED_DDL:
+            # Strip the staged tables down to bare heaps; nothing orders the loads any more
             cursor = conn.cursor()
-            cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
-            row_count = cursor.fetchone()[0]
-            if row_count > 0:
-                logger.info(f"Table {table_name} already contains {row_count} rows, skipping load")
-                cursor.close()
-                continue
-            
-            logger.info(f"Loading {csv_path} into {table_name}")
-            with open(csv_path, 'r') as f:
-                cursor.copy_expert(
-                    f"COPY {table_name} ({columns}) FROM STDIN WITH CSV HEADER",
-                    f
-                )
-            logger.info(f"Successfully loaded {csv_path} into {table_name}")
+            deferred = capture_ddl(cursor, [f"{STAGE_SCHEMA}.{t}" for t in table_names])
+            drop_ddl(cursor, deferred)
+            conn.commit()
             cursor.close()
-        
-        conn.commit()
+            levels = [NORMALIZED_MAPPINGS]
+
+        # Load level by level; tables within a level run concurrently
+        start = time.perf_counter()
+        rows_loaded: Dict[str, int] = {}
+        reject_logs = {
+            table_name: reject_log_for(load_paths[csv_path], table_name, columns)
+            for csv_path, table_name, columns, parents in NORMALIZED_MAPPINGS
+        }
+        workers = clamp_workers("the normalized tables", LOAD_WORKERS, logger)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for level in levels:
+                logger.info(f"Loading {[m[1] for m in level]} with up to {workers} workers")
+                futures = [executor.submit(copy_into_stage, load_paths[csv_path], table_name, columns,
+                                           reject_logs[table_name])
+                           for csv_path, table_name, columns, parents in level]
+                for future in futures:
+                    table_name, rows, size, elapsed = future.result()
+                    rows_loaded[table_name] = rows
+                    log_staged(logger, table_name, rows, size, elapsed, reject_logs[table_name])
+        add_time("copy", time.perf_counter() - start)
+        logger.info(f"Staged all normalized tables in {time.perf_counter() - start:.2f}s (pool: {pool_stats()})")
+
+        # The rebuild commits with the publish: a failing constraint leaves the live tables as they were
+        if BULK_LOAD_DEFERRED_DDL:
+            cursor = conn.cursor()
+            timings = restore_ddl(cursor, deferred, logger)
+            add_time("restore_ddl", sum(timings.values()))
+            cursor.close()
+            logger.info(f"Built staged indexes and constraints in {sum(timings.values()):.2f}s")
+
+        publish(conn, fingerprints, rows_loaded, logger, quarantines)
         logger.info("Normalized CSV loading process completed")
-        
+
     except Exception as e:
         logger.error(f"Error loading normalized CSVs: {e}")
         if 'conn' in locals():
             conn.rollback()
+        if 'quarantines' in locals():
+            for quarantine in quarantines:
+                quarantine.discard()
+        sys.exit(1)
+    finally:
+        if 'conn' in locals():
+            conn.close()
+
+# Fanned-out entry points for the DAG: prepare_load, then one stage_table task per table
+# (Airflow dynamic task mapping), then publish_load once every table has been staged
+@instrumented("prepare_normalized_load")
+def prepare_load(ti=None) -> List[Dict[str, Any]]:
+    """
+    Merge the per-collection parts, check the ledger, validate and create the staging schema
+    with its tables stripped to bare heaps (the stage tasks may run in any order).
+    Returns the stage_table kwargs per table (none when nothing changed). Under Airflow the
+    dropped DDL, the source fingerprints and the validation results (for publish_load to record
+    and publish their quarantines) are pushed as the 'ddl', 'fingerprints' and 'quarantines' XComs.
+    """
+    logger = setup_logger(__name__, log_file=PROJECT_ROOT / "logs" / "load_normalized_csvs.log")
+    (PROJECT_ROOT / "logs").mkdir(exist_ok=True)
+
+    try:
+        merge_normalized_parts(logger=logger)
+
+        conn = get_postgres_connection()
+        ensure_etl_state_tables(conn)
+        fingerprints = check_sources(conn, logger)
+        if fingerprints is None:
+            return []
+        load_paths, quarantines = validate_sources(conn, logger)
+
+        if not SQL_SCHEMA_PATH.exists():
+            raise FileNotFoundError(f"Schema SQL file not found: {SQL_SCHEMA_PATH}")
+        logger.info(f"Executing schema creation from {SQL_SCHEMA_PATH} in schema {STAGE_SCHEMA}")
+        prepare_stage_schema(conn, SQL_SCHEMA_PATH)
+        cursor = conn.cursor()
+        deferred = capture_ddl(cursor, [f"{STAGE_SCHEMA}.{mapping[1]}" for mapping in NORMALIZED_MAPPINGS])
+        drop_ddl(cursor, deferred)
+        conn.commit()
+        cursor.close()
+
+        if ti is not None:
+            ti.xcom_push(key='ddl', value=deferred.to_dict())
+            ti.xcom_push(key='fingerprints', value=fingerprints)
+            ti.xcom_push(key='quarantines', value=[quarantine.to_dict() for quarantine in quarantines])
+        return [{'csv_path': str(load_paths[csv_path]), 'table_name': table_name, 'columns': columns}
+                for csv_path, table_name, columns, parents in NORMALIZED_MAPPINGS]
+
+    except Exception as e:
+        logger.error(f"Error preparing normalized load: {e}")
+        if 'conn' in locals():
+            conn.rollback()
+        if 'quarantines' in locals():
+            for quarantine in quarantines:
+                quarantine.discard()
+        sys.exit(1)
+    finally:
+        if 'conn' in locals():
+            conn.close()
+
+@instrumented("stage_normalized_table")
+def stage_table(csv_path: str, table_name: str, columns: str) -> Dict[str, Any]:
+    """COPY one normalized CSV into its bare staged table. Returns {'table_name': ..., 'rows': ...}."""
+    logger = setup_logger(__name__, log_file=PROJECT_ROOT / "logs" / "load_normalized_csvs.log")
+    try:
+        load_path = Path(csv_path)
+        reject_log = reject_log_for(load_path, table_name, columns)
+        with span("copy"):
+            table_name, rows, size, elapsed = copy_into_stage(load_path, table_name, columns, reject_log)
+        log_staged(logger, table_name, rows, size, elapsed, reject_log)
+        return {'table_name': table_name, 'rows': rows}
+    except Exception as e:
+        logger.error(f"Error staging {table_name}: {e}")
+        sys.exit(1)
+
+@instrumented("publish_normalized_load")
+def publish_load(ddl: Optional[Dict[str, Any]], fingerprints: Dict[str, Dict[str, Any]],
+                 staged: List[Dict[str, Any]], quarantines: Optional[List[Dict[str, Any]]] = None) -> None:
+    """
+    Rebuild the staged tables' keys, indexes and constraints, then publish them with their
+    ledger entries and quarantined rows, all in one transaction.
+    """
+    logger = setup_logger(__name__, log_file=PROJECT_ROOT / "logs" / "load_normalized_csvs.log")
+    try:
+        staged = list(staged or [])
+        if not staged:
+            logger.info("No normalized tables staged, nothing to publish")
+            return
+        results = [ValidationResult.from_dict(quarantine) for quarantine in quarantines or []]
+        rows_loaded = {result['table_name']: result['rows'] for result in staged}
+        missing = [mapping[1] for mapping in NORMALIZED_MAPPINGS if mapping[1] not in rows_loaded]
+        if missing:
+            raise RuntimeError(f"Normalized tables not staged: {missing}")
+
+        conn = get_postgres_connection()
+        if ddl:
+            cursor = conn.cursor()
+            timings = restore_ddl(cursor, DeferredDdl.from_dict(ddl), logger)
+            add_time("restore_ddl", sum(timings.values()))
+            cursor.close()
+            logger.info(f"Built staged indexes and constraints in {sum(timings.values()):.2f}s")
+        publish(conn, fingerprints, rows_loaded, logger, results)
+        logger.info("Normalized CSV loading process completed")
+
+    except Exception as e:
+        logger.error(f"Error publishing normalized tables: {e}")
+        if 'conn' in locals():
+            conn.rollback()
+        if 'results' in locals():
+            for result in results:
+                result.discard()
         sys.exit(1)
     finally:
         if 'conn' in locals():
             conn.close()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Script to materialize the nosql/mongodb_queries aggregations into summary collections with $merge:
+  summary_movies_by_release_year - Query 1 (avg rating/budget per release_year)
+  summary_movie_genre_views      - Query 2 ($unwind genre, total views per genre)
+  summary_series_genre_stats     - Query 3 (total views/avg budget per genre, unwound per genre)
+Only groups touched by documents updated since the last run (per-collection updated_at watermark
+in etl_watermarks, re-read with the incremental sync's overlap window) are recomputed; a first
+run or a full reload of a collection recomputes everything. The group keys each document last
+contributed to are kept in summary_keys_<collection>, so a document that moved to another
+release_year or genre also gets its old groups recomputed.
+Dashboards then read the summaries with indexed find() calls, e.g.
+summary_movie_genre_views.find().sort('total_views', -1).limit(3).
+Run via Airflow: Automated and scheduled via DAG.
+Best practices: Error handling, structured logging, modular connections, idempotency.
+"""
+import os
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+# Add project root to sys.path for module imports
+SCRIPT_PATH = Path(__file__).resolve()
+PROJECT_ROOT = SCRIPT_PATH.parent.parent  # scripts -> video_streaming_pipeline
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from pymongo import ASCENDING, DESCENDING, ReplaceOne
+
+from utils.db_connections import get_mongo_client, get_postgres_connection
+from utils.etl_state import bump_data_version, ensure_etl_state_tables, get_watermark, set_watermark
+from utils.logger import setup_logger
+from utils.metrics import count, instrumented, span, timed_iter
+from utils.query_cache import invalidate_data_versions
+
+from scripts.incremental_content_sync import advance_watermark, build_watermark_query
+
+WATERMARK_PREFIX = "mongo_summaries"
+# Per-document group keys from the last refresh: summary_keys_<collection>, _id = source _id
+KEYS_COLLECTION_PREFIX = "summary_keys_"
+# Changed documents whose previous group keys are looked up per query
+KEYS_BATCH_SIZE = int(os.getenv('SUMMARY_KEYS_BATCH_SIZE', '1000'))
+
+# Summary collections: source collection, group key (unwound when it is an array),
+# $group accumulators and the indexes dashboard reads sort/filter on
+SUMMARIES = [
+    {
+        'name': 'summary_movies_by_release_year',
+        'source': 'movies',
+        'key': 'release_year',
+        'unwind': False,
+        'group': {
+            'avg_rating': {'$avg': '$rating'},
+            'avg_budget': {'$avg': '$production_budget'},
+            'movie_count': {'$sum': 1},
+        },
+        'indexes': [[('avg_budget', DESCENDING)], [('avg_rating', ASCENDING)]],
+    },
+    {
+        'name': 'summary_movie_genre_views',
+        'source': 'movies',
+        'key': 'genre',
+        'unwind': True,
+        'group': {'total_views': {'$sum': '$views_count'}},
+        'indexes': [[('total_views', DESCENDING)]],
+    },
+    {
+        'name': 'summary_series_genre_stats',
+        'source': 'series',
+        'key': 'genre',
+        'unwind': True,
+        'group': {
+            'total_views': {'$sum': '$total_views'},
+            'avg_budget': {'$avg': '$production_budget'},
+        },
+        'indexes': [[('total_views', DESCENDING)], [('avg_budget', DESCENDING)]],
+    },
+]
+
+def summary_pipeline(summary: Dict[str, Any], keys: Optional[List[Any]]) -> List[Dict[str, Any]]:
+    """Aggregation recomputing the summary groups in `keys` (all groups if None) and merging them."""
+    key = summary['key']
+    pipeline: List[Dict[str, Any]] = []
+    if keys is not None:
+        pipeline.append({'$match': {key: {'$in': keys}}})
+    if summary['unwind']:
+        pipeline.append({'$unwind': f"${key}"})
+        if keys is not None:
+            # Unwinding brings back the documents' other array values; keep only touched groups
+            pipeline.append({'$match': {key: {'$in': keys}}})
+    pipeline.append({'$group': {'_id': f"${key}", **summary['group']}})
+    pipeline.append({'$set': {'refreshed_at': '$$NOW'}})
+    pipeline.append({'$merge': {'into': summary['name'], 'on': '_id',
+                                'whenMatched': 'replace', 'whenNotMatched': 'insert'}})
+    return pipeline
+
+def group_values(summary: Dict[str, Any], value: Any) -> List[Any]:
+    """The summary groups a document's key value contributes to."""
+    values = value if summary['unwind'] and isinstance(value, list) else [value]
+    return [v for v in values if v is not None]
+
+def add_previous_keys(keys_collection, summaries: List[Dict[str, Any]], ids: List[Any],
+                      touched: Dict[str, Set[Any]]) -> None:
+    """Add the groups the given documents contributed to at the last refresh to `touched`."""
+    for previous in keys_collection.find({'_id': {'$in': ids}}):
+        for summary in summaries:
+            touched[summary['name']].update(group_values(summary, previous.get(summary['key'])))
+
+def refresh_summary(db, summary: Dict[str, Any], keys: Optional[List[Any]], logger) -> None:
+    """Recompute the given groups of one summary and drop groups that no longer have documents."""
+    source = db[summary['source']]
+    target = db[summary['name']]
+    for index in summary['indexes']:
+        target.create_index(index)
+
+    source.aggregate(summary_pipeline(summary, keys))
+
+    key = summary['key']
+    present = source.distinct(key, {key: {'$in': keys}} if keys is not None else {})
+    if keys is None:
+        removed = target.delete_many({'_id': {'$nin': present}}).deleted_count
+    else:
+        removed = target.delete_many({'_id': {'$in': [k for k in keys if k not in present]}}).deleted_count
+    scope = 'all groups' if keys is None else f"{len(keys)} groups"
+    logger.info(f"Refreshed {summary['name']} ({scope}, {removed} stale removed)")
+
+@instrumented("refresh_mongo_summaries")
+def main():
+    logger = setup_logger(__name__, log_file=PROJECT_ROOT / "logs" / "refresh_mongo_summaries.log")
+
+    # Ensure logs dir exists
+    (PROJECT_ROOT / "logs").mkdir(exist_ok=True)
+
+    try:
+        client = get_mongo_client()
+        db = client[os.getenv('MONGO_DB', 'video_streaming')]
+        conn = get_postgres_connection()
+        ensure_etl_state_tables(conn)
+        cursor = conn.cursor()
+
+        for collection in sorted({summary['source'] for summary in SUMMARIES}):
+            summaries = [summary for summary in SUMMARIES if summary['source'] == collection]
+            source = f"{WATERMARK_PREFIX}:{collection}"
+            mark = get_watermark(cursor, source)
+            query = build_watermark_query(mark)
+            db[collection].create_index("updated_at")
+
+            keys_collection = db[f"{KEYS_COLLECTION_PREFIX}{collection}"]
+            group_keys = [summary['key'] for summary in summaries]
+            if keys_collection.find_one({}, {'_id': 1}) is None:
+                # No document's previous group keys are known yet: read (and record) everything
+                query = {}
+
+            # One pass over the changed documents: touched group keys (current and previous)
+            # and the next watermark. The new keys are stored only after the refresh succeeded.
+            touched: Dict[str, Set[Any]] = {summary['name']: set() for summary in summaries}
+            projection = {'_id': 1, 'updated_at': 1, **{key: 1 for key in group_keys}}
+            changed = 0
+            batch: List[Any] = []
+            key_updates = []
+            for doc in timed_iter(db[collection].find(query, projection), "extract"):
+                changed += 1
+                for summary in summaries:
+                    touched[summary['name']].update(group_values(summary, doc.get(summary['key'])))
+                key_updates.append(ReplaceOne({'_id': doc['_id']}, {key: doc.get(key) for key in group_keys},
+                                              upsert=True))
+                batch.append(doc['_id'])
+                if len(batch) >= KEYS_BATCH_SIZE:
+                    add_previous_keys(keys_collection, summaries, batch, touched)
+                    batch = []
+                advance_watermark(mark, doc)
+            if batch:
+                add_previous_keys(keys_collection, summaries, batch, touched)
+
+            if not changed:
+                logger.info(f"No changes in '{collection}' since the last refresh")
+                continue
+            # A first run or a reloaded collection (every document new) is recomputed in full
+            full = not query or changed >= db[collection].estimated_document_count()
+            logger.info(f"{changed} changed documents in '{collection}' ({'full' if full else 'incremental'} refresh)")
+            count("documents", changed)
+            with span("aggregate"):
+                for summary in summaries:
+                    refresh_summary(db, summary, None if full else sorted(touched[summary['name']]), logger)
+            with span("group_keys"):
+                if full:
+                    # Every document was read, so this also forgets deleted ones
+                    keys_collection.delete_many({})
+                for start in range(0, len(key_updates), KEYS_BATCH_SIZE):
+                    keys_collection.bulk_write(key_updates[start:start + KEYS_BATCH_SIZE], ordered=False)
+
+            set_watermark(cursor, source, None, mark['last_updated_at'])
+            bump_data_version(cursor, "mongo.summaries")
+            conn.commit()
+            invalidate_data_versions("mongo.summaries")
+
+        cursor.close()
+        logger.info("Mongo summary refresh completed")
+
+    except Exception as e:
+        logger.error(f"Error refreshing Mongo summaries: {e}")
+        if 'conn' in locals():
+            conn.rollback()
+        sys.exit(1)
+    finally:
+        if 'conn' in locals():
+            conn.close()
+
+if __name__ == "__main__":
+    main()
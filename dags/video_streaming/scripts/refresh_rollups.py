@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Script to refresh the pre-aggregated rollup tables behind the sql/scripts.sql reports.
+Only the watch months marked dirty by the latest loads (etl_dirty_months) are recomputed,
+one month at a time so each pass reads a single viewing_sessions partition; a full refresh
+runs when a load changed everything (e.g. users reloaded) or the rollups are still empty.
+The small report tables (top content by country, retention) are then rebuilt from the rollups.
+Run via Airflow: Automated and scheduled via DAG.
+Best practices: Error handling, structured logging, modular connections, single transaction.
+"""
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+# Add project root to sys.path for module imports
+SCRIPT_PATH = Path(__file__).resolve()
+PROJECT_ROOT = SCRIPT_PATH.parent.parent  # scripts -> video_streaming_pipeline
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from utils.db_connections import get_postgres_connection
+from utils.etl_state import bump_data_version, claim_dirty_months, ensure_etl_state_tables, table_has_rows
+from utils.logger import setup_logger
+from utils.metrics import instrumented, span
+from utils.partitions import add_months
+from utils.query_cache import invalidate_data_versions
+
+# SQL files
+ROLLUP_SCHEMA_PATH = PROJECT_ROOT / "sql" / "create_rollup_tables.sql"
+REFRESH_SQL_PATH = PROJECT_ROOT / "sql" / "refresh_rollups.sql"
+REPORTS_SQL_PATH = PROJECT_ROOT / "sql" / "rebuild_rollup_reports.sql"
+
+@instrumented("refresh_rollups")
+def main():
+    logger = setup_logger(__name__, log_file=PROJECT_ROOT / "logs" / "refresh_rollups.log")
+
+    # Ensure logs dir exists
+    (PROJECT_ROOT / "logs").mkdir(exist_ok=True)
+
+    try:
+        conn = get_postgres_connection()
+        ensure_etl_state_tables(conn)
+        cursor = conn.cursor()
+
+        with open(ROLLUP_SCHEMA_PATH, 'r') as f:
+            cursor.execute(f.read())
+        with open(REFRESH_SQL_PATH, 'r') as f:
+            refresh_sql = f.read()
+        with open(REPORTS_SQL_PATH, 'r') as f:
+            reports_sql = f.read()
+
+        full_refresh, months = claim_dirty_months(cursor)
+        if not full_refresh and not table_has_rows(cursor, "rollup_viewing_monthly"):
+            full_refresh = table_has_rows(cursor, "viewing_sessions")
+        if not full_refresh and not months:
+            logger.info("No dirty months, rollups are up to date")
+            conn.commit()
+            return
+
+        start = time.perf_counter()
+        with span("refresh"):
+            if full_refresh:
+                logger.info("Recomputing all rollups")
+                cursor.execute(refresh_sql, {'lower': date.min, 'upper': date.max})
+            else:
+                for month in months:
+                    month_start = time.perf_counter()
+                    cursor.execute(refresh_sql, {'lower': month, 'upper': add_months(month, 1)})
+                    logger.info(f"Refreshed rollups for {month:%Y-%m} in {time.perf_counter() - month_start:.2f}s")
+        with span("reports"):
+            cursor.execute(reports_sql)
+        bump_data_version(cursor, "rollups")
+        with span("commit"):
+            conn.commit()
+        invalidate_data_versions("rollups")
+        cursor.close()
+        logger.info(f"Rollups refreshed ({'full' if full_refresh else f'{len(months)} months'}) "
+                    f"in {time.perf_counter() - start:.2f}s")
+
+    except Exception as e:
+        logger.error(f"Error refreshing rollups: {e}")
+        if 'conn' in locals():
+            conn.rollback()
+        sys.exit(1)
+    finally:
+        if 'conn' in locals():
+            conn.close()
+
+if __name__ == "__main__":
+    main()
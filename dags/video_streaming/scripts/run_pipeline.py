@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Script to run the whole ETL pipeline in a single process, outside Airflow.
+Runs the same stages as dag.py in dependency order: the Postgres CSV branch and the Mongo
+branch (and, after the JSON load, the summary refresh alongside the content load) run on
+concurrent threads, every stage shares the process-wide PostgreSQL pool and MongoDB client,
+and modules, dotenv and loggers are loaded once. For small daily deltas this avoids paying
+process startup, imports and connection setup per task.
+Prints a per-stage timing summary (start offset, duration, status), so it doubles as a
+local performance harness; per-stage metrics are recorded as usual (utils/metrics.py).
+Usage: python scripts/run_pipeline.py [--content-mode csv|stream|incremental] [--skip-export]
+Best practices: Error handling, structured logging, modular connections, pathlib for paths.
+"""
+import argparse
+import contextvars
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+# Add project root to sys.path for module imports
+SCRIPT_PATH = Path(__file__).resolve()
+PROJECT_ROOT = SCRIPT_PATH.parent.parent  # scripts -> video_streaming_pipeline
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from utils.db_connections import (
+    close_mongo_client,
+    close_postgres_pools,
+    get_postgres_connection,
+    pool_stats,
+    use_shared_postgres_pool,
+)
+from utils.etl_state import ensure_etl_state_tables
+from utils.logger import setup_logger
+from utils.metrics import add_time, instrumented, peak_rss_mb
+from utils.task_callables import resolve_callable
+
+# Pool size for the whole run: the concurrent stages and their COPY workers share it
+PIPELINE_POOL_MAX = int(os.getenv('PIPELINE_POOL_MAX', '16'))
+
+# Stage name -> ("module:function", upstream stages); listed in a valid run order
+Stages = Dict[str, Tuple[str, Tuple[str, ...]]]
+
+CONTENT_STAGES: Dict[str, Stages] = {
+    'csv': {
+        'extract_mongo_to_csv': ("scripts.extract_mongo_to_csv:extract_and_normalize", ('load_json_to_mongo',)),
+        'load_normalized_jsons_to_postgres': ("scripts.load_normalized_jsons_to_postgres:main",
+                                              ('extract_mongo_to_csv',)),
+    },
+    'stream': {
+        'stream_mongo_to_postgres': ("scripts.stream_mongo_to_postgres:main", ('load_json_to_mongo',)),
+    },
+    'incremental': {
+        'incremental_content_sync': ("scripts.incremental_content_sync:main", ('load_json_to_mongo',)),
+    },
+}
+
+def pipeline_stages(content_mode: str, export: bool = True) -> Stages:
+    """The DAG's tasks and dependencies for a content load mode."""
+    if content_mode not in CONTENT_STAGES:
+        raise ValueError(f"Unknown content mode {content_mode!r}, expected one of {sorted(CONTENT_STAGES)}")
+    stages: Stages = {
+        'create_postgres_tables': ("scripts.create_postgres_tables:main", ()),
+        'load_csvs_to_postgres': ("scripts.load_csvs_to_postgres:main", ('create_postgres_tables',)),
+        'refresh_rollups': ("scripts.refresh_rollups:main", ('load_csvs_to_postgres',)),
+        'create_mongodb_collections': ("scripts.create_mongodb_collections:main", ()),
+        'load_json_to_mongo': ("scripts.load_json_to_mongo:main", ('create_mongodb_collections',)),
+        'refresh_mongo_summaries': ("scripts.refresh_mongo_summaries:main", ('load_json_to_mongo',)),
+    }
+    stages.update(CONTENT_STAGES[content_mode])
+    if export:
+        stages['export_analytical_tables'] = ("scripts.export_analytical_tables:main",
+                                              ('refresh_rollups', list(CONTENT_STAGES[content_mode])[-1]))
+    return stages
+
+def run_stage(name: str, target: str, run_start: float, logger) -> Dict[str, Any]:
+    """Import and call one stage; scripts report failure by exiting, which is caught here."""
+    start = time.perf_counter()
+    status, error = 'success', None
+    try:
+        resolve_callable(target)()
+    except SystemExit as e:
+        if e.code not in (None, 0):
+            status, error = 'failed', f"exit code {e.code}"
+    except Exception as e:
+        status, error = 'failed', f"{type(e).__name__}: {e}"
+    seconds = time.perf_counter() - start
+    add_time(name, seconds)
+    if error:
+        logger.error(f"Stage {name} failed after {seconds:.2f}s: {error}")
+    else:
+        logger.info(f"Stage {name} finished in {seconds:.2f}s")
+    return {'status': status, 'start': start - run_start, 'seconds': seconds, 'error': error}
+
+def run_stages(stages: Stages, logger) -> Dict[str, Dict[str, Any]]:
+    """
+    Run every stage once its upstream stages succeeded, each on its own thread; stages
+    downstream of a failure are skipped. Returns status, start offset and seconds per stage.
+    """
+    results: Dict[str, Dict[str, Any]] = {}
+    running = {}
+    run_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(stages), thread_name_prefix="stage") as executor:
+        while len(results) < len(stages):
+            for name, (target, upstream) in stages.items():
+                if name in results or name in running.values():
+                    continue
+                upstream_status = [results[u]['status'] if u in results else None for u in upstream]
+                if any(status in ('failed', 'skipped') for status in upstream_status):
+                    results[name] = {'status': 'skipped', 'start': None, 'seconds': 0.0, 'error': None}
+                elif all(status == 'success' for status in upstream_status):
+                    # Pool threads do not inherit context variables: run each stage in a copy of
+                    # this context, so its add_time lands in run_pipeline's metrics
+                    running[executor.submit(contextvars.copy_context().run,
+                                            run_stage, name, target, run_start, logger)] = name
+            if not running:
+                if len(results) < len(stages):
+                    raise ValueError(f"Unsatisfiable stage dependencies: {sorted(set(stages) - set(results))}")
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[running.pop(future)] = future.result()
+    return results
+
+def format_summary(stages: Stages, results: Dict[str, Dict[str, Any]], wall_seconds: float) -> List[str]:
+    """
+    Per-stage timing table, in run order, with the overlap the concurrent branches gained.
+    Stages share one process, so only the peak RSS of the whole run is known, not a per-stage one.
+    """
+    width = max(len(name) for name in stages)
+    lines = [f"{'stage':<{width}}  {'status':<8}  {'start':>8}  {'seconds':>8}"]
+    for name in sorted(stages, key=lambda n: (results[n]['start'] is None, results[n]['start'] or 0.0)):
+        result = results[name]
+        start = f"{result['start']:.2f}" if result['start'] is not None else '-'
+        lines.append(f"{name:<{width}}  {result['status']:<8}  {start:>8}  {result['seconds']:>8.2f}")
+    stage_seconds = sum(result['seconds'] for result in results.values())
+    lines.append(f"wall time {wall_seconds:.2f}s, sum of stages {stage_seconds:.2f}s "
+                 f"({stage_seconds / max(wall_seconds, 1e-9):.2f}x from concurrent branches)")
+    lines.append(f"peak RSS {peak_rss_mb():.1f} MB (process lifetime, shared by all stages)")
+    return lines
+
+@instrumented("run_pipeline")
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the ETL pipeline in one process")
+    parser.add_argument('--content-mode', default=os.getenv('CONTENT_LOAD_MODE', 'csv'),
+                        choices=sorted(CONTENT_STAGES), help="content branch mode, as CONTENT_LOAD_MODE in dag.py")
+    parser.add_argument('--skip-export', action='store_true', help="do not run export_analytical_tables")
+    args = parser.parse_args(argv)
+
+    logger = setup_logger(__name__, log_file=PROJECT_ROOT / "logs" / "run_pipeline.log")
+
+    # Ensure logs dir exists
+    (PROJECT_ROOT / "logs").mkdir(exist_ok=True)
+
+    try:
+        use_shared_postgres_pool(PIPELINE_POOL_MAX)
+        # Created once up front, so the concurrent branches do not race to create them
+        conn = get_postgres_connection()
+        ensure_etl_state_tables(conn)
+        conn.close()
+
+        stages = pipeline_stages(args.content_mode, export=not args.skip_export)
+        logger.info(f"Running {len(stages)} stages in one process (content mode {args.content_mode})")
+        start = time.perf_counter()
+        results = run_stages(stages, logger)
+        wall_seconds = time.perf_counter() - start
+
+        for line in format_summary(stages, results, wall_seconds):
+            logger.info(line)
+        logger.info(f"Connection pools: {pool_stats()}")
+
+        failed = [name for name, result in results.items() if result['status'] == 'failed']
+        if failed:
+            raise RuntimeError(f"Stages failed: {failed}")
+        logger.info("Pipeline run completed")
+
+    except Exception as e:
+        logger.error(f"Error running pipeline: {e}")
+        sys.exit(1)
+    finally:
+        close_postgres_pools()
+        close_mongo_client()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Script to normalize MongoDB content (movies and series) and load it straight into
+the normalized PostgreSQL tables, without the intermediate CSV files in data/processed/.
+Rows are streamed into one in-memory COPY buffer per target table
+(content, movie_details, series_details, content_genres, series_episodes).
+Set WRITE_AUDIT_CSV=true to also write the processed CSVs as an audit artifact.
+Tables listed in BINARY_COPY_TABLES are streamed with binary COPY instead of CSV.
+Run via Airflow: Fused replacement for extract_mongo_to_csv + load_normalized_jsons_to_postgres.
+Best practices: Error handling, structured logging, modular connections, single transaction.
+"""
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Union
+
+# Add project root to sys.path for module imports
+SCRIPT_PATH = Path(__file__).resolve()
+PROJECT_ROOT = SCRIPT_PATH.parent.parent  # scripts -> video_streaming_pipeline
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from utils.db_connections import get_mongo_client, get_postgres_connection
+from utils.etl_state import bump_data_version, ensure_etl_state_tables
+from utils.logger import setup_logger
+from utils.metrics import add_time, count, instrumented, span
+from utils.pg_copy import BinaryCopyBuffer, CopyBuffer, open_copy_buffer
+from utils.query_cache import invalidate_data_versions
+
+from scripts.extract_mongo_to_csv import (
+    DATA_PROCESSED_DIR,
+    NORMALIZED_TABLES,
+    PROGRESS_EVERY,
+    NormalizedCsvWriter,
+    iter_normalized_rows,
+)
+from scripts.load_normalized_jsons_to_postgres import SQL_SCHEMA_PATH, execute_schema_file
+
+WRITE_AUDIT_CSV = os.getenv('WRITE_AUDIT_CSV', 'false').lower() == 'true'
+
+
+def flush_buffers(cursor, buffers: Dict[str, Union[CopyBuffer, BinaryCopyBuffer]]) -> None:
+    """
+    Flush every buffer, parent table first.
+    Child rows are only buffered after their content row, so flushing content
+    first guarantees the foreign keys resolve.
+    """
+    for buffer in buffers.values():
+        buffer.flush(cursor)
+
+
+@instrumented("stream_mongo_to_postgres")
+def main():
+    logger = setup_logger(__name__, log_file=PROJECT_ROOT / "logs" / "stream_mongo_to_postgres.log")
+
+    # Ensure logs dir exists
+    (PROJECT_ROOT / "logs").mkdir(exist_ok=True)
+
+    try:
+        client = get_mongo_client()
+        db = client[os.getenv('MONGO_DB', 'video_streaming')]
+        conn = get_postgres_connection()
+        ensure_etl_state_tables(conn)
+
+        if not SQL_SCHEMA_PATH.exists():
+            raise FileNotFoundError(f"Schema SQL file not found: {SQL_SCHEMA_PATH}")
+        logger.info(f"Executing schema creation from {SQL_SCHEMA_PATH}")
+        execute_schema_file(conn, SQL_SCHEMA_PATH)
+
+        # NORMALIZED_TABLES is ordered parent first
+        cursor = conn.cursor()
+        buffers = {table: open_copy_buffer(cursor, table, columns) for table, columns in NORMALIZED_TABLES.items()}
+        audit = NormalizedCsvWriter(DATA_PROCESSED_DIR) if WRITE_AUDIT_CSV else None
+
+        docs = 0
+        start = time.perf_counter()
+        try:
+            for table, row in iter_normalized_rows(db, logger):
+                buffer = buffers[table]
+                buffer.write(row)
+                if audit:
+                    audit.write(table, row)
+                if buffer.is_full():
+                    flush_buffers(cursor, buffers)
+                if table == 'content':
+                    docs += 1
+                    if docs % PROGRESS_EVERY == 0:
+                        total_rows = sum(b.rows_copied + b.rows_buffered for b in buffers.values())
+                        logger.info(f"Streamed {docs} documents, {total_rows} rows "
+                                    f"({total_rows / (time.perf_counter() - start):,.0f} rows/sec)")
+            flush_buffers(cursor, buffers)
+        except BaseException:
+            if audit:
+                audit.abort()
+            raise
+
+        if not docs:
+            logger.warning("No data found in MongoDB collections")
+
+        add_time("stream", time.perf_counter() - start)
+        bump_data_version(cursor, "content")
+        cursor.close()
+        with span("commit"):
+            conn.commit()
+        invalidate_data_versions("content")
+        elapsed = time.perf_counter() - start
+        for buffer in buffers.values():
+            logger.info(f"Loaded {buffer.rows_copied} rows into {buffer.table}")
+        total_rows = sum(b.rows_copied for b in buffers.values())
+        count("documents", docs)
+        count("rows", total_rows)
+        count("bytes", sum(b.bytes_copied for b in buffers.values()))
+        logger.info(f"Streamed {docs} documents into {total_rows} rows in {elapsed:.2f}s "
+                    f"({total_rows / max(elapsed, 1e-9):,.0f} rows/sec)")
+
+        if audit:
+            audit.close(logger)
+
+        logger.info("Mongo to Postgres streaming load completed")
+
+    except Exception as e:
+        logger.error(f"Error streaming MongoDB content to Postgres: {e}")
+        if 'conn' in locals():
+            conn.rollback()
+        sys.exit(1)
+    finally:
+        if 'conn' in locals():
+            conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+-- Pipeline state tables (safe to run repeatedly)
+
+-- Per-source extraction watermark for incremental loads
+CREATE TABLE IF NOT EXISTS etl_watermarks (
+    source VARCHAR(100) PRIMARY KEY,
+    last_object_id VARCHAR(24),
+    last_updated_at TIMESTAMPTZ,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Fingerprint of the last source file loaded into each target (table or collection)
+CREATE TABLE IF NOT EXISTS etl_load_ledger (
+    target VARCHAR(100) PRIMARY KEY,
+    source_path TEXT NOT NULL,
+    sha256 CHAR(64) NOT NULL,
+    size_bytes BIGINT NOT NULL,
+    mtime DOUBLE PRECISION NOT NULL,
+    rows_loaded BIGINT,
+    loaded_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Months of viewing data changed by a load and not yet folded into the rollups
+-- (month NULL means everything must be recomputed)
+CREATE TABLE IF NOT EXISTS etl_dirty_months (
+    id BIGSERIAL PRIMARY KEY,
+    source VARCHAR(100) NOT NULL,
+    month DATE,
+    marked_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Data version per source, bumped by every load that changes it; query caches key on it
+CREATE TABLE IF NOT EXISTS etl_data_versions (
+    source VARCHAR(100) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Rows rejected by pre-load validation, with the rules they failed
+CREATE TABLE IF NOT EXISTS etl_quarantine (
+    id BIGSERIAL PRIMARY KEY,
+    table_name VARCHAR(100) NOT NULL,
+    source_path TEXT NOT NULL,
+    line_number BIGINT,
+    row_data JSONB NOT NULL,
+    reasons TEXT NOT NULL,
+    quarantined_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+CREATE INDEX IF NOT EXISTS idx_etl_quarantine_table ON etl_quarantine(table_name, quarantined_at);
+
+-- One row per task run: duration, rows/bytes processed, peak memory and per-phase timings
+CREATE TABLE IF NOT EXISTS etl_task_metrics (
+    id BIGSERIAL PRIMARY KEY,
+    task VARCHAR(100) NOT NULL,
+    run_id VARCHAR(250),
+    status VARCHAR(20) NOT NULL,
+    started_at TIMESTAMPTZ NOT NULL,
+    duration_seconds DOUBLE PRECISION NOT NULL,
+    rows_processed BIGINT,
+    bytes_processed BIGINT,
+    peak_rss_mb DOUBLE PRECISION,
+    spans JSONB NOT NULL DEFAULT '{}',
+    counters JSONB NOT NULL DEFAULT '{}',
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_etl_task_metrics_task ON etl_task_metrics(task, started_at);
@@ -0,0 +1,87 @@
+-- Pre-aggregated rollups behind the sql/scripts.sql reports (safe to run repeatedly).
+-- Monthly rollups are refreshed per dirty watch month by scripts/refresh_rollups.py;
+-- the report tables are rebuilt from them after every refresh.
+-- As in the report queries, a NULL country, content_id, device_type or subscription_type is a
+-- group of its own, so tables grouped by them have no primary key (PostgreSQL 13 has no UNIQUE
+-- NULLS NOT DISTINCT); whole months and reports are replaced at once, which keeps groups unique.
+
+-- Views, minutes and completion per watch month (seasonal viewing patterns)
+CREATE TABLE IF NOT EXISTS rollup_viewing_monthly (
+    watch_month DATE PRIMARY KEY,
+    total_views BIGINT NOT NULL,
+    total_minutes_watched BIGINT,
+    completion_sum DOUBLE PRECISION,
+    completion_count BIGINT NOT NULL
+);
+
+-- Views per content and viewer country per watch month (top content by country)
+CREATE TABLE IF NOT EXISTS rollup_content_views_monthly (
+    watch_month DATE NOT NULL,
+    country VARCHAR(100),
+    content_id VARCHAR(50),
+    total_views BIGINT NOT NULL
+);
+-- Tables created with the earlier primary key
+ALTER TABLE rollup_content_views_monthly DROP CONSTRAINT IF EXISTS rollup_content_views_monthly_pkey;
+ALTER TABLE rollup_content_views_monthly ALTER COLUMN country DROP NOT NULL, ALTER COLUMN content_id DROP NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_rollup_content_views_monthly_month ON rollup_content_views_monthly(watch_month);
+
+-- Device usage and completion per watch month (device vs completion rate)
+CREATE TABLE IF NOT EXISTS rollup_device_monthly (
+    watch_month DATE NOT NULL,
+    device_type VARCHAR(50),
+    total_views BIGINT NOT NULL,
+    completion_sum DOUBLE PRECISION,
+    completion_count BIGINT NOT NULL,
+    duration_sum BIGINT,
+    duration_count BIGINT NOT NULL
+);
+ALTER TABLE rollup_device_monthly DROP CONSTRAINT IF EXISTS rollup_device_monthly_pkey;
+ALTER TABLE rollup_device_monthly ALTER COLUMN device_type DROP NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_rollup_device_monthly_month ON rollup_device_monthly(watch_month);
+
+-- Months in which each user watched anything (retention cohorts)
+CREATE TABLE IF NOT EXISTS rollup_user_activity_monthly (
+    active_month DATE NOT NULL,
+    user_id VARCHAR(50) NOT NULL,
+    PRIMARY KEY (active_month, user_id)
+);
+CREATE INDEX IF NOT EXISTS idx_rollup_user_activity_user_id ON rollup_user_activity_monthly(user_id);
+
+-- Report: top 5 content per country
+CREATE TABLE IF NOT EXISTS rollup_top_content_by_country (
+    country VARCHAR(100),
+    content_id VARCHAR(50),
+    total_views BIGINT NOT NULL,
+    rank_in_region INT NOT NULL
+);
+ALTER TABLE rollup_top_content_by_country DROP CONSTRAINT IF EXISTS rollup_top_content_by_country_pkey;
+ALTER TABLE rollup_top_content_by_country ALTER COLUMN country DROP NOT NULL, ALTER COLUMN content_id DROP NOT NULL;
+
+-- Report: retained users per subscription type, cohort month and active month
+CREATE TABLE IF NOT EXISTS rollup_retention_by_subscription (
+    subscription_type VARCHAR(50),
+    cohort_month DATE NOT NULL,
+    active_month DATE NOT NULL,
+    retained_users BIGINT NOT NULL
+);
+ALTER TABLE rollup_retention_by_subscription DROP CONSTRAINT IF EXISTS rollup_retention_by_subscription_pkey;
+ALTER TABLE rollup_retention_by_subscription ALTER COLUMN subscription_type DROP NOT NULL;
+
+-- Report views over the monthly rollups
+CREATE OR REPLACE VIEW v_seasonal_viewing_patterns AS
+SELECT
+    watch_month AS month,
+    total_views,
+    total_minutes_watched,
+    completion_sum / NULLIF(completion_count, 0) AS avg_completion_rate
+FROM rollup_viewing_monthly;
+
+CREATE OR REPLACE VIEW v_device_completion_rates AS
+SELECT
+    device_type,
+    SUM(total_views) AS total_views,
+    SUM(completion_sum) / NULLIF(SUM(completion_count), 0) AS avg_completion_rate,
+    SUM(duration_sum)::FLOAT / NULLIF(SUM(duration_count), 0) AS avg_watch_duration
+FROM rollup_device_monthly
+GROUP BY device_type;
@@ -1,15 +1,76 @@
+-- Databases created before partitioning have a plain viewing_sessions table: move it (and the
+-- names of its indexes) aside, so the partitioned table is created and its rows moved in below
+DO $$
+DECLARE
+    index_name TEXT;
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_class WHERE oid = to_regclass('viewing_sessions') AND relkind = 'r') THEN
+        ALTER TABLE viewing_sessions RENAME TO viewing_sessions_unpartitioned;
+        FOR index_name IN
+            SELECT indexname FROM pg_indexes
+            WHERE schemaname = current_schema() AND tablename = 'viewing_sessions_unpartitioned'
+        LOOP
+            EXECUTE format('ALTER INDEX %I RENAME TO %I', index_name, index_name || '_unpartitioned');
+        END LOOP;
+        RAISE WARNING 'viewing_sessions is not partitioned, converting it';
+    END IF;
+END $$;
+
+-- Range-partitioned by month on watch_date; monthly partitions are created by the loader
+-- (utils/partitions.py). The partition key must be part of the primary key.
+-- There is no DEFAULT partition: ATTACH PARTITION would have to scan it on every monthly load.
 CREATE TABLE IF NOT EXISTS viewing_sessions (
-    session_id VARCHAR(50) PRIMARY KEY,
+    session_id VARCHAR(50) NOT NULL,
     user_id VARCHAR(50) REFERENCES users(user_id) ON DELETE CASCADE,
     content_id VARCHAR(50),
-    watch_date DATE,
+    watch_date DATE NOT NULL,
     watch_duration_minutes INTEGER CHECK (watch_duration_minutes >= 0),
     completion_percentage FLOAT CHECK (completion_percentage BETWEEN 0 AND 100),
     device_type VARCHAR(50),
-    quality_level VARCHAR(20)
-);
+    quality_level VARCHAR(20),
+    PRIMARY KEY (session_id, watch_date)
+) PARTITION BY RANGE (watch_date);
 
--- Indexes for performance on joins and filters
+-- Indexes for performance on joins and filters (created on every partition)
 CREATE INDEX IF NOT EXISTS idx_viewing_sessions_user_id ON viewing_sessions(user_id);
 CREATE INDEX IF NOT EXISTS idx_viewing_sessions_content_id ON viewing_sessions(content_id);
-CREATE INDEX IF NOT EXISTS idx_viewing_sessions_watch_date ON viewing_sessions(watch_date);
\ No newline at end of file
+CREATE INDEX IF NOT EXISTS idx_viewing_sessions_watch_date ON viewing_sessions(watch_date);
+
+-- Move the rows of a converted table, or of the DEFAULT partition earlier versions created,
+-- into monthly partitions. Rows without a watch_date cannot be partitioned and stay behind.
+DO $$
+DECLARE
+    source TEXT;
+    month DATE;
+    moved BIGINT;
+    left_behind BIGINT;
+BEGIN
+    IF to_regclass('viewing_sessions_default') IS NOT NULL THEN
+        ALTER TABLE viewing_sessions DETACH PARTITION viewing_sessions_default;
+    END IF;
+    FOREACH source IN ARRAY ARRAY['viewing_sessions_unpartitioned', 'viewing_sessions_default'] LOOP
+        CONTINUE WHEN to_regclass(source) IS NULL;
+        FOR month IN EXECUTE format(
+            'SELECT DISTINCT date_trunc(''month'', watch_date)::date FROM %I WHERE watch_date IS NOT NULL', source)
+        LOOP
+            EXECUTE format('CREATE TABLE IF NOT EXISTS %I PARTITION OF viewing_sessions FOR VALUES FROM (%L) TO (%L)',
+                           'viewing_sessions_p' || to_char(month, 'YYYYMM'), month, (month + INTERVAL '1 month')::date);
+        END LOOP;
+        EXECUTE format(
+            'INSERT INTO viewing_sessions (session_id, user_id, content_id, watch_date, watch_duration_minutes,
+                                           completion_percentage, device_type, quality_level)
+             SELECT session_id, user_id, content_id, watch_date, watch_duration_minutes,
+                    completion_percentage, device_type, quality_level
+             FROM %I WHERE watch_date IS NOT NULL', source);
+        GET DIAGNOSTICS moved = ROW_COUNT;
+        EXECUTE format('DELETE FROM %I WHERE watch_date IS NOT NULL', source);
+        EXECUTE format('SELECT count(*) FROM %I', source) INTO left_behind;
+        IF left_behind = 0 THEN
+            EXECUTE format('DROP TABLE %I', source);
+            RAISE WARNING 'Moved % rows of % into monthly partitions', moved, source;
+        ELSE
+            RAISE WARNING 'Moved % rows of % into monthly partitions; % rows without a watch_date were left in it',
+                moved, source, left_behind;
+        END IF;
+    END LOOP;
+END $$;
@@ -0,0 +1,38 @@
+-- Merge staged rows (stage_* temp tables) into the normalized tables.
+-- One-to-one tables are upserted; multi-row children are replaced per content_id.
+
+INSERT INTO content (content_id, title, type, rating, production_budget)
+SELECT content_id, title, type, rating, production_budget FROM stage_content
+ON CONFLICT (content_id) DO UPDATE SET
+    title = EXCLUDED.title,
+    type = EXCLUDED.type,
+    rating = EXCLUDED.rating,
+    production_budget = EXCLUDED.production_budget;
+
+INSERT INTO movie_details (content_id, duration_minutes, release_year, views_count)
+SELECT content_id, duration_minutes, release_year, views_count FROM stage_movie_details
+ON CONFLICT (content_id) DO UPDATE SET
+    duration_minutes = EXCLUDED.duration_minutes,
+    release_year = EXCLUDED.release_year,
+    views_count = EXCLUDED.views_count;
+
+INSERT INTO series_details (content_id, seasons, avg_episode_duration, total_views)
+SELECT content_id, seasons, avg_episode_duration, total_views FROM stage_series_details
+ON CONFLICT (content_id) DO UPDATE SET
+    seasons = EXCLUDED.seasons,
+    avg_episode_duration = EXCLUDED.avg_episode_duration,
+    total_views = EXCLUDED.total_views;
+
+DELETE FROM content_genres g
+USING stage_content s
+WHERE g.content_id = s.content_id;
+
+INSERT INTO content_genres (content_id, genre)
+SELECT DISTINCT content_id, genre FROM stage_content_genres;
+
+DELETE FROM series_episodes e
+USING stage_content s
+WHERE e.content_id = s.content_id;
+
+INSERT INTO series_episodes (content_id, season, episode_count)
+SELECT content_id, season, episode_count FROM stage_series_episodes;
@@ -1,3 +1,8 @@
+-- Normalized content schema. Deliberately not named create_*.sql: create_postgres_tables runs those
+-- on every DAG run, and these DROPs would wipe the content incremental_content_sync and the
+-- load ledger rely on. load_normalized_jsons_to_postgres runs it in its stage schema, and
+-- incremental_content_sync when the tables do not exist yet.
+
 -- Drop tables if they exist to ensure clean schema creation
 DROP TABLE IF EXISTS series_episodes CASCADE;
 DROP TABLE IF EXISTS content_genres CASCADE;
@@ -0,0 +1,34 @@
+-- Rebuild the report tables from the monthly rollups (small; runs after every refresh)
+
+TRUNCATE rollup_top_content_by_country;
+INSERT INTO rollup_top_content_by_country (country, content_id, total_views, rank_in_region)
+SELECT country, content_id, total_views, rank_in_region
+FROM (
+    SELECT
+        country,
+        content_id,
+        SUM(total_views) AS total_views,
+        RANK() OVER (PARTITION BY country ORDER BY SUM(total_views) DESC) AS rank_in_region
+    FROM rollup_content_views_monthly
+    GROUP BY country, content_id
+) ranked_views
+WHERE rank_in_region <= 5;
+
+-- A user's cohort is their first active month; every later active month counts as retained
+TRUNCATE rollup_retention_by_subscription;
+INSERT INTO rollup_retention_by_subscription (subscription_type, cohort_month, active_month, retained_users)
+SELECT
+    u.subscription_type,
+    c.cohort_month,
+    a.active_month,
+    COUNT(*)
+FROM (
+    SELECT user_id, MIN(active_month) AS cohort_month
+    FROM rollup_user_activity_monthly
+    GROUP BY user_id
+) c
+JOIN rollup_user_activity_monthly a
+    ON a.user_id = c.user_id
+JOIN users u
+    ON u.user_id = c.user_id
+GROUP BY u.subscription_type, c.cohort_month, a.active_month;
@@ -0,0 +1,51 @@
+-- Recompute the monthly rollups for watch dates in [%(lower)s, %(upper)s).
+-- Run once per dirty month (the range predicates prune viewing_sessions to its partition).
+
+DELETE FROM rollup_viewing_monthly WHERE watch_month >= %(lower)s AND watch_month < %(upper)s;
+INSERT INTO rollup_viewing_monthly (watch_month, total_views, total_minutes_watched, completion_sum, completion_count)
+SELECT
+    DATE_TRUNC('month', vs.watch_date)::DATE,
+    COUNT(vs.session_id),
+    SUM(vs.watch_duration_minutes),
+    SUM(vs.completion_percentage),
+    COUNT(vs.completion_percentage)
+FROM viewing_sessions vs
+WHERE vs.watch_date >= %(lower)s AND vs.watch_date < %(upper)s
+GROUP BY 1;
+
+DELETE FROM rollup_content_views_monthly WHERE watch_month >= %(lower)s AND watch_month < %(upper)s;
+INSERT INTO rollup_content_views_monthly (watch_month, country, content_id, total_views)
+SELECT
+    DATE_TRUNC('month', vs.watch_date)::DATE,
+    u.country,
+    vs.content_id,
+    COUNT(vs.session_id)
+FROM viewing_sessions vs
+JOIN users u
+    ON vs.user_id = u.user_id
+WHERE vs.watch_date >= %(lower)s AND vs.watch_date < %(upper)s
+GROUP BY 1, u.country, vs.content_id;
+
+DELETE FROM rollup_device_monthly WHERE watch_month >= %(lower)s AND watch_month < %(upper)s;
+INSERT INTO rollup_device_monthly (watch_month, device_type, total_views, completion_sum, completion_count, duration_sum, duration_count)
+SELECT
+    DATE_TRUNC('month', vs.watch_date)::DATE,
+    vs.device_type,
+    COUNT(vs.session_id),
+    SUM(vs.completion_percentage),
+    COUNT(vs.completion_percentage),
+    SUM(vs.watch_duration_minutes),
+    COUNT(vs.watch_duration_minutes)
+FROM viewing_sessions vs
+WHERE vs.watch_date >= %(lower)s AND vs.watch_date < %(upper)s
+GROUP BY 1, vs.device_type;
+
+DELETE FROM rollup_user_activity_monthly WHERE active_month >= %(lower)s AND active_month < %(upper)s;
+INSERT INTO rollup_user_activity_monthly (active_month, user_id)
+SELECT DISTINCT
+    DATE_TRUNC('month', vs.watch_date)::DATE,
+    vs.user_id
+FROM viewing_sessions vs
+WHERE vs.watch_date >= %(lower)s AND vs.watch_date < %(upper)s
+  -- Sessions without a user never join users in the retention report
+  AND vs.user_id IS NOT NULL;
@@ -1,47 +1,273 @@
 import os
+import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional
-
-import psycopg2
-from psycopg2.extras import RealDictCursor
-from pymongo import MongoClient
+from typing import TYPE_CHECKING, Any, Dict, Iterator, Optional
 
 from dotenv import load_dotenv
 
+# The drivers are imported on first use, so importing this module (e.g. while Airflow
+# parses the DAG) stays cheap
+if TYPE_CHECKING:
+    import psycopg2.extensions
+    from pymongo import MongoClient
+
 load_dotenv()
 
-def get_postgres_connection(db_name: Optional[str] = None) -> psycopg2.extensions.connection:
+# Pool sizing and health checking
+POSTGRES_POOL_MIN = int(os.getenv('POSTGRES_POOL_MIN', '1'))
+POSTGRES_POOL_MAX = int(os.getenv('POSTGRES_POOL_MAX', '8'))
+POSTGRES_POOL_TIMEOUT = float(os.getenv('POSTGRES_POOL_TIMEOUT', '60'))
+# Connections idle longer than this are pinged before being handed out
+POSTGRES_POOL_HEALTHCHECK_IDLE = float(os.getenv('POSTGRES_POOL_HEALTHCHECK_IDLE', '30'))
+MONGO_MAX_POOL_SIZE = int(os.getenv('MONGO_MAX_POOL_SIZE', '50'))
+
+def _postgres_params(db_name: Optional[str] = None) -> Dict[str, Any]:
+    return dict(
+        host=os.getenv('POSTGRES_HOST', 'localhost'),
+        port=os.getenv('POSTGRES_PORT', '5432'),
+        database=db_name or os.getenv('PROJECT_POSTGRES_DB', 'video_streaming'),
+        user=os.getenv('POSTGRES_USER', 'postgres'),
+        password=os.getenv('POSTGRES_PASSWORD', 'secret123')
+    )
+
+def get_postgres_connection(db_name: Optional[str] = None) -> "psycopg2.extensions.connection":
     """
     Modular function to create PostgreSQL connection.
     Best practice: Centralized connection management with error handling.
+    After use_shared_postgres_pool() the default database's connections come from the
+    process-wide pool instead (see PooledConnection).
     """
+    if _SHARED_POOL is not None and db_name is None:
+        return PooledConnection(_SHARED_POOL)
+    import psycopg2
+
     try:
-        conn = psycopg2.connect(
-            host=os.getenv('POSTGRES_HOST', 'localhost'),
-            port=os.getenv('POSTGRES_PORT', '5432'),
-            database=db_name or os.getenv('PROJECT_POSTGRES_DB', 'video_streaming'),
-            user=os.getenv('POSTGRES_USER', 'postgres'),
-            password=os.getenv('POSTGRES_PASSWORD', 'secret123')
-        )
+        conn = psycopg2.connect(**_postgres_params(db_name))
         return conn
     except psycopg2.Error as e:
         raise Exception(f"Failed to connect to PostgreSQL: {e}")
 
-def get_mongo_client(db_name: Optional[str] = None) -> MongoClient:
+class PostgresPool:
     """
-    Modular function to create MongoDB client with authentication.
-    Best practice: Centralized connection management with error handling.
+    Thread-safe PostgreSQL connection pool.
+    Checkout blocks (up to a timeout) when all connections are in use, connections that sat
+    idle are health-checked lazily on checkout, and waits are recorded in `metrics`.
+    """
+
+    def __init__(self, db_name: Optional[str] = None, minconn: int = POSTGRES_POOL_MIN,
+                 maxconn: int = POSTGRES_POOL_MAX):
+        import psycopg2
+        from psycopg2.pool import ThreadedConnectionPool
+
+        try:
+            self._pool = ThreadedConnectionPool(minconn, maxconn, **_postgres_params(db_name))
+        except psycopg2.Error as e:
+            raise Exception(f"Failed to connect to PostgreSQL: {e}")
+        self.maxconn = maxconn
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._lock = threading.Lock()
+        self._last_used: Dict[int, float] = {}
+        self.metrics = {
+            'checkouts': 0,
+            'waits': 0,
+            'wait_seconds_total': 0.0,
+            'wait_seconds_max': 0.0,
+            'discarded': 0,
+        }
+
+    def getconn(self, timeout: float = POSTGRES_POOL_TIMEOUT) -> "psycopg2.extensions.connection":
+        start = time.perf_counter()
+        if not self._slots.acquire(timeout=timeout):
+            raise Exception(f"Timed out after {timeout}s waiting for a PostgreSQL connection")
+        waited = time.perf_counter() - start
+        try:
+            conn = self._checkout_healthy()
+        except Exception:
+            self._slots.release()
+            raise
+        with self._lock:
+            self.metrics['checkouts'] += 1
+            if waited > 0.001:
+                self.metrics['waits'] += 1
+            self.metrics['wait_seconds_total'] += waited
+            self.metrics['wait_seconds_max'] = max(self.metrics['wait_seconds_max'], waited)
+        return conn
+
+    def _checkout_healthy(self) -> "psycopg2.extensions.connection":
+        import psycopg2
+
+        conn = self._pool.getconn()
+        idle = time.monotonic() - self._last_used.get(id(conn), time.monotonic())
+        if not conn.closed and idle < POSTGRES_POOL_HEALTHCHECK_IDLE:
+            return conn
+        try:
+            if conn.closed:
+                raise psycopg2.InterfaceError("connection already closed")
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return conn
+        except psycopg2.Error:
+            # Broken connection: drop it and open a fresh one in its place
+            self._pool.putconn(conn, close=True)
+            with self._lock:
+                self.metrics['discarded'] += 1
+            return self._pool.getconn()
+
+    def putconn(self, conn: "psycopg2.extensions.connection") -> None:
+        """Return a connection; any uncommitted work is rolled back (a broken one is closed)."""
+        import psycopg2
+
+        try:
+            broken = bool(conn.closed)
+            if not broken:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    broken = True
+            self._last_used[id(conn)] = time.monotonic()
+            self._pool.putconn(conn, close=broken)
+        finally:
+            self._slots.release()
+
+    def closeall(self) -> None:
+        self._pool.closeall()
+
+class PooledConnection:
+    """
+    A connection checked out of a PostgresPool that behaves like one from psycopg2.connect():
+    close() resets the session (DISCARD ALL) and returns it to the pool instead of closing it.
+    """
+
+    def __init__(self, pool: PostgresPool):
+        object.__setattr__(self, '_pool', pool)
+        object.__setattr__(self, '_conn', pool.getconn())
+        object.__setattr__(self, '_returned', False)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._conn, name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self._conn, name, value)
+
+    @property
+    def closed(self) -> int:
+        return 1 if self._returned else self._conn.closed
+
+    def close(self) -> None:
+        if self._returned:
+            return
+        import psycopg2
+
+        object.__setattr__(self, '_returned', True)
+        conn = self._conn
+        try:
+            if not conn.closed:
+                conn.rollback()
+                conn.autocommit = True
+                with conn.cursor() as cursor:
+                    cursor.execute("DISCARD ALL")
+                conn.autocommit = False
+        except psycopg2.Error:
+            conn.close()
+        self._pool.putconn(conn)
+
+_POSTGRES_POOLS: Dict[str, PostgresPool] = {}
+_POOLS_LOCK = threading.Lock()
+# Pool get_postgres_connection() draws from, once use_shared_postgres_pool() was called
+_SHARED_POOL: Optional[PostgresPool] = None
+
+def get_postgres_pool(db_name: Optional[str] = None, maxconn: Optional[int] = None) -> PostgresPool:
+    """Process-wide pool per database, created on first use (with maxconn connections at most)."""
+    key = db_name or os.getenv('PROJECT_POSTGRES_DB', 'video_streaming')
+    with _POOLS_LOCK:
+        pool = _POSTGRES_POOLS.get(key)
+        if pool is None:
+            pool = _POSTGRES_POOLS[key] = PostgresPool(key, maxconn=maxconn or POSTGRES_POOL_MAX)
+        return pool
+
+def pool_worker_slots(workers: int, db_name: Optional[str] = None) -> int:
+    """
+    Clamp a number of concurrent workers to the connections the database's pool can hand out
+    at once, so none of them waits for a slot (and times out). A pool created here is sized
+    from `workers`; the shared pool keeps one slot for the caller's own connection.
+    """
+    pool = get_postgres_pool(db_name, maxconn=max(workers, POSTGRES_POOL_MAX))
+    slots = pool.maxconn - (1 if pool is _SHARED_POOL else 0)
+    return max(1, min(workers, slots))
+
+def use_shared_postgres_pool(maxconn: Optional[int] = None) -> PostgresPool:
+    """
+    Make get_postgres_connection() hand out connections from the process-wide pool, so a
+    process running several stages (scripts/run_pipeline.py) connects once per pool slot.
+    """
+    global _SHARED_POOL
+    _SHARED_POOL = get_postgres_pool(maxconn=maxconn)
+    return _SHARED_POOL
+
+def close_postgres_pools() -> None:
+    """Close every pool created in this process (e.g. at process shutdown)."""
+    global _SHARED_POOL
+    with _POOLS_LOCK:
+        pools = list(_POSTGRES_POOLS.values())
+        _POSTGRES_POOLS.clear()
+        _SHARED_POOL = None
+    for pool in pools:
+        pool.closeall()
+
+@contextmanager
+def postgres_connection(db_name: Optional[str] = None) -> Iterator["psycopg2.extensions.connection"]:
+    """
+    Check a pooled connection out for the duration of a with-block.
+    Commit explicitly; uncommitted work is rolled back when the connection is returned.
     """
+    pool = get_postgres_pool(db_name)
+    conn = pool.getconn()
     try:
-        client = MongoClient(
-            host=os.getenv('MONGO_HOST', 'localhost'),
-            port=int(os.getenv('MONGO_PORT', '27017')),
-            username=os.getenv('MONGO_USER', 'admin'),
-            password=os.getenv('MONGO_PASSWORD', 'secret123'),
-            authSource='admin'  # Use 'admin' database for authentication
-        )
-        # Test connection
-        client.admin.command('ismaster')
-        return client
-    except Exception as e:
-        raise Exception(f"Failed to connect to MongoDB: {e}")
\ No newline at end of file
+        yield conn
+    finally:
+        pool.putconn(conn)
+
+def pool_stats() -> Dict[str, Dict[str, Any]]:
+    """Wait/checkout metrics for every pool created in this process."""
+    with _POOLS_LOCK:
+        return {name: dict(pool.metrics) for name, pool in _POSTGRES_POOLS.items()}
+
+_MONGO_CLIENT: "Optional[MongoClient]" = None
+_MONGO_LOCK = threading.Lock()
+
+def get_mongo_client(db_name: Optional[str] = None) -> "MongoClient":
+    """
+    Modular function to get the process-wide MongoDB client with authentication.
+    Best practice: Centralized connection management with error handling.
+    The client is shared (it pools connections internally, up to MONGO_MAX_POOL_SIZE),
+    so callers must not close it; server reachability is checked lazily on first use.
+    """
+    global _MONGO_CLIENT
+    with _MONGO_LOCK:
+        if _MONGO_CLIENT is not None:
+            return _MONGO_CLIENT
+        from pymongo import MongoClient
+
+        try:
+            _MONGO_CLIENT = MongoClient(
+                host=os.getenv('MONGO_HOST', 'localhost'),
+                port=int(os.getenv('MONGO_PORT', '27017')),
+                username=os.getenv('MONGO_USER', 'admin'),
+                password=os.getenv('MONGO_PASSWORD', 'secret123'),
+                authSource='admin',  # Use 'admin' database for authentication
+                maxPoolSize=MONGO_MAX_POOL_SIZE
+            )
+            return _MONGO_CLIENT
+        except Exception as e:
+            raise Exception(f"Failed to connect to MongoDB: {e}")
+
+def close_mongo_client() -> None:
+    """Close the shared MongoDB client (e.g. at process shutdown)."""
+    global _MONGO_CLIENT
+    with _MONGO_LOCK:
+        if _MONGO_CLIENT is not None:
+            _MONGO_CLIENT.close()
+            _MONGO_CLIENT = None
@@ -0,0 +1,136 @@
+import os
+import time
+from typing import Any, Dict, List, Sequence, Tuple
+
+# Load into bare tables and build indexes/constraints afterwards
+BULK_LOAD_DEFERRED_DDL = os.getenv('BULK_LOAD_DEFERRED_DDL', 'false').lower() == 'true'
+
+# (table, constraint name, constraint definition)
+Constraint = Tuple[str, str, str]
+
+
+class DeferredDdl:
+    """
+    Indexes and constraints of a set of tables, captured from the catalog so they can be
+    dropped before a bulk load and rebuilt afterwards. NOT NULL and defaults are kept.
+    """
+
+    def __init__(self, tables: Sequence[str]):
+        self.tables = list(tables)
+        self.partitioned: List[str] = []        # tables whose constraints cannot be NOT VALID
+        self.keys: List[Constraint] = []         # PRIMARY KEY / UNIQUE
+        self.checks: List[Constraint] = []
+        self.foreign_keys: List[Constraint] = []
+        self.indexes: List[Tuple[str, str]] = []  # (index name, CREATE INDEX statement)
+
+    def __bool__(self) -> bool:
+        return bool(self.keys or self.checks or self.foreign_keys or self.indexes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-serializable form, e.g. to hand the DDL from one Airflow task to another via XCom."""
+        return {
+            'tables': self.tables,
+            'partitioned': self.partitioned,
+            'keys': [list(c) for c in self.keys],
+            'checks': [list(c) for c in self.checks],
+            'foreign_keys': [list(c) for c in self.foreign_keys],
+            'indexes': [list(i) for i in self.indexes],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "DeferredDdl":
+        ddl = cls(data['tables'])
+        ddl.partitioned = list(data['partitioned'])
+        ddl.keys = [tuple(c) for c in data['keys']]
+        ddl.checks = [tuple(c) for c in data['checks']]
+        ddl.foreign_keys = [tuple(c) for c in data['foreign_keys']]
+        ddl.indexes = [tuple(i) for i in data['indexes']]
+        return ddl
+
+
+def capture_ddl(cursor, tables: Sequence[str]) -> DeferredDdl:
+    """
+    Read the keys, CHECK constraints, foreign keys and secondary indexes of `tables`
+    (schema-qualified or on the search_path). Foreign keys on other tables that reference
+    one of `tables` are included, since they depend on its primary key.
+    """
+    ddl = DeferredDdl(tables)
+    cursor.execute(
+        """
+        SELECT c.conrelid::regclass::text, c.conname, c.contype, pg_get_constraintdef(c.oid)
+        FROM pg_constraint c
+        WHERE c.contype IN ('p', 'u', 'c', 'f')
+          AND (c.conrelid = ANY(%s::regclass[]) OR c.confrelid = ANY(%s::regclass[]))
+          AND c.conparentid = 0  -- partitions' copies go and come back with the parent's
+        ORDER BY c.conrelid, c.conname
+        """,
+        (list(tables), list(tables))
+    )
+    for table, name, contype, definition in cursor.fetchall():
+        definition = definition.replace(' NOT VALID', '')
+        if contype in ('p', 'u'):
+            ddl.keys.append((table, name, definition))
+        elif contype == 'c':
+            ddl.checks.append((table, name, definition))
+        else:
+            ddl.foreign_keys.append((table, name, definition))
+    # Partitioned tables (among `tables` and the tables referencing them) take no NOT VALID constraints
+    cursor.execute(
+        "SELECT oid::regclass::text FROM pg_class WHERE oid = ANY(%s::regclass[]) AND relkind = 'p'",
+        (list(tables) + [table for table, _, _ in ddl.foreign_keys],)
+    )
+    ddl.partitioned = [row[0] for row in cursor.fetchall()]
+    # Indexes backing a key are rebuilt with the key itself
+    cursor.execute(
+        """
+        SELECT i.indexrelid::regclass::text, pg_get_indexdef(i.indexrelid)
+        FROM pg_index i
+        WHERE i.indrelid = ANY(%s::regclass[])
+          AND NOT EXISTS (
+              SELECT 1 FROM pg_constraint c
+              WHERE c.conindid = i.indexrelid AND c.contype IN ('p', 'u', 'x')
+          )
+        ORDER BY i.indexrelid
+        """,
+        (list(tables),)
+    )
+    ddl.indexes = cursor.fetchall()
+    return ddl
+
+
+def drop_ddl(cursor, ddl: DeferredDdl) -> None:
+    """Drop the captured foreign keys, checks, indexes and keys (in dependency order)."""
+    for table, name, _ in ddl.foreign_keys + ddl.checks:
+        cursor.execute(f"ALTER TABLE {table} DROP CONSTRAINT {name}")
+    for name, _ in ddl.indexes:
+        cursor.execute(f"DROP INDEX {name}")
+    for table, name, _ in ddl.keys:
+        cursor.execute(f"ALTER TABLE {table} DROP CONSTRAINT {name}")
+
+
+def restore_ddl(cursor, ddl: DeferredDdl, logger=None) -> Dict[str, float]:
+    """
+    Rebuild what drop_ddl removed, then ANALYZE the tables. CHECK and FOREIGN KEY
+    constraints are added NOT VALID and validated in a separate pass, so each is checked
+    with one scan of the loaded data (partitioned tables do not support NOT VALID, so
+    theirs are validated as they are added). Returns seconds spent per phase.
+    """
+    timings: Dict[str, float] = {}
+
+    def phase(name: str, statements: List[str]) -> None:
+        start = time.perf_counter()
+        for statement in statements:
+            cursor.execute(statement)
+        timings[name] = time.perf_counter() - start
+        if logger and statements:
+            logger.info(f"Deferred DDL phase '{name}': {len(statements)} statements in {timings[name]:.2f}s")
+
+    phase('keys', [f"ALTER TABLE {t} ADD CONSTRAINT {n} {d}" for t, n, d in ddl.keys])
+    phase('indexes', [statement for _, statement in ddl.indexes])
+    deferred = [c for c in ddl.checks + ddl.foreign_keys if c[0] not in ddl.partitioned]
+    immediate = [c for c in ddl.checks + ddl.foreign_keys if c[0] in ddl.partitioned]
+    phase('constraints', [f"ALTER TABLE {t} ADD CONSTRAINT {n} {d} NOT VALID" for t, n, d in deferred]
+          + [f"ALTER TABLE {t} ADD CONSTRAINT {n} {d}" for t, n, d in immediate])
+    phase('validate', [f"ALTER TABLE {t} VALIDATE CONSTRAINT {n}" for t, n, _ in deferred])
+    phase('analyze', [f"ANALYZE {t}" for t in ddl.tables])
+    return timings
@@ -0,0 +1,164 @@
+import hashlib
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Pipeline state schema (watermarks, load ledger)
+ETL_STATE_SQL_PATH = Path(__file__).resolve().parent.parent / "sql" / "create_etl_state_tables.sql"
+
+
+def ensure_etl_state_tables(conn) -> None:
+    """Create the pipeline state tables if they do not exist yet."""
+    with open(ETL_STATE_SQL_PATH, 'r') as f:
+        sql_commands = f.read()
+    with conn.cursor() as cursor:
+        cursor.execute(sql_commands)
+    conn.commit()
+
+
+def get_watermark(cursor, source: str) -> Dict[str, Any]:
+    """
+    Return the stored watermark for a source as
+    {'last_object_id': str | None, 'last_updated_at': datetime | None}.
+    """
+    cursor.execute(
+        "SELECT last_object_id, last_updated_at FROM etl_watermarks WHERE source = %s",
+        (source,)
+    )
+    row = cursor.fetchone()
+    if row is None:
+        return {'last_object_id': None, 'last_updated_at': None}
+    return {'last_object_id': row[0], 'last_updated_at': row[1]}
+
+
+def set_watermark(cursor, source: str, last_object_id: Optional[str],
+                  last_updated_at: Optional[datetime]) -> None:
+    """Upsert the watermark for a source. Runs in the caller's transaction."""
+    cursor.execute(
+        """
+        INSERT INTO etl_watermarks (source, last_object_id, last_updated_at, updated_at)
+        VALUES (%s, %s, %s, NOW())
+        ON CONFLICT (source) DO UPDATE SET
+            last_object_id = EXCLUDED.last_object_id,
+            last_updated_at = EXCLUDED.last_updated_at,
+            updated_at = NOW()
+        """,
+        (source, last_object_id, last_updated_at)
+    )
+
+
+def reset_watermark(cursor, source: str) -> None:
+    """Forget the watermark for a source so the next run extracts everything."""
+    cursor.execute("DELETE FROM etl_watermarks WHERE source = %s", (source,))
+
+
+def file_fingerprint(path: Path, chunk_size: int = 1024 * 1024) -> Dict[str, Any]:
+    """Streaming SHA-256, size and mtime of a file."""
+    stat = path.stat()
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return {'sha256': digest.hexdigest(), 'size_bytes': stat.st_size, 'mtime': stat.st_mtime}
+
+
+def check_source(cursor, target: str, path: Path,
+                 fingerprint: Optional[Dict[str, Any]] = None) -> Tuple[bool, Dict[str, Any]]:
+    """
+    Compare a source file against the ledger entry for a target.
+    Returns (unchanged, fingerprint). Size and mtime matching the ledger is taken as unchanged
+    without hashing; otherwise the file is hashed (or the given fingerprint reused).
+    A file that was only touched gets its ledger size/mtime refreshed.
+    """
+    cursor.execute(
+        "SELECT sha256, size_bytes, mtime FROM etl_load_ledger WHERE target = %s",
+        (target,)
+    )
+    row = cursor.fetchone()
+    stat = path.stat()
+    if row is not None and row[1] == stat.st_size and row[2] == stat.st_mtime:
+        return True, {'sha256': row[0], 'size_bytes': row[1], 'mtime': row[2]}
+
+    if fingerprint is None or fingerprint['size_bytes'] != stat.st_size or fingerprint['mtime'] != stat.st_mtime:
+        fingerprint = file_fingerprint(path)
+    if row is not None and row[0] == fingerprint['sha256']:
+        cursor.execute(
+            "UPDATE etl_load_ledger SET size_bytes = %s, mtime = %s WHERE target = %s",
+            (fingerprint['size_bytes'], fingerprint['mtime'], target)
+        )
+        return True, fingerprint
+    return False, fingerprint
+
+
+def record_load(cursor, target: str, path: Path, fingerprint: Dict[str, Any],
+                rows_loaded: Optional[int]) -> None:
+    """Record a successful load in the ledger. Runs in the caller's transaction."""
+    cursor.execute(
+        """
+        INSERT INTO etl_load_ledger (target, source_path, sha256, size_bytes, mtime, rows_loaded, loaded_at)
+        VALUES (%s, %s, %s, %s, %s, %s, NOW())
+        ON CONFLICT (target) DO UPDATE SET
+            source_path = EXCLUDED.source_path,
+            sha256 = EXCLUDED.sha256,
+            size_bytes = EXCLUDED.size_bytes,
+            mtime = EXCLUDED.mtime,
+            rows_loaded = EXCLUDED.rows_loaded,
+            loaded_at = NOW()
+        """,
+        (target, str(path), fingerprint['sha256'], fingerprint['size_bytes'], fingerprint['mtime'], rows_loaded)
+    )
+
+
+def table_has_rows(cursor, table_name: str) -> bool:
+    """Cheap emptiness probe (reads at most one tuple, never counts)."""
+    cursor.execute(f"SELECT EXISTS (SELECT 1 FROM {table_name})")
+    return cursor.fetchone()[0]
+
+
+def mark_dirty_months(cursor, source: str, months: Optional[Iterable[date]] = None) -> None:
+    """
+    Record months whose viewing data changed, for the rollup refresh to pick up.
+    months=None marks everything dirty. Runs in the caller's transaction.
+    """
+    if months is None:
+        cursor.execute("INSERT INTO etl_dirty_months (source, month) VALUES (%s, NULL)", (source,))
+        return
+    for month in sorted(set(months)):
+        cursor.execute("INSERT INTO etl_dirty_months (source, month) VALUES (%s, %s)", (source, month))
+
+
+def claim_dirty_months(cursor) -> Tuple[bool, List[date]]:
+    """
+    Remove and return the pending dirty months as (full_refresh, months).
+    Runs in the caller's transaction, so a rollback puts them back.
+    """
+    cursor.execute("DELETE FROM etl_dirty_months RETURNING month")
+    months = [row[0] for row in cursor.fetchall()]
+    full_refresh = any(month is None for month in months)
+    return full_refresh, sorted({month for month in months if month is not None})
+
+
+def bump_data_version(cursor, *sources: str) -> None:
+    """
+    Advance the data version of each source so cached query results keyed on it go stale.
+    Runs in the caller's transaction, so readers only see the new version once the load commits.
+    """
+    for source in sources:
+        cursor.execute(
+            """
+            INSERT INTO etl_data_versions (source, version, updated_at)
+            VALUES (%s, 1, NOW())
+            ON CONFLICT (source) DO UPDATE SET
+                version = etl_data_versions.version + 1,
+                updated_at = NOW()
+            """,
+            (source,)
+        )
+
+
+def get_data_versions(cursor, sources: Iterable[str]) -> Dict[str, int]:
+    """Current data version of each source (0 if it was never loaded)."""
+    sources = list(sources)
+    cursor.execute("SELECT source, version FROM etl_data_versions WHERE source = ANY(%s)", (sources,))
+    versions = dict(cursor.fetchall())
+    return {source: versions.get(source, 0) for source in sources}
@@ -0,0 +1,96 @@
+import json
+from pathlib import Path
+from typing import Any, Iterator, TextIO, Tuple
+
+# Characters read from disk per refill
+JSON_READ_CHUNK = 1024 * 1024
+
+_WHITESPACE = ' \t\n\r'
+# Characters that may legally follow a complete value
+_DELIMITERS = _WHITESPACE + ',:]}'
+
+
+class _JsonReader:
+    """Sliding-window reader that decodes one JSON value at a time from a text stream."""
+
+    def __init__(self, f: TextIO, chunk_size: int):
+        self._file = f
+        self._chunk_size = chunk_size
+        self._decoder = json.JSONDecoder()
+        self._buf = ''
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        data = self._file.read(self._chunk_size)
+        if not data:
+            self._eof = True
+            return False
+        self._buf = self._buf[self._pos:] + data
+        self._pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Return the next non-whitespace character without consuming it ('' at EOF)."""
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, char: str) -> None:
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Malformed JSON: expected {char!r}, found {found!r}")
+        self._pos += 1
+
+    def decode(self) -> Any:
+        """Decode the next complete JSON value, reading more input as needed."""
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+                # A number cut by the buffer edge decodes early; only accept a value
+                # once it is followed by a delimiter (or the input is exhausted)
+                if self._eof or (end < len(self._buf) and self._buf[end] in _DELIMITERS):
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            self._fill()
+
+
+def iter_top_level_arrays(path: Path, chunk_size: int = JSON_READ_CHUNK) -> Iterator[Tuple[str, Any]]:
+    """
+    Yield (key, item) for every item of every array value in a top-level JSON object,
+    e.g. ('movies', {...}) for {"movies": [...], "series": [...]}.
+    Items are decoded one at a time, so memory is bounded by the largest item.
+    Non-array values are skipped.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        reader = _JsonReader(f, chunk_size)
+        reader.expect('{')
+        if reader.peek() == '}':
+            return
+        while True:
+            key = reader.decode()
+            reader.expect(':')
+            if reader.peek() == '[':
+                reader.expect('[')
+                if reader.peek() == ']':
+                    reader.expect(']')
+                else:
+                    while True:
+                        yield key, reader.decode()
+                        if reader.peek() == ']':
+                            reader.expect(']')
+                            break
+                        reader.expect(',')
+            else:
+                reader.decode()
+            if reader.peek() == '}':
+                return
+            reader.expect(',')
@@ -1,12 +1,30 @@
+import atexit
 import logging
+import os
+import queue
 import sys
+import threading
+import time
 from pathlib import Path
+from typing import Dict, List, Optional, Tuple
 
-def setup_logger(name: str, log_file: Path | None = None, level: int = logging.INFO) -> logging.Logger:
+# Queued mode: loggers only enqueue records and a background thread does the console/file I/O
+LOG_QUEUE = os.getenv('LOG_QUEUE', 'false').lower() == 'true'
+# Queued handlers flush after this many records or seconds (warnings and errors flush at once)
+LOG_FLUSH_RECORDS = int(os.getenv('LOG_FLUSH_RECORDS', '500'))
+LOG_FLUSH_INTERVAL = float(os.getenv('LOG_FLUSH_INTERVAL', '1.0'))
+# log_rate_limited: log the first N messages per key, then one summary per interval
+LOG_RATE_LIMIT_FIRST = int(os.getenv('LOG_RATE_LIMIT_FIRST', '10'))
+LOG_RATE_LIMIT_INTERVAL = float(os.getenv('LOG_RATE_LIMIT_INTERVAL', '10.0'))
+
+def setup_logger(name: str, log_file: Path | None = None, level: int = logging.INFO,
+                 queued: Optional[bool] = None) -> logging.Logger:
     """
     Set up a structured logger with file and console handlers.
     Best practice: Modular logging setup for reusability across scripts.
     Ensures log directory and file exist without overwriting.
+    With queued=True (default LOG_QUEUE) the handlers run on a background thread,
+    so logging from extract/load loops never blocks on disk or console I/O.
     """
     logger = logging.getLogger(name)
     logger.setLevel(level)
@@ -14,13 +32,17 @@ def setup_logger(name: str, log_file: Path | None = None, level: int = logging.I
     if logger.handlers:  # Avoid duplicate handlers
         return logger
 
+    if queued is None:
+        queued = LOG_QUEUE
+
     # Formatter for structured logs (timestamp, level, name, message)
     formatter = logging.Formatter('%(asctime)s - [%(name)s] - %(levelname)s - %(message)s')
+    handlers: List[logging.Handler] = []
 
     # Console handler
-    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler = _BatchedStreamHandler(sys.stdout) if queued else logging.StreamHandler(sys.stdout)
     console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
+    handlers.append(console_handler)
 
     # File handler if specified
     if log_file:
@@ -31,8 +53,167 @@ def setup_logger(name: str, log_file: Path | None = None, level: int = logging.I
         if not log_file.exists():
             log_file.touch()
 
-        file_handler = logging.FileHandler(log_file, mode='a')
+        file_handler = _BatchedFileHandler(log_file, mode='a') if queued else logging.FileHandler(log_file, mode='a')
         file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
+        handlers.append(file_handler)
+
+    if queued:
+        records: "queue.SimpleQueue[Optional[logging.LogRecord]]" = queue.SimpleQueue()
+        logger.addHandler(_EnqueueHandler(records))
+        _LogWriter(records, handlers).start()
+    else:
+        for handler in handlers:
+            logger.addHandler(handler)
 
     return logger
+
+class _DeferredFlushMixin:
+    """Handler whose per-record flush is skipped; the log writer thread flushes in batches."""
+
+    def flush(self) -> None:
+        pass
+
+    def flush_now(self) -> None:
+        super().flush()
+
+    def close(self) -> None:
+        self.flush_now()
+        super().close()
+
+class _BatchedStreamHandler(_DeferredFlushMixin, logging.StreamHandler):
+    pass
+
+class _BatchedFileHandler(_DeferredFlushMixin, logging.FileHandler):
+    pass
+
+class _EnqueueHandler(logging.Handler):
+    """Puts records on the queue without formatting or I/O in the caller's thread."""
+
+    def __init__(self, records: "queue.SimpleQueue[Optional[logging.LogRecord]]"):
+        super().__init__()
+        self.records = records
+
+    def emit(self, record: logging.LogRecord) -> None:
+        # Resolve the message now; arguments may change before the writer gets to it
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        self.records.put(record)
+
+class _LogWriter(threading.Thread):
+    """Background thread draining one logger's queue into its handlers, flushing in batches."""
+
+    _writers: List["_LogWriter"] = []
+    _lock = threading.Lock()
+
+    def __init__(self, records: "queue.SimpleQueue[Optional[logging.LogRecord]]",
+                 handlers: List[logging.Handler]):
+        super().__init__(name="log-writer", daemon=True)
+        self.records = records
+        self.handlers = handlers
+        with _LogWriter._lock:
+            if not _LogWriter._writers:
+                atexit.register(flush_logs, stop=True)
+            _LogWriter._writers.append(self)
+
+    def run(self) -> None:
+        pending = 0
+        last_flush = time.monotonic()
+        while True:
+            try:
+                record = self.records.get(timeout=LOG_FLUSH_INTERVAL)
+            except queue.Empty:
+                record = False
+            if record is None:
+                self._flush()
+                return
+            if isinstance(record, threading.Event):
+                # flush_logs() waits for everything queued before it to be written
+                self._flush()
+                record.set()
+                pending = 0
+                last_flush = time.monotonic()
+                continue
+            if record:
+                for handler in self.handlers:
+                    if record.levelno >= handler.level:
+                        handler.handle(record)
+                pending += 1
+            urgent = record and record.levelno >= logging.WARNING
+            due = time.monotonic() - last_flush >= LOG_FLUSH_INTERVAL
+            if pending and (urgent or due or pending >= LOG_FLUSH_RECORDS):
+                self._flush()
+                pending = 0
+                last_flush = time.monotonic()
+
+    def _flush(self) -> None:
+        for handler in self.handlers:
+            handler.flush_now()
+
+    def flush(self) -> None:
+        if not self.is_alive():
+            return
+        done = threading.Event()
+        self.records.put(done)
+        done.wait()
+
+    def stop(self) -> None:
+        self.records.put(None)
+        self.join()
+        for handler in self.handlers:
+            handler.close()
+
+def flush_logs(stop: bool = False) -> None:
+    """
+    Write out everything queued so far. Task entry points call this before returning, since
+    Airflow may end the task process without running exit handlers; stop=True (at exit) also
+    ends the log writer threads.
+    Messages log_rate_limited suppressed since its last line are reported first, and its
+    counters start over, so the next task run in this process is rate-limited afresh.
+    """
+    _report_suppressed()
+    with _LogWriter._lock:
+        writers = list(_LogWriter._writers)
+        if stop:
+            _LogWriter._writers = []
+    for writer in writers:
+        if stop:
+            writer.stop()
+        else:
+            writer.flush()
+
+_rate_limits: Dict[Tuple[str, str], List[float]] = {}
+_rate_limits_lock = threading.Lock()
+
+def _report_suppressed() -> None:
+    """Log one line per rate-limited key with messages suppressed since its last line, then reset."""
+    with _rate_limits_lock:
+        states = list(_rate_limits.items())
+        _rate_limits.clear()
+    for (name, key), (_, suppressed, _, level) in states:
+        if suppressed:
+            logging.getLogger(name).log(int(level), f"{int(suppressed)} more '{key}' messages suppressed")
+
+def log_rate_limited(logger: logging.Logger, key: str, message: str, level: int = logging.WARNING) -> None:
+    """
+    Log a message that can repeat once per row: the first LOG_RATE_LIMIT_FIRST messages
+    per (logger, key) are logged, after that at most one per LOG_RATE_LIMIT_INTERVAL
+    seconds, with the number of messages suppressed since the last one.
+    """
+    now = time.monotonic()
+    with _rate_limits_lock:
+        # seen, suppressed, last logged, level
+        state = _rate_limits.setdefault((logger.name, key), [0, 0, now, level])
+        state[0] += 1
+        if state[0] > LOG_RATE_LIMIT_FIRST and now - state[2] < LOG_RATE_LIMIT_INTERVAL:
+            state[1] += 1
+            return
+        suppressed, state[1], state[2] = state[1], 0, now
+        last_unlimited = state[0] == LOG_RATE_LIMIT_FIRST
+    if suppressed:
+        message = f"{message} ({suppressed} similar messages suppressed)"
+    elif last_unlimited:
+        message = f"{message} (further '{key}' messages are rate-limited)"
+    logger.log(level, message)
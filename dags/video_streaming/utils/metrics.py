@@ -0,0 +1,197 @@
+import contextvars
+import functools
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+
+from utils.logger import flush_logs
+
+# Structured per-task metrics, one JSON object per line
+METRICS_LOG_PATH = Path(__file__).resolve().parent.parent / "logs" / "metrics.jsonl"
+# Also record every task run in the etl_task_metrics table
+METRICS_TO_POSTGRES = os.getenv('METRICS_TO_POSTGRES', 'true').lower() == 'true'
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MB (ru_maxrss is KB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+
+
+class TaskMetrics:
+    """
+    Timed spans and counters for one task run. Spans accumulate wall time per name
+    (repeated spans add up, nested spans overlap); counters accumulate integers such as
+    rows, bytes or documents. Thread-safe, so worker threads can report into it.
+    """
+
+    def __init__(self, task: str, run_id: Optional[str] = None):
+        self.task = task
+        self.run_id = run_id or os.getenv('AIRFLOW_CTX_DAG_RUN_ID')
+        self.started_at = datetime.now(timezone.utc)
+        self.spans: Dict[str, float] = {}
+        self.counters: Dict[str, int] = {}
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def add_time(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+    def count(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + int(value)
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def record(self, status: str, error: Optional[str] = None) -> Dict[str, Any]:
+        duration = time.perf_counter() - self._start
+        return {
+            'task': self.task,
+            'run_id': self.run_id,
+            'status': status,
+            'started_at': self.started_at.isoformat(),
+            'duration_seconds': round(duration, 6),
+            'spans': {name: round(seconds, 6) for name, seconds in self.spans.items()},
+            'counters': dict(self.counters),
+            'throughput': {f"{name}_per_sec": round(value / max(duration, 1e-9), 2)
+                           for name, value in self.counters.items()},
+            'peak_rss_mb': round(peak_rss_mb(), 1),
+            'error': error,
+        }
+
+
+_current: contextvars.ContextVar[Optional[TaskMetrics]] = contextvars.ContextVar('task_metrics', default=None)
+
+
+def current_metrics() -> Optional[TaskMetrics]:
+    return _current.get()
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Time a block into the current task's metrics (a no-op outside a task)."""
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    with metrics.span(name):
+        yield
+
+
+def add_time(name: str, seconds: float) -> None:
+    """Add an already measured duration to a span of the current task (a no-op outside a task)."""
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.add_time(name, seconds)
+
+
+def count(name: str, value: int = 1) -> None:
+    """Add to a counter of the current task's metrics (a no-op outside a task)."""
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.count(name, value)
+
+
+def timed_iter(iterable: Iterable[Any], name: str) -> Iterator[Any]:
+    """
+    Yield from `iterable`, adding the time spent waiting on it (e.g. on a database cursor)
+    to span `name` once exhausted. Time spent by the consumer between items is not counted.
+    """
+    metrics = _current.get()
+    if metrics is None:
+        yield from iterable
+        return
+    waited = 0.0
+    iterator = iter(iterable)
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                waited += time.perf_counter() - start
+                return
+            waited += time.perf_counter() - start
+            yield item
+    finally:
+        metrics.add_time(name, waited)
+
+
+def write_metrics(record: Dict[str, Any], log_path: Path = METRICS_LOG_PATH,
+                  to_postgres: bool = METRICS_TO_POSTGRES) -> None:
+    """
+    Append a task record to the JSON metrics log and, if enabled, to etl_task_metrics
+    (on its own connection, so it is recorded even when the task's transaction rolled back).
+    """
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(log_path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record) + '\n')
+    if not to_postgres:
+        return
+    from utils.db_connections import get_postgres_connection
+    from utils.etl_state import ensure_etl_state_tables
+
+    conn = get_postgres_connection()
+    try:
+        ensure_etl_state_tables(conn)
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            INSERT INTO etl_task_metrics (task, run_id, status, started_at, duration_seconds, rows_processed,
+                                          bytes_processed, peak_rss_mb, spans, counters, error)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            """,
+            (record['task'], record['run_id'], record['status'], record['started_at'],
+             record['duration_seconds'], record['counters'].get('rows'), record['counters'].get('bytes'),
+             record['peak_rss_mb'], json.dumps(record['spans']), json.dumps(record['counters']), record['error'])
+        )
+        conn.commit()
+        cursor.close()
+    finally:
+        conn.close()
+
+
+def instrumented(task: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """
+    Decorator for a task entry point: collects its spans, counters and peak memory and
+    writes them with write_metrics when it returns, raises or exits, then flushes queued
+    logs. Failing to write metrics never fails the task.
+    """
+    def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            metrics = TaskMetrics(task)
+            token = _current.set(metrics)
+            status, error = 'success', None
+            try:
+                return func(*args, **kwargs)
+            except SystemExit as e:
+                if e.code not in (None, 0):
+                    status, error = 'failed', f"exit code {e.code}"
+                raise
+            except BaseException as e:
+                status, error = 'failed', f"{type(e).__name__}: {e}"
+                raise
+            finally:
+                _current.reset(token)
+                try:
+                    write_metrics(metrics.record(status, error))
+                except Exception as e:
+                    print(f"Could not record metrics for {task}: {e}", file=sys.stderr)
+                flush_logs()
+        return wrapper
+    return decorator
@@ -0,0 +1,300 @@
+import csv
+import io
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from pathlib import Path
+from typing import Any, Callable, ContextManager, Dict, List, Optional, Tuple
+
+from utils.pg_copy import FileRange, open_copy_buffer, split_csv_offsets, use_binary_copy
+from utils.resilient_copy import RejectLog, ResilientCopyBuffer
+
+# 'full' empties the partitioned table before a load; 'months' replaces only the months in the file
+PARTITIONED_LOAD_SCOPE = os.getenv('PARTITIONED_LOAD_SCOPE', 'full').lower()
+# Drop monthly partitions older than this many months after a load (0 keeps everything)
+PARTITION_RETENTION_MONTHS = int(os.getenv('PARTITION_RETENTION_MONTHS', '0'))
+# Per-month COPY buffer size while a file is being split by month
+PARTITION_BUFFER_BYTES = int(os.getenv('PARTITION_BUFFER_BYTES', str(1024 * 1024)))
+
+_RANGE_BOUND = re.compile(r"FROM \('([0-9-]+)'\) TO \('([0-9-]+)'\)")
+
+
+def partition_key(cursor, table: str) -> Optional[str]:
+    """Partition key column of a range-partitioned table, or None if `table` is not one."""
+    cursor.execute(
+        """
+        SELECT a.attname
+        FROM pg_partitioned_table pt
+        JOIN pg_attribute a ON a.attrelid = pt.partrelid AND a.attnum = pt.partattrs[0]
+        WHERE pt.partrelid = %s::regclass AND pt.partstrat = 'r'
+        """,
+        (table,)
+    )
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def month_start(value: Any) -> date:
+    """First day of the month of a date or ISO date string."""
+    if not isinstance(value, date):
+        value = date.fromisoformat(str(value)[:10])
+    return value.replace(day=1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month:%Y%m}"
+
+
+def list_partitions(cursor, table: str) -> Dict[str, Optional[Tuple[date, date]]]:
+    """{partition name: (lower, upper) bounds}, with None for the default partition."""
+    cursor.execute(
+        """
+        SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = %s::regclass
+        """,
+        (table,)
+    )
+    partitions = {}
+    for name, bound in cursor.fetchall():
+        match = _RANGE_BOUND.search(bound)
+        partitions[name] = (date.fromisoformat(match.group(1)), date.fromisoformat(match.group(2))) if match else None
+    return partitions
+
+
+def swap_in_partition(cursor, table: str, key: str, load_table: str, month: date) -> str:
+    """
+    Replace the monthly partition of `table` with the fully loaded `load_table`.
+    The old partition (if any) is detached and dropped; a bounds CHECK on the new one
+    lets ATTACH PARTITION skip its validation scan. Runs in the caller's transaction.
+    """
+    lower, upper = month, add_months(month, 1)
+    name = partition_name(table, month)
+    cursor.execute(
+        f"ALTER TABLE {load_table} ADD CONSTRAINT {load_table}_bounds "
+        f"CHECK ({key} >= DATE '{lower}' AND {key} < DATE '{upper}')"
+    )
+    if name in list_partitions(cursor, table):
+        cursor.execute(f"ALTER TABLE {table} DETACH PARTITION {name}")
+        cursor.execute(f"DROP TABLE {name}")
+    cursor.execute(f"ALTER TABLE {load_table} RENAME TO {name}")
+    # Indexes the load table was created with are named after it
+    cursor.execute("SELECT indexname FROM pg_indexes WHERE schemaname = current_schema() AND tablename = %s", (name,))
+    for (index,) in cursor.fetchall():
+        if index.startswith(f"{load_table}_"):
+            cursor.execute(f"ALTER INDEX {index} RENAME TO {name}_{index[len(load_table) + 1:]}")
+    cursor.execute(f"ALTER TABLE {table} ATTACH PARTITION {name} FOR VALUES FROM ('{lower}') TO ('{upper}')")
+    cursor.execute(f"ALTER TABLE {name} DROP CONSTRAINT {load_table}_bounds")
+    return name
+
+
+def copy_foreign_keys(cursor, table: str, load_table: str) -> None:
+    """
+    Add the foreign keys of `table` to a load table, so violations surface row by row during
+    COPY instead of at ATTACH PARTITION (which adopts matching constraints without rechecking).
+    """
+    cursor.execute(
+        """
+        SELECT conname, pg_get_constraintdef(oid)
+        FROM pg_constraint
+        WHERE conrelid = %s::regclass AND contype = 'f' AND conparentid = 0
+        """,
+        (table,)
+    )
+    for name, definition in cursor.fetchall():
+        cursor.execute(f"ALTER TABLE {load_table} ADD CONSTRAINT {name} {definition}")
+
+
+def partitioned_foreign_keys(cursor, parent: str) -> List[Tuple[str, str, str, List[str], List[str]]]:
+    """
+    Foreign keys of range-partitioned tables referencing `parent`, as
+    (table, constraint name, definition, columns, referenced columns).
+    """
+    cursor.execute(
+        """
+        SELECT c.conrelid::regclass::text, c.conname, pg_get_constraintdef(c.oid),
+               array_agg(a.attname ORDER BY k.ord), array_agg(fa.attname ORDER BY k.ord)
+        FROM pg_constraint c
+        JOIN pg_partitioned_table pt ON pt.partrelid = c.conrelid AND pt.partstrat = 'r'
+        CROSS JOIN unnest(c.conkey, c.confkey) WITH ORDINALITY AS k(attnum, fattnum, ord)
+        JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = k.attnum
+        JOIN pg_attribute fa ON fa.attrelid = c.confrelid AND fa.attnum = k.fattnum
+        WHERE c.contype = 'f' AND c.confrelid = %s::regclass AND c.conparentid = 0
+        GROUP BY c.oid, c.conrelid, c.conname
+        ORDER BY c.conrelid, c.conname
+        """,
+        (parent,)
+    )
+    return [(table, name, definition.replace(' NOT VALID', ''), list(columns), list(parent_columns))
+            for table, name, definition, columns, parent_columns in cursor.fetchall()]
+
+
+def delete_orphans(cursor, table: str, parent: str, columns: List[str], parent_columns: List[str]) -> int:
+    """
+    Delete the rows of `table` whose (non-null) foreign key has no row in `parent` any more,
+    as the key's ON DELETE CASCADE would have. Returns the rows deleted.
+    """
+    matches = " AND ".join(f"p.{pc} = t.{c}" for c, pc in zip(columns, parent_columns))
+    not_null = " AND ".join(f"t.{c} IS NOT NULL" for c in columns)
+    cursor.execute(f"DELETE FROM {table} t WHERE {not_null} AND NOT EXISTS (SELECT 1 FROM {parent} p WHERE {matches})")
+    return cursor.rowcount
+
+
+def load_csv_by_partition(cursor, path: Path, table: str, columns: str, logger=None,
+                          reject_log: Optional[RejectLog] = None) -> Dict[date, int]:
+    """
+    Load a CSV file (with header) into a monthly range-partitioned table: rows are routed
+    by month into standalone load tables, which are then swapped in as that month's
+    partition (missing partitions are created this way). Returns rows loaded per month.
+    With a reject_log, rows are copied in savepoint-protected chunks and rows that fail
+    (including rows without a valid partition key) are rejected instead of failing the load.
+    """
+    key = partition_key(cursor, table)
+    if key is None:
+        raise ValueError(f"{table} is not range-partitioned")
+    column_list = [c.strip() for c in columns.split(',')]
+    key_index = column_list.index(key)
+    binary = use_binary_copy(table)
+
+    buffers = {}
+    with open(path, 'r', newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        for row in reader:
+            try:
+                if not row[key_index]:
+                    raise ValueError(f"Row without {key} in {path.name}: {row}")
+                month = month_start(row[key_index])
+            except (ValueError, IndexError) as e:
+                if reject_log is None:
+                    raise
+                reject_log.add(reader.line_num, row, str(e))
+                continue
+            buffer = buffers.get(month)
+            if buffer is None:
+                load_table = f"{partition_name(table, month)}_load"
+                cursor.execute(f"DROP TABLE IF EXISTS {load_table}")
+                # ATTACH PARTITION requires the parent's check constraints on the load table
+                cursor.execute(f"CREATE TABLE {load_table} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS"
+                               f"{' INCLUDING INDEXES' if reject_log is not None else ''})")
+                if reject_log is not None:
+                    # With the parent's keys and foreign keys, duplicates and orphans are bisected
+                    # out during COPY instead of failing ATTACH (which then adopts the indexes)
+                    copy_foreign_keys(cursor, table, load_table)
+                    buffer = ResilientCopyBuffer(cursor, load_table, column_list, reject_log, binary)
+                else:
+                    buffer = open_copy_buffer(cursor, load_table, column_list, binary, PARTITION_BUFFER_BYTES)
+                buffers[month] = buffer
+            if reject_log is not None:
+                buffer.write(row, reader.line_num)
+            else:
+                buffer.write(row)
+            if buffer.is_full():
+                buffer.flush(cursor)
+
+    for buffer in buffers.values():
+        buffer.flush(cursor)
+    return attach_load_tables(cursor, table, {month: (buffer.table, buffer.rows_copied)
+                                              for month, buffer in buffers.items()}, logger)
+
+
+def stage_csv_by_partition_parallel(path: Path, table: str, columns: str, workers: int,
+                                    connection: Callable[[], ContextManager[Any]],
+                                    logger=None) -> Dict[date, Tuple[str, int]]:
+    """
+    Parallel counterpart of the routing in load_csv_by_partition: `workers` connections each
+    read one line-aligned chunk of the CSV (see pg_copy.copy_csv_chunks_parallel) and COPY its
+    rows by month into per-month load tables shared by all workers. Each load table is created
+    (and committed) once, by the first worker that meets its month; every worker commits its
+    own rows. Returns {month: (load table, rows)} for attach_load_tables to swap in.
+    """
+    with connection() as conn:
+        key = partition_key(conn.cursor(), table)
+    if key is None:
+        raise ValueError(f"{table} is not range-partitioned")
+    column_list = [c.strip() for c in columns.split(',')]
+    key_index = column_list.index(key)
+    binary = use_binary_copy(table)
+    ranges = split_csv_offsets(path, workers)
+    load_tables: Dict[date, str] = {}
+    lock = threading.Lock()
+
+    def load_table_for(conn, cursor, month: date) -> str:
+        with lock:
+            if month not in load_tables:
+                load_table = f"{partition_name(table, month)}_load"
+                cursor.execute(f"DROP TABLE IF EXISTS {load_table}")
+                cursor.execute(f"CREATE TABLE {load_table} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+                # Other workers only see the table once it is committed
+                conn.commit()
+                load_tables[month] = load_table
+            return load_tables[month]
+
+    def stage_range(byte_range: Tuple[int, int]) -> Dict[date, int]:
+        buffers = {}
+        with connection() as conn:
+            cursor = conn.cursor()
+            with io.TextIOWrapper(io.BufferedReader(FileRange(path, *byte_range)),
+                                  encoding='utf-8', newline='') as f:
+                for row in csv.reader(f):
+                    if not row[key_index]:
+                        raise ValueError(f"Row without {key} in {path.name}: {row}")
+                    month = month_start(row[key_index])
+                    buffer = buffers.get(month)
+                    if buffer is None:
+                        buffer = open_copy_buffer(cursor, load_table_for(conn, cursor, month), column_list,
+                                                  binary, PARTITION_BUFFER_BYTES)
+                        buffers[month] = buffer
+                    buffer.write(row)
+                    if buffer.is_full():
+                        buffer.flush(cursor)
+            for buffer in buffers.values():
+                buffer.flush(cursor)
+            conn.commit()
+            cursor.close()
+        return {month: buffer.rows_copied for month, buffer in buffers.items()}
+
+    month_rows: Dict[date, int] = {}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for (start, end), rows in zip(ranges, executor.map(stage_range, ranges)):
+            for month, copied in rows.items():
+                month_rows[month] = month_rows.get(month, 0) + copied
+            if logger:
+                logger.info(f"Staged bytes {start}-{end} of {path.name} into {len(rows)} monthly "
+                            f"load tables of {table}: {sum(rows.values())} rows")
+    return {month: (load_tables[month], rows) for month, rows in month_rows.items()}
+
+
+def attach_load_tables(cursor, table: str, load_tables: Dict[date, Tuple[str, int]],
+                       logger=None) -> Dict[date, int]:
+    """
+    Swap loaded per-month tables ({month: (load table, rows)}) in as partitions of `table`.
+    Returns rows loaded per month. Runs in the caller's transaction.
+    """
+    key = partition_key(cursor, table)
+    for month, (load_table, rows) in sorted(load_tables.items()):
+        name = swap_in_partition(cursor, table, key, load_table, month)
+        if logger:
+            logger.info(f"Attached {rows} rows as partition {name}")
+    return {month: rows for month, (_, rows) in load_tables.items()}
+
+
+def drop_partitions_before(cursor, table: str, cutoff: date, logger=None) -> List[str]:
+    """Detach and drop every partition whose range ends on or before `cutoff`."""
+    dropped = []
+    for name, bounds in sorted(list_partitions(cursor, table).items()):
+        if bounds is not None and bounds[1] <= cutoff:
+            cursor.execute(f"ALTER TABLE {table} DETACH PARTITION {name}")
+            cursor.execute(f"DROP TABLE {name}")
+            dropped.append(name)
+    if logger and dropped:
+        logger.info(f"Dropped {len(dropped)} partitions of {table} before {cutoff}: {dropped}")
+    return dropped
@@ -0,0 +1,332 @@
+import csv
+import io
+import mmap
+import os
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Callable, ContextManager, Iterable, List, Optional, Sequence, Tuple, Union
+
+# Flush a COPY buffer once it holds roughly this many bytes of CSV text
+COPY_BUFFER_BYTES = int(os.getenv('COPY_BUFFER_BYTES', str(8 * 1024 * 1024)))
+
+# Read size used when streaming file chunks into COPY
+COPY_READ_SIZE = 1024 * 1024
+
+# Tables loaded with binary COPY: comma-separated names, or '*' for every table
+BINARY_COPY_TABLES = {t.strip() for t in os.getenv('BINARY_COPY_TABLES', '').split(',') if t.strip()}
+
+
+class CopyBuffer:
+    """
+    In-memory CSV buffer for a single table, drained into Postgres with COPY.
+    Best practice: Bounded memory; callers flush whenever is_full() is True.
+    """
+
+    def __init__(self, table: str, columns: Iterable[str], max_bytes: int = COPY_BUFFER_BYTES):
+        self.table = table
+        self.columns = list(columns)
+        self.max_bytes = max_bytes
+        self.rows_buffered = 0
+        self.rows_copied = 0
+        self.bytes_copied = 0
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer)
+
+    @property
+    def copy_sql(self) -> str:
+        return f"COPY {self.table} ({', '.join(self.columns)}) FROM STDIN WITH CSV"
+
+    def write(self, row: List[Any]) -> None:
+        self._writer.writerow(row)
+        self.rows_buffered += 1
+
+    def is_full(self) -> bool:
+        return self._buffer.tell() >= self.max_bytes
+
+    def flush(self, cursor) -> int:
+        """COPY the buffered rows into the table and reset the buffer. Returns rows copied."""
+        if not self.rows_buffered:
+            return 0
+        size = self._buffer.tell()
+        self._buffer.seek(0)
+        cursor.copy_expert(self.copy_sql, self._buffer)
+        copied = self.rows_buffered
+        self.rows_copied += copied
+        self.bytes_copied += size
+        self.rows_buffered = 0
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return copied
+
+
+def use_binary_copy(table: str) -> bool:
+    """Whether BINARY_COPY_TABLES selects binary COPY for `table`."""
+    return '*' in BINARY_COPY_TABLES or table in BINARY_COPY_TABLES
+
+
+# PGCOPY framing: signature, flags and header extension length; trailer is a -1 field count
+PGCOPY_HEADER = b'PGCOPY\n\xff\r\n\x00' + struct.pack('!ii', 0, 0)
+PGCOPY_TRAILER = struct.pack('!h', -1)
+
+PG_EPOCH_DATE = date(2000, 1, 1)
+PG_EPOCH = datetime(2000, 1, 1, tzinfo=timezone.utc)
+
+_INT = struct.Struct('!i')
+_FIELD_LENGTHS = {'smallint': '!h', 'integer': '!i', 'bigint': '!q', 'real': '!f', 'double precision': '!d'}
+
+
+def _encode_numeric(value: Any) -> bytes:
+    """Binary numeric: base-10000 digit groups with weight, sign and display scale."""
+    number = value if isinstance(value, Decimal) else Decimal(str(value))
+    if number.is_nan():
+        return struct.pack('!hhHH', 0, 0, 0xC000, 0)
+    sign, digits, exponent = number.as_tuple()
+    dscale = max(0, -exponent)
+    # Align the decimal point to a group boundary, then split into groups of four digits
+    pad = exponent % 4
+    digit_str = ''.join(map(str, digits)) + '0' * pad
+    exponent -= pad
+    digit_str = '0' * (-len(digit_str) % 4) + digit_str
+    groups = [int(digit_str[i:i + 4]) for i in range(0, len(digit_str), 4)]
+    weight = len(groups) - 1 + exponent // 4
+    while groups and groups[0] == 0:
+        groups.pop(0)
+        weight -= 1
+    while groups and groups[-1] == 0:
+        groups.pop()
+    if not groups:
+        weight = 0
+    return struct.pack(f'!hhHH{len(groups)}H', len(groups), weight, 0x4000 if sign else 0, dscale, *groups)
+
+
+def _encode_date(value: Any) -> bytes:
+    if not isinstance(value, date):
+        value = date.fromisoformat(str(value)[:10])
+    elif isinstance(value, datetime):
+        value = value.date()
+    return _INT.pack((value - PG_EPOCH_DATE).days)
+
+
+def _encode_timestamp(value: Any) -> bytes:
+    if not isinstance(value, datetime):
+        value = datetime.fromisoformat(str(value))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    delta = value - PG_EPOCH
+    return struct.pack('!q', (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds)
+
+
+def _field_encoder(pg_type: str) -> Callable[[Any], bytes]:
+    """Encoder turning a Python value (or its CSV text) into the binary form of pg_type."""
+    if pg_type in _FIELD_LENGTHS:
+        packer = struct.Struct(_FIELD_LENGTHS[pg_type])
+        if pg_type in ('real', 'double precision'):
+            return lambda value: packer.pack(float(value))
+        return lambda value: packer.pack(int(value))
+    if pg_type == 'numeric':
+        return _encode_numeric
+    if pg_type == 'date':
+        return _encode_date
+    if pg_type in ('timestamp with time zone', 'timestamp without time zone'):
+        return _encode_timestamp
+    if pg_type == 'boolean':
+        return lambda value: b'\x01' if str(value).lower() in ('true', 't', '1') else b'\x00'
+    if pg_type in ('text', 'character varying', 'character'):
+        return lambda value: str(value).encode('utf-8')
+    raise ValueError(f"Binary COPY does not support column type {pg_type!r}")
+
+
+def table_column_types(cursor, table: str, columns: Sequence[str]) -> List[str]:
+    """Base type name (e.g. 'integer', 'character varying') of each column, in order."""
+    cursor.execute(
+        """
+        SELECT a.attname, a.atttypid::regtype::text
+        FROM pg_attribute a
+        WHERE a.attrelid = %s::regclass AND a.attnum > 0 AND NOT a.attisdropped
+        """,
+        (table,)
+    )
+    types = dict(cursor.fetchall())
+    missing = [c for c in columns if c not in types]
+    if missing:
+        raise ValueError(f"Columns {missing} not found in {table}")
+    return [types[c] for c in columns]
+
+
+class BinaryCopyBuffer:
+    """
+    In-memory PGCOPY (binary COPY) buffer for a single table; drop-in for CopyBuffer.
+    Fields are encoded client-side from their column types, so the server skips text
+    parsing. None and '' are written as NULL, matching what CSV COPY does.
+    """
+
+    def __init__(self, table: str, columns: Iterable[str], types: Sequence[str],
+                 max_bytes: int = COPY_BUFFER_BYTES):
+        self.table = table
+        self.columns = list(columns)
+        self.max_bytes = max_bytes
+        self.rows_buffered = 0
+        self.rows_copied = 0
+        self.bytes_copied = 0
+        self._encoders = [_field_encoder(t) for t in types]
+        self._field_count = struct.pack('!h', len(self.columns))
+        self._buffer = io.BytesIO()
+
+    @property
+    def copy_sql(self) -> str:
+        return f"COPY {self.table} ({', '.join(self.columns)}) FROM STDIN WITH (FORMAT binary)"
+
+    def write(self, row: Sequence[Any]) -> None:
+        if not self.rows_buffered:
+            self._buffer.write(PGCOPY_HEADER)
+        parts = [self._field_count]
+        for encode, value in zip(self._encoders, row):
+            if value is None or value == '':
+                parts.append(b'\xff\xff\xff\xff')
+            else:
+                data = encode(value)
+                parts.append(_INT.pack(len(data)))
+                parts.append(data)
+        self._buffer.write(b''.join(parts))
+        self.rows_buffered += 1
+
+    def is_full(self) -> bool:
+        return self._buffer.tell() >= self.max_bytes
+
+    def flush(self, cursor) -> int:
+        """COPY the buffered rows into the table and reset the buffer. Returns rows copied."""
+        if not self.rows_buffered:
+            return 0
+        self._buffer.write(PGCOPY_TRAILER)
+        size = self._buffer.tell()
+        self._buffer.seek(0)
+        cursor.copy_expert(self.copy_sql, self._buffer)
+        copied = self.rows_buffered
+        self.rows_copied += copied
+        self.bytes_copied += size
+        self.rows_buffered = 0
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return copied
+
+
+def open_copy_buffer(cursor, table: str, columns: Iterable[str], binary: Optional[bool] = None,
+                     max_bytes: int = COPY_BUFFER_BYTES) -> Union[CopyBuffer, BinaryCopyBuffer]:
+    """
+    CopyBuffer or BinaryCopyBuffer for `table`, per BINARY_COPY_TABLES unless `binary`
+    is given. Binary buffers read the column types from the catalog, so the table must exist.
+    """
+    columns = list(columns)
+    if binary is None:
+        binary = use_binary_copy(table)
+    if binary:
+        return BinaryCopyBuffer(table, columns, table_column_types(cursor, table, columns), max_bytes)
+    return CopyBuffer(table, columns, max_bytes)
+
+
+def copy_csv_binary(cursor, path: Path, table: str, columns: str) -> int:
+    """
+    Load a CSV file (with header) into `table` with binary COPY, in COPY_BUFFER_BYTES
+    batches on the caller's cursor. Returns the number of rows copied.
+    """
+    column_list = [c.strip() for c in columns.split(',')]
+    buffer = open_copy_buffer(cursor, table, column_list, binary=True)
+    with open(path, 'r', newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        for row in reader:
+            buffer.write(row)
+            if buffer.is_full():
+                buffer.flush(cursor)
+    buffer.flush(cursor)
+    return buffer.rows_copied
+
+
+def split_csv_offsets(path: Path, chunks: int) -> List[Tuple[int, int]]:
+    """
+    Split a CSV file (with header) into at most `chunks` line-aligned byte ranges.
+    Boundaries are found by scanning a memory map for the next newline, so the
+    file is not read up front. Assumes no quoted field contains a newline.
+    """
+    size = path.stat().st_size
+    if size == 0:
+        return []
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        header_end = mm.find(b'\n') + 1
+        if header_end == 0 or header_end >= size:
+            return []
+        boundaries = [header_end]
+        step = (size - header_end) / chunks
+        for i in range(1, chunks):
+            newline = mm.find(b'\n', header_end + int(step * i))
+            boundary = size if newline == -1 else newline + 1
+            if boundary > boundaries[-1]:
+                boundaries.append(boundary)
+        if boundaries[-1] < size:
+            boundaries.append(size)
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+class FileRange(io.RawIOBase):
+    """Read-only file object over the byte range [start, end) of a file."""
+
+    def __init__(self, path: Path, start: int, end: int):
+        self._file = open(path, 'rb')
+        self._file.seek(start)
+        self._remaining = end - start
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        if self._remaining <= 0:
+            return b''
+        if size is None or size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._file.read(size)
+        self._remaining -= len(data)
+        return data
+
+    def readinto(self, buffer) -> int:
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def close(self) -> None:
+        self._file.close()
+        super().close()
+
+
+def copy_csv_chunks_parallel(path: Path, table: str, columns: str, workers: int,
+                             connection: Callable[[], ContextManager[Any]], logger=None) -> int:
+    """
+    COPY a CSV file (with header) into `table` using `workers` concurrent connections,
+    each streaming one line-aligned chunk. `connection` returns a context manager yielding
+    a connection (e.g. utils.db_connections.postgres_connection). Every worker commits its
+    own chunk, so the target should be a staging table. Returns the number of rows copied.
+    """
+    ranges = split_csv_offsets(path, workers)
+
+    def copy_range(byte_range: Tuple[int, int]) -> Tuple[int, float]:
+        start = time.perf_counter()
+        with connection() as conn:
+            cursor = conn.cursor()
+            with FileRange(path, *byte_range) as chunk:
+                cursor.copy_expert(f"COPY {table} ({columns}) FROM STDIN WITH CSV", chunk, size=COPY_READ_SIZE)
+            rows = cursor.rowcount
+            conn.commit()
+            cursor.close()
+        return rows, time.perf_counter() - start
+
+    total_rows = 0
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for (start, end), (rows, elapsed) in zip(ranges, executor.map(copy_range, ranges)):
+            total_rows += rows
+            if logger:
+                logger.info(f"Copied bytes {start}-{end} of {path.name} into {table}: "
+                            f"{rows} rows in {elapsed:.2f}s")
+    return total_rows
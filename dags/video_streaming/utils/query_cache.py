@@ -0,0 +1,248 @@
+import hashlib
+import json
+import os
+import pickle
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Optional, Sequence, Tuple
+
+from utils.db_connections import postgres_connection
+from utils.etl_state import get_data_versions
+
+# In-process LRU tier
+QUERY_CACHE_MAX_ENTRIES = int(os.getenv('QUERY_CACHE_MAX_ENTRIES', '256'))
+QUERY_CACHE_MAX_BYTES = int(os.getenv('QUERY_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+# Optional on-disk tier (disabled unless a directory is configured)
+QUERY_CACHE_DIR = os.getenv('QUERY_CACHE_DIR')
+QUERY_CACHE_DISK_MAX_BYTES = int(os.getenv('QUERY_CACHE_DISK_MAX_BYTES', str(1024 * 1024 * 1024)))
+# How long data versions are trusted before etl_data_versions is read again
+QUERY_CACHE_VERSION_TTL = float(os.getenv('QUERY_CACHE_VERSION_TTL', '60'))
+
+_SQL_COMMENT = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(query: Any) -> str:
+    """
+    Canonical text of a query: SQL with comments and redundant whitespace removed, or a
+    Mongo pipeline/filter as sorted-key JSON. Formatting changes then map to the same key.
+    """
+    if isinstance(query, str):
+        return _WHITESPACE.sub(' ', _SQL_COMMENT.sub(' ', query)).strip().rstrip(';')
+    return json.dumps(query, sort_keys=True, default=str)
+
+
+def cache_key(query: Any, params: Any, versions: Dict[str, int]) -> str:
+    """sha256 over the normalized query, its parameters and the data versions it depends on."""
+    material = json.dumps([normalize_query(query), params, sorted(versions.items())], sort_keys=True, default=str)
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+class QueryCache:
+    """
+    Two-tier cache for query results keyed by query text, parameters and data version.
+    Results are computed at most once per data version: a load bumps the version of what it
+    changed (utils.etl_state.bump_data_version), which retires every entry built on the old one.
+    Hits, misses and evictions are counted in `metrics`.
+    """
+
+    def __init__(self, max_entries: int = QUERY_CACHE_MAX_ENTRIES, max_bytes: int = QUERY_CACHE_MAX_BYTES,
+                 disk_dir: Optional[str] = QUERY_CACHE_DIR, disk_max_bytes: int = QUERY_CACHE_DISK_MAX_BYTES,
+                 version_ttl: float = QUERY_CACHE_VERSION_TTL,
+                 version_reader: Optional[Callable[[Sequence[str]], Dict[str, int]]] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.disk_max_bytes = disk_max_bytes
+        self.version_ttl = version_ttl
+        self._read_versions = version_reader or _read_postgres_versions
+        self._memory: "OrderedDict[str, Tuple[bytes, int]]" = OrderedDict()
+        self._memory_bytes = 0
+        self._versions: Dict[str, Tuple[int, float]] = {}
+        self._lock = threading.Lock()
+        self.metrics = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'memory_evictions': 0,
+            'disk_evictions': 0,
+            'version_reads': 0,
+        }
+        if self.disk_dir:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+
+    # Data versions
+
+    def versions(self, sources: Iterable[str]) -> Dict[str, int]:
+        """Data version of each source, re-read from the database at most every version_ttl seconds."""
+        sources = sorted(set(sources))
+        now = time.monotonic()
+        with self._lock:
+            stale = [s for s in sources if s not in self._versions or now - self._versions[s][1] >= self.version_ttl]
+        if stale:
+            fresh = self._read_versions(stale)
+            with self._lock:
+                self.metrics['version_reads'] += 1
+                for source, version in fresh.items():
+                    self._versions[source] = (version, now)
+        with self._lock:
+            return {source: self._versions[source][0] for source in sources}
+
+    def invalidate(self, sources: Iterable[str]) -> None:
+        """Forget the cached versions of `sources` so the next lookup sees a just-committed bump."""
+        with self._lock:
+            for source in sources:
+                self._versions.pop(source, None)
+
+    # Lookup
+
+    def get_or_compute(self, query: Any, params: Any, sources: Iterable[str], compute: Callable[[], Any]) -> Any:
+        """
+        Return the cached result for (query, params) at the current data version, computing it on a miss.
+        `sources` must name every source the query reads; with none, nothing would ever retire the entry.
+        """
+        sources = list(sources)
+        if not sources:
+            raise ValueError("A cached query needs at least one data version source")
+        key = cache_key(query, params, self.versions(sources))
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self.metrics['memory_hits'] += 1
+                return pickle.loads(entry[0])
+        payload = self._disk_get(key)
+        if payload is not None:
+            with self._lock:
+                self.metrics['disk_hits'] += 1
+            self._memory_put(key, payload)
+            return pickle.loads(payload)
+
+        with self._lock:
+            self.metrics['misses'] += 1
+        result = compute()
+        payload = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+        self._memory_put(key, payload)
+        self._disk_put(key, payload)
+        return result
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+            self._versions.clear()
+        if self.disk_dir:
+            for path in self.disk_dir.glob('*.pkl'):
+                path.unlink(missing_ok=True)
+
+    # Memory tier
+
+    def _memory_put(self, key: str, payload: bytes) -> None:
+        size = len(payload)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._memory:
+                self._memory_bytes -= self._memory.pop(key)[1]
+            self._memory[key] = (payload, size)
+            self._memory_bytes += size
+            while len(self._memory) > self.max_entries or self._memory_bytes > self.max_bytes:
+                _, (_, evicted) = self._memory.popitem(last=False)
+                self._memory_bytes -= evicted
+                self.metrics['memory_evictions'] += 1
+
+    # Disk tier (one pickle per entry; mtime doubles as the LRU clock)
+
+    def _disk_get(self, key: str) -> Optional[bytes]:
+        if not self.disk_dir:
+            return None
+        path = self.disk_dir / f"{key}.pkl"
+        try:
+            payload = path.read_bytes()
+        except FileNotFoundError:
+            return None
+        os.utime(path)
+        return payload
+
+    def _disk_put(self, key: str, payload: bytes) -> None:
+        if not self.disk_dir or len(payload) > self.disk_max_bytes:
+            return
+        path = self.disk_dir / f"{key}.pkl"
+        tmp_path = path.with_suffix(f".tmp{threading.get_ident()}")
+        tmp_path.write_bytes(payload)
+        os.replace(tmp_path, path)
+        self._disk_evict()
+
+    def _disk_evict(self) -> None:
+        entries = []
+        for path in self.disk_dir.glob('*.pkl'):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries, key=lambda e: e[0]):
+            if total <= self.disk_max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            with self._lock:
+                self.metrics['disk_evictions'] += 1
+
+
+def _read_postgres_versions(sources: Sequence[str]) -> Dict[str, int]:
+    with postgres_connection() as conn:
+        with conn.cursor() as cursor:
+            return get_data_versions(cursor, sources)
+
+
+_DEFAULT_CACHE: Optional[QueryCache] = None
+_DEFAULT_CACHE_LOCK = threading.Lock()
+
+
+def get_query_cache() -> QueryCache:
+    """Process-wide cache configured from the QUERY_CACHE_* environment variables."""
+    global _DEFAULT_CACHE
+    with _DEFAULT_CACHE_LOCK:
+        if _DEFAULT_CACHE is None:
+            _DEFAULT_CACHE = QueryCache()
+        return _DEFAULT_CACHE
+
+
+def invalidate_data_versions(*sources: str) -> None:
+    """
+    Make this process's cache re-read the data versions of `sources`. Loaders call it right
+    after committing bump_data_version, so reads in the same process (e.g. run_pipeline) see
+    the new data at once instead of after QUERY_CACHE_VERSION_TTL.
+    """
+    if _DEFAULT_CACHE is not None:
+        _DEFAULT_CACHE.invalidate(sources)
+
+
+def cached_sql(sql: str, sources: Iterable[str], params: Any = None,
+               cache: Optional[QueryCache] = None) -> list:
+    """
+    Rows of a read-only SQL query, served from the cache while the data versions of `sources`
+    (every table it reads, e.g. ('users', 'viewing_sessions')) are unchanged.
+    """
+    cache = cache or get_query_cache()
+
+    def run() -> list:
+        with postgres_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(sql, params)
+                return cursor.fetchall()
+
+    return cache.get_or_compute(sql, params, sources, run)
+
+
+def cached_aggregate(collection, pipeline: list, sources: Iterable[str],
+                     cache: Optional[QueryCache] = None) -> list:
+    """Documents of a Mongo aggregation, cached like cached_sql (e.g. sources=('mongo.movies',))."""
+    cache = cache or get_query_cache()
+    return cache.get_or_compute(pipeline, [collection.database.name, collection.name], sources,
+                                lambda: list(collection.aggregate(pipeline)))
@@ -0,0 +1,180 @@
+import csv
+import json
+import os
+import re
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Iterable, List, Optional, Tuple
+
+from utils.pg_copy import BinaryCopyBuffer, CopyBuffer, table_column_types, use_binary_copy
+
+# Load in savepoint-protected chunks and bisect failing chunks down to the offending rows
+RESILIENT_COPY = os.getenv('RESILIENT_COPY', 'false').lower() == 'true'
+RESILIENT_COPY_CHUNK_ROWS = int(os.getenv('RESILIENT_COPY_CHUNK_ROWS', '50000'))
+
+SAVEPOINT = "resilient_copy"
+
+# Postgres reports the failing input row of a COPY as "COPY <table>, line <n>..."
+_COPY_LINE = re.compile(r"COPY [^,]+, line (\d+)")
+
+
+def _error_message(error: Exception) -> str:
+    lines = str(error).strip().splitlines()
+    return lines[0] if lines else type(error).__name__
+
+
+def _failed_line(error: Exception) -> Optional[int]:
+    """1-based row of the COPY input that failed, when Postgres reported one."""
+    diag = getattr(error, 'diag', None)
+    context = getattr(diag, 'context', None) or ''
+    match = _COPY_LINE.search(context)
+    return int(match.group(1)) if match else None
+
+
+class RejectLog:
+    """
+    Rows a load rejected, appended to a temporary file as they are found (source line number,
+    error, then the row) and recorded in etl_quarantine. The file is only moved to
+    reject_dir/<table>_rejects_<timestamp>.csv by publish(), once the load has committed, so a
+    rolled-back load leaves no reject file behind.
+    """
+
+    def __init__(self, table: str, source_path: Path, columns: Iterable[str], reject_dir: Path):
+        self.table = table
+        self.source_path = source_path
+        self.columns = list(columns)
+        self.path = reject_dir / f"{table}_rejects_{datetime.now():%Y%m%dT%H%M%S}.csv"
+        self._tmp_path = self.path.with_name(self.path.name + ".tmp")
+        self.rejects: List[Tuple[Optional[int], List[Any], str]] = []
+        self._reject_dir = reject_dir
+
+    def add(self, line_number: Optional[int], row: List[Any], error: str) -> None:
+        new_file = not self.rejects
+        if new_file:
+            self._reject_dir.mkdir(parents=True, exist_ok=True)
+        with open(self._tmp_path, 'a', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            if new_file:
+                writer.writerow(['line_number', 'error', *self.columns])
+            writer.writerow([line_number, error, *row])
+        self.rejects.append((line_number, row, error))
+
+    def publish(self) -> None:
+        """Move the reject file into place. Call after the transaction holding the rejects committed."""
+        if self.rejects:
+            os.replace(self._tmp_path, self.path)
+
+    def discard(self) -> None:
+        """Drop the reject file of a load that rolled back."""
+        self._tmp_path.unlink(missing_ok=True)
+
+    def record(self, cursor) -> None:
+        """Insert the rejects into etl_quarantine. Runs in the caller's transaction."""
+        if not self.rejects:
+            return
+        cursor.executemany(
+            """
+            INSERT INTO etl_quarantine (table_name, source_path, line_number, row_data, reasons)
+            VALUES (%s, %s, %s, %s, %s)
+            """,
+            [(self.table, str(self.source_path), line_number, json.dumps(dict(zip(self.columns, row))), error)
+             for line_number, row, error in self.rejects]
+        )
+
+
+class ResilientCopyBuffer:
+    """
+    Drop-in for CopyBuffer/BinaryCopyBuffer that holds up to chunk_rows rows and COPies
+    them under a savepoint. A failing chunk is rolled back to the savepoint and split:
+    at the row Postgres reported when there is one, in halves otherwise, until every
+    row either loads or is rejected on its own into the RejectLog.
+    """
+
+    def __init__(self, cursor, table: str, columns: Iterable[str], reject_log: RejectLog,
+                 binary: Optional[bool] = None, chunk_rows: int = RESILIENT_COPY_CHUNK_ROWS):
+        self.table = table
+        self.columns = list(columns)
+        self.reject_log = reject_log
+        self.chunk_rows = chunk_rows
+        self.binary = use_binary_copy(table) if binary is None else binary
+        self._types = table_column_types(cursor, table, self.columns) if self.binary else None
+        self.rows_copied = 0
+        self.rows_rejected = 0
+        self.attempts = 0
+        self._rows: List[Tuple[Optional[int], List[Any]]] = []
+
+    @property
+    def rows_buffered(self) -> int:
+        return len(self._rows)
+
+    def write(self, row: List[Any], line_number: Optional[int] = None) -> None:
+        self._rows.append((line_number, row))
+
+    def is_full(self) -> bool:
+        return len(self._rows) >= self.chunk_rows
+
+    def flush(self, cursor) -> int:
+        """COPY the buffered rows, rejecting the ones that fail. Returns rows copied."""
+        rows, self._rows = self._rows, []
+        copied = self._load(cursor, rows)
+        self.rows_copied += copied
+        return copied
+
+    def _copy(self, cursor, rows: List[Tuple[Optional[int], List[Any]]]) -> None:
+        if self.binary:
+            buffer = BinaryCopyBuffer(self.table, self.columns, self._types, max_bytes=0)
+        else:
+            buffer = CopyBuffer(self.table, self.columns, max_bytes=0)
+        for _, row in rows:
+            buffer.write(row)
+        buffer.flush(cursor)
+
+    def _load(self, cursor, rows: List[Tuple[Optional[int], List[Any]]]) -> int:
+        if not rows:
+            return 0
+        self.attempts += 1
+        cursor.execute(f"SAVEPOINT {SAVEPOINT}")
+        try:
+            self._copy(cursor, rows)
+        except Exception as e:
+            # Anything but a data error (e.g. a lost connection) fails the rollback and propagates
+            cursor.execute(f"ROLLBACK TO SAVEPOINT {SAVEPOINT}")
+            cursor.execute(f"RELEASE SAVEPOINT {SAVEPOINT}")
+            if len(rows) == 1:
+                line_number, row = rows[0]
+                self.reject_log.add(line_number, row, _error_message(e))
+                self.rows_rejected += 1
+                return 0
+            failed = _failed_line(e)
+            if failed is not None and 1 <= failed <= len(rows):
+                # Rows before the reported one loaded fine; retry them, the row alone, and the rest
+                return (self._load(cursor, rows[:failed - 1]) + self._load(cursor, rows[failed - 1:failed])
+                        + self._load(cursor, rows[failed:]))
+            middle = len(rows) // 2
+            return self._load(cursor, rows[:middle]) + self._load(cursor, rows[middle:])
+        cursor.execute(f"RELEASE SAVEPOINT {SAVEPOINT}")
+        return len(rows)
+
+
+def copy_csv_resilient(cursor, path: Path, table: str, columns: str, reject_log: RejectLog,
+                       binary: Optional[bool] = None, chunk_rows: int = RESILIENT_COPY_CHUNK_ROWS,
+                       logger=None) -> int:
+    """
+    Load a CSV file (with header) into `table` in savepoint-protected chunks on the caller's
+    cursor; rows Postgres refuses go to `reject_log` and everything else stays loaded.
+    Must run inside a transaction. Returns the number of rows copied.
+    """
+    column_list = [c.strip() for c in columns.split(',')]
+    buffer = ResilientCopyBuffer(cursor, table, column_list, reject_log, binary, chunk_rows)
+    with open(path, 'r', newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        for row in reader:
+            buffer.write(row, reader.line_num)
+            if buffer.is_full():
+                buffer.flush(cursor)
+    buffer.flush(cursor)
+    if logger and buffer.rows_rejected:
+        logger.warning(f"Rejected {buffer.rows_rejected} rows of {path.name} for {table} "
+                       f"({buffer.attempts} COPY attempts), see {reject_log.path}")
+    return buffer.rows_copied
@@ -0,0 +1,342 @@
+import json
+import os
+import time
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Tuple
+
+import numpy as np
+
+# Rows generated and written per batch; memory is bounded by this, not by the row count
+SYNTHETIC_CHUNK_ROWS = int(os.getenv('SYNTHETIC_CHUNK_ROWS', '1000000'))
+
+USER_COLUMNS = ['user_id', 'age', 'country', 'subscription_type', 'registration_date', 'total_watch_time_hours']
+SESSION_COLUMNS = ['session_id', 'user_id', 'content_id', 'watch_date', 'watch_duration_minutes',
+                   'completion_percentage', 'device_type', 'quality_level']
+
+# Category mixes, matching the shipped sample data and the original sessions export
+COUNTRIES = (['Mexico', 'Colombia', 'Argentina', 'Chile', 'Peru'], [0.30, 0.24, 0.21, 0.15, 0.10])
+SUBSCRIPTIONS = (['Basic', 'Standard', 'Premium'], [0.40, 0.36, 0.24])
+DEVICES = (['Smart TV', 'Mobile', 'Desktop', 'Tablet', 'Gaming Console'], [0.36, 0.31, 0.14, 0.14, 0.05])
+QUALITIES = ['SD', 'HD', '4K']
+# Quality mix per device (rows in DEVICES order) and the completion factor per quality
+QUALITY_BY_DEVICE = [
+    [0.15, 0.45, 0.40],
+    [0.45, 0.45, 0.10],
+    [0.20, 0.55, 0.25],
+    [0.35, 0.50, 0.15],
+    [0.10, 0.50, 0.40],
+]
+COMPLETION_BY_QUALITY = [0.80, 0.95, 1.0]
+GENRES = (['Action', 'Romance', 'Drama', 'Horror', 'Comedy', 'Documentary', 'Sci-Fi', 'Animation',
+           'Thriller', 'Crime', 'Reality'],
+          [78, 70, 66, 63, 60, 57, 56, 49, 39, 23, 18])
+TITLE_WORDS = (['Advanced', 'Neural', 'Lost', 'Ultimate', 'Binary', 'Digital', 'Hidden', 'Silent', 'Final',
+                'Dark', 'Golden', 'Broken', 'Endless', 'Secret', 'Last', 'The'],
+               ['World', 'Signal', 'Stream', 'Journey', 'Data', 'Mystery', 'Protocol', 'Code', 'Tale',
+                'Horizon', 'Empire', 'Frontier', 'Legacy', 'Shadow', 'Echo', 'Investigators'])
+
+# Skew: content popularity follows a Zipf-like curve, user activity a log-normal one
+CONTENT_POPULARITY_SKEW = 0.9
+USER_ACTIVITY_SIGMA = 1.0
+
+EPOCH = np.datetime64('1970-01-01', 'D')
+
+# Field bytes are NUL-padded; NUL never occurs in the data, so padding is dropped when rows are joined
+_PAD = 0
+
+
+def id_width(default: int, total: int) -> int:
+    """Digits for ids numbered 1..total: the sample data's width, widened when total needs it."""
+    return max(default, len(str(max(total, 1))))
+
+
+def id_field(prefix: str, numbers: np.ndarray, width: int) -> np.ndarray:
+    """Zero-padded ids such as 'U0001' as a (rows, bytes) uint8 field, built without a per-row loop."""
+    field = np.empty((len(numbers), len(prefix) + width), dtype=np.uint8)
+    field[:, :len(prefix)] = np.frombuffer(prefix.encode('ascii'), dtype=np.uint8)
+    field[:, len(prefix):] = (numbers[:, None] // 10 ** np.arange(width - 1, -1, -1, dtype=np.int64)) % 10 + ord('0')
+    return field
+
+
+def int_field(values: np.ndarray) -> np.ndarray:
+    """Non-negative integers in decimal, without leading zeros."""
+    values = np.asarray(values, dtype=np.int64)
+    width = len(str(int(values.max()))) if len(values) else 1
+    digits = (values[:, None] // 10 ** np.arange(width - 1, -1, -1, dtype=np.int64)) % 10
+    field = (digits + ord('0')).astype(np.uint8)
+    leading = np.cumsum(digits != 0, axis=1) == 0
+    leading[:, -1] = False
+    field[leading] = _PAD
+    return field
+
+
+def decimal_field(values: np.ndarray) -> np.ndarray:
+    """Non-negative numbers with one decimal place ('86.1')."""
+    tenths = np.rint(np.asarray(values) * 10).astype(np.int64)
+    point = np.full((len(tenths), 1), ord('.'), dtype=np.uint8)
+    return np.hstack([int_field(tenths // 10), point, int_field(tenths % 10)])
+
+
+def date_field(days: np.ndarray) -> np.ndarray:
+    """ISO dates for days since 1970-01-01."""
+    dates = (EPOCH + days.astype('timedelta64[D]')).astype('S10')
+    return dates.view(np.uint8).reshape(len(days), 10)
+
+
+def label_field(labels, index: np.ndarray) -> np.ndarray:
+    """Category labels picked by index."""
+    encoded = np.array([label.encode('utf-8') for label in labels])
+    return encoded[index].view(np.uint8).reshape(len(index), encoded.itemsize)
+
+
+def csv_rows(fields: List[np.ndarray]) -> bytes:
+    """Join per-column fields into CSV rows (values must not need quoting)."""
+    rows = len(fields[0])
+    parts = []
+    for i, field in enumerate(fields):
+        parts.append(field)
+        parts.append(np.full((rows, 1), ord(',') if i < len(fields) - 1 else ord('\n'), dtype=np.uint8))
+    matrix = np.hstack(parts)
+    return matrix[matrix != _PAD].tobytes()
+
+
+def _day(value: date) -> int:
+    return int((np.datetime64(value, 'D') - EPOCH).astype(int))
+
+
+def _sample(rng: np.random.Generator, cdf: np.ndarray, size: int) -> np.ndarray:
+    """Indices drawn from a cumulative distribution (O(log n) per draw, no per-call setup)."""
+    return np.minimum(np.searchsorted(cdf, rng.random(size), side='right'), len(cdf) - 1)
+
+
+def _cdf(weights) -> np.ndarray:
+    weights = np.asarray(weights, dtype=np.float64)
+    return np.cumsum(weights / weights.sum())
+
+
+def _titles(rng: np.random.Generator, size: int) -> np.ndarray:
+    first, second = (np.array(words) for words in TITLE_WORDS)
+    return np.char.add(np.char.add(first[rng.integers(0, len(first), size)], ' '),
+                       second[rng.integers(0, len(second), size)])
+
+
+def _genres(rng: np.random.Generator, size: int) -> List[List[str]]:
+    """1-3 distinct genres per title, weighted by genre popularity (Gumbel top-k, vectorized)."""
+    names, weights = np.array(GENRES[0]), np.asarray(GENRES[1], dtype=np.float64)
+    keys = np.log(weights) - np.log(-np.log(rng.random((size, len(names)))))
+    order = np.argsort(-keys, axis=1)[:, :3]
+    counts = rng.choice([1, 2, 3], size=size, p=[0.45, 0.40, 0.15])
+    picked = names[order]
+    return [row[:k].tolist() for row, k in zip(picked, counts)]
+
+
+class ContentCatalog:
+    """
+    Movies and series with their attributes as arrays (movies first, then series).
+    popularity_cdf drives which titles sessions pick, and views are drawn from the same
+    popularity, so the catalogue's view counts agree with the generated sessions.
+    """
+
+    def __init__(self, rng: np.random.Generator, movies: int, series: int, sessions: int,
+                 end: date, skew: float = CONTENT_POPULARITY_SKEW):
+        self.movies = movies
+        self.series = series
+        size = movies + series
+        # Movie and series ids share one field; the narrower kind is NUL-padded on the right
+        fields = [id_field('M', np.arange(1, movies + 1), id_width(3, movies)),
+                  id_field('S', np.arange(1, series + 1), id_width(3, series))]
+        self.content_id_field = np.zeros((size, max(field.shape[1] for field in fields)), dtype=np.uint8)
+        self.content_id_field[:movies, :fields[0].shape[1]] = fields[0]
+        self.content_id_field[movies:, :fields[1].shape[1]] = fields[1]
+        self.content_ids = self.content_id_field.view(f'S{self.content_id_field.shape[1]}').ravel().astype(str)
+        ranks = rng.permutation(size)
+        popularity = 1.0 / (ranks + 1.0) ** skew
+        self.popularity_cdf = _cdf(popularity)
+        self.views = rng.poisson(popularity / popularity.sum() * max(sessions, 1000 * size))
+        self.titles = _titles(rng, size)
+        self.genres = _genres(rng, size)
+        self.ratings = np.round(np.clip(rng.normal(3.0, 1.0, size), 1.0, 5.0), 1)
+        self.budgets = np.clip(rng.lognormal(np.log(6e7), 0.8, size), 1e6, 5e8).astype(np.int64)
+        self.duration_minutes = rng.integers(80, 181, movies)
+        self.release_years = rng.integers(max(2000, end.year - 10), end.year + 1, movies)
+        self.seasons = np.minimum(rng.geometric(0.3, series), 8)
+        self.episodes = rng.integers(6, 23, (series, 8))
+        self.avg_episode_duration = rng.integers(20, 61, series)
+        # Minutes of one full viewing: a movie, or one episode of a series
+        self.lengths = np.concatenate([self.duration_minutes, self.avg_episode_duration])
+        self.is_series = np.arange(size) >= movies
+
+    def movie_documents(self) -> Iterator[Dict[str, Any]]:
+        for i in range(self.movies):
+            yield {
+                'content_id': str(self.content_ids[i]),
+                'title': str(self.titles[i]),
+                'genre': self.genres[i],
+                'duration_minutes': int(self.duration_minutes[i]),
+                'release_year': int(self.release_years[i]),
+                'rating': float(self.ratings[i]),
+                'views_count': int(self.views[i]),
+                'production_budget': int(self.budgets[i]),
+            }
+
+    def series_documents(self) -> Iterator[Dict[str, Any]]:
+        for j in range(self.series):
+            i = self.movies + j
+            seasons = int(self.seasons[j])
+            yield {
+                'content_id': str(self.content_ids[i]),
+                'title': str(self.titles[i]),
+                'genre': self.genres[i],
+                'seasons': seasons,
+                'episodes_per_season': self.episodes[j, :seasons].tolist(),
+                'avg_episode_duration': int(self.avg_episode_duration[j]),
+                'rating': float(self.ratings[i]),
+                'total_views': int(self.views[i]),
+                'production_budget': int(self.budgets[i]),
+            }
+
+
+class UserBase:
+    """Per-user attributes as arrays; activity_cdf skews how many sessions each user has."""
+
+    def __init__(self, rng: np.random.Generator, users: int, start: date, end: date,
+                 sigma: float = USER_ACTIVITY_SIGMA):
+        self.size = users
+        ages = np.arange(18, 66)
+        age_weights = np.where((ages >= 25) & (ages <= 45), 3, np.where((ages >= 20) & (ages <= 50), 2, 1))
+        self.ages = ages[_sample(rng, _cdf(age_weights), users)]
+        self.countries = _sample(rng, _cdf(COUNTRIES[1]), users)
+        self.subscriptions = _sample(rng, _cdf(SUBSCRIPTIONS[1]), users)
+        # Everyone registers at least a month before the end of the window
+        start_day, end_day = _day(start), _day(end)
+        self.registration_days = rng.integers(start_day, max(start_day + 1, end_day - 30), users)
+        self.activity_cdf = _cdf(rng.lognormal(0.0, sigma, users))
+        self.watch_minutes = np.zeros(users, dtype=np.float64)
+
+    def csv_chunks(self, chunk_rows: int) -> Iterator[Tuple[int, bytes]]:
+        """(rows, CSV bytes) per chunk of users.csv, without the header."""
+        width = id_width(4, self.size)
+        for offset in range(0, self.size, chunk_rows):
+            part = slice(offset, min(offset + chunk_rows, self.size))
+            yield part.stop - part.start, csv_rows([
+                id_field('U', np.arange(part.start + 1, part.stop + 1), width),
+                int_field(self.ages[part]),
+                label_field(COUNTRIES[0], self.countries[part]),
+                label_field(SUBSCRIPTIONS[0], self.subscriptions[part]),
+                date_field(self.registration_days[part]),
+                decimal_field(self.watch_minutes[part] / 60.0),
+            ])
+
+
+def session_csv_chunks(rng: np.random.Generator, users: UserBase, catalog: ContentCatalog, sessions: int,
+                       end: date, chunk_rows: int) -> Iterator[Tuple[int, bytes]]:
+    """
+    (rows, CSV bytes) per chunk of chunk_rows viewing sessions. Users and titles are drawn from their skewed
+    distributions, every watch_date falls between the user's registration and `end`, and each
+    session's minutes are added to the user's total_watch_time_hours.
+    """
+    device_cdf = _cdf(DEVICES[1])
+    quality_cdf = np.cumsum(np.asarray(QUALITY_BY_DEVICE) / np.sum(QUALITY_BY_DEVICE, axis=1, keepdims=True), axis=1)
+    completion_factor = np.asarray(COMPLETION_BY_QUALITY)
+    session_width, user_width = id_width(6, sessions), id_width(4, users.size)
+    end_day = _day(end)
+    for offset in range(0, sessions, chunk_rows):
+        size = min(chunk_rows, sessions - offset)
+        user = _sample(rng, users.activity_cdf, size)
+        content = _sample(rng, catalog.popularity_cdf, size)
+        registered = users.registration_days[user]
+        watch_day = registered + (rng.random(size) * (end_day - registered + 1)).astype(np.int64)
+        device = _sample(rng, device_cdf, size)
+        quality = np.minimum((rng.random(size)[:, None] > quality_cdf[device]).sum(axis=1), len(QUALITIES) - 1)
+        completion = np.round(np.clip(rng.beta(2.5, 1.3, size) * 100 * completion_factor[quality], 0, 100), 1)
+        # A series session covers 1-3 episodes
+        episodes = np.where(catalog.is_series[content], rng.integers(1, 4, size), 1)
+        minutes = np.rint(catalog.lengths[content] * episodes * completion / 100).astype(np.int64)
+        users.watch_minutes += np.bincount(user, weights=minutes, minlength=users.size)
+        yield size, csv_rows([
+            id_field('S', np.arange(offset + 1, offset + size + 1), session_width),
+            id_field('U', user + 1, user_width),
+            catalog.content_id_field[content],
+            date_field(watch_day),
+            int_field(minutes),
+            decimal_field(completion),
+            label_field(DEVICES[0], device),
+            label_field(QUALITIES, quality),
+        ])
+
+
+def write_csv(path: Path, header: List[str], chunks: Iterator[Tuple[int, bytes]]) -> int:
+    """Stream encoded chunks into one CSV (written to a temporary file, then moved into place)."""
+    tmp_path = path.with_name(path.name + ".tmp")
+    rows = 0
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write((','.join(header) + '\n').encode('utf-8'))
+            for chunk_rows, data in chunks:
+                f.write(data)
+                rows += chunk_rows
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    os.replace(tmp_path, path)
+    return rows
+
+
+def write_content_json(path: Path, catalog: ContentCatalog) -> int:
+    """Write content.json ({"movies": [...], "series": [...]}) one document per line."""
+    tmp_path = path.with_name(path.name + ".tmp")
+    docs = 0
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for key, key_docs in (('movies', catalog.movie_documents()), ('series', catalog.series_documents())):
+                f.write(('{' if key == 'movies' else ',') + f'\n  "{key}": [')
+                for i, doc in enumerate(key_docs):
+                    f.write((',' if i else '') + '\n    ' + json.dumps(doc, ensure_ascii=False))
+                    docs += 1
+                f.write('\n  ]')
+            f.write('\n}\n')
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    os.replace(tmp_path, path)
+    return docs
+
+
+def generate_dataset(output_dir: Path, users: int = 5000, movies: int = 200, series: int = 100,
+                     sessions: int = 250000, seed: int = 42, start: date = date(2022, 1, 1),
+                     end: date = date(2024, 12, 31), chunk_rows: int = SYNTHETIC_CHUNK_ROWS,
+                     logger=None) -> Dict[str, Path]:
+    """
+    Write users.csv, viewing_sessions.csv and content.json to output_dir in the layout the
+    loaders expect. Output is reproducible for the same seed and chunk_rows. Sessions only
+    reference generated users and titles, so the files load with every constraint enabled.
+    Returns the written paths by file name.
+    """
+    if users < 1 or movies + series < 1:
+        raise ValueError("Need at least one user and one title to generate sessions")
+    output_dir.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    paths = {name: output_dir / name for name in ('content.json', 'viewing_sessions.csv', 'users.csv')}
+
+    start_time = time.perf_counter()
+    catalog = ContentCatalog(rng, movies, series, sessions, end)
+    docs = write_content_json(paths['content.json'], catalog)
+    if logger:
+        logger.info(f"Wrote {docs} titles to {paths['content.json']}")
+
+    # Sessions go first: they accumulate each user's total watch time
+    user_base = UserBase(rng, users, start, end)
+    session_start = time.perf_counter()
+    rows = write_csv(paths['viewing_sessions.csv'], SESSION_COLUMNS,
+                     session_csv_chunks(rng, user_base, catalog, sessions, end, chunk_rows))
+    if logger:
+        elapsed = time.perf_counter() - session_start
+        logger.info(f"Wrote {rows} sessions to {paths['viewing_sessions.csv']} in {elapsed:.2f}s "
+                    f"({rows / max(elapsed, 1e-9):,.0f} rows/sec)")
+
+    rows = write_csv(paths['users.csv'], USER_COLUMNS, user_base.csv_chunks(chunk_rows))
+    if logger:
+        logger.info(f"Wrote {rows} users to {paths['users.csv']}")
+        logger.info(f"Generated dataset in {time.perf_counter() - start_time:.2f}s (seed {seed})")
+    return paths
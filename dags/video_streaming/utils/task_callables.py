@@ -0,0 +1,30 @@
+import importlib
+import inspect
+from typing import Any, Callable
+
+
+def resolve_callable(target: str) -> Callable[..., Any]:
+    """Import `package.module:function` and return the function."""
+    module_name, _, function_name = target.partition(':')
+    if not function_name:
+        raise ValueError(f"Expected 'module:function', got {target!r}")
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def lazy_callable(target: str) -> Callable[..., Any]:
+    """
+    Callable for a PythonOperator that imports `module:function` only when the task runs, so
+    parsing the DAG file does not import the stage scripts and their database drivers.
+    Airflow passes the whole task context to a callable that takes **kwargs; only the
+    arguments the target accepts (its op_kwargs, and context entries such as `ti`) are forwarded.
+    """
+    def call(*args, **kwargs):
+        func = resolve_callable(target)
+        parameters = inspect.signature(func).parameters
+        if not any(p.kind == inspect.Parameter.VAR_KEYWORD for p in parameters.values()):
+            kwargs = {name: value for name, value in kwargs.items() if name in parameters}
+        return func(*args, **kwargs)
+
+    call.__name__ = call.__qualname__ = target.rpartition(':')[2]
+    call.__module__ = target.partition(':')[0]
+    return call
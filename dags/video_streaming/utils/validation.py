@@ -0,0 +1,405 @@
+import csv
+import io
+import json
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Optional, Set
+
+# pandas/numpy are imported when a file is validated, not when a loader imports this module
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+# Validate CSVs in bulk before loading and quarantine bad rows instead of failing the COPY
+VALIDATE_BEFORE_LOAD = os.getenv('VALIDATE_BEFORE_LOAD', 'false').lower() == 'true'
+VALIDATION_CHUNK_ROWS = int(os.getenv('VALIDATION_CHUNK_ROWS', '200000'))
+
+# Column rules per table, mirroring the types, NOT NULL, CHECK, primary and foreign keys of sql/create_*.sql
+# and sql/normalized_tables.sql.
+# Column keys: type (text|int|bigint|float|date), required, min, max, exclusive_min, max_length, allowed.
+TABLE_RULES: Dict[str, Dict[str, Any]] = {
+    'users': {
+        'columns': {
+            'user_id': {'type': 'text', 'required': True, 'max_length': 50},
+            'age': {'type': 'int', 'min': 0},
+            'country': {'type': 'text', 'max_length': 100},
+            'subscription_type': {'type': 'text', 'max_length': 50},
+            'registration_date': {'type': 'date'},
+            'total_watch_time_hours': {'type': 'float', 'min': 0},
+        },
+        'primary_key': ['user_id'],
+    },
+    'viewing_sessions': {
+        'columns': {
+            'session_id': {'type': 'text', 'required': True, 'max_length': 50},
+            'user_id': {'type': 'text', 'max_length': 50},
+            'content_id': {'type': 'text', 'max_length': 50},
+            'watch_date': {'type': 'date', 'required': True},
+            'watch_duration_minutes': {'type': 'int', 'min': 0},
+            'completion_percentage': {'type': 'float', 'min': 0, 'max': 100},
+            'device_type': {'type': 'text', 'max_length': 50},
+            'quality_level': {'type': 'text', 'max_length': 20},
+        },
+        'primary_key': ['session_id', 'watch_date'],
+        'foreign_keys': {'user_id': ('users', 'user_id')},
+    },
+    'content': {
+        'columns': {
+            'content_id': {'type': 'text', 'required': True, 'max_length': 50},
+            'title': {'type': 'text', 'required': True, 'max_length': 255},
+            'type': {'type': 'text', 'required': True, 'allowed': {'movie', 'series'}},
+            'rating': {'type': 'float', 'min': 0, 'max': 10},
+            'production_budget': {'type': 'float', 'min': -1e13, 'max': 1e13},
+        },
+        'primary_key': ['content_id'],
+    },
+    'movie_details': {
+        'columns': {
+            'content_id': {'type': 'text', 'required': True, 'max_length': 50},
+            'duration_minutes': {'type': 'int', 'exclusive_min': 0},
+            'release_year': {'type': 'int', 'min': 1888},
+            'views_count': {'type': 'bigint', 'min': 0},
+        },
+        'primary_key': ['content_id'],
+        'foreign_keys': {'content_id': ('content', 'content_id')},
+    },
+    'series_details': {
+        'columns': {
+            'content_id': {'type': 'text', 'required': True, 'max_length': 50},
+            'seasons': {'type': 'int', 'exclusive_min': 0},
+            'avg_episode_duration': {'type': 'int', 'exclusive_min': 0},
+            'total_views': {'type': 'bigint', 'min': 0},
+        },
+        'primary_key': ['content_id'],
+        'foreign_keys': {'content_id': ('content', 'content_id')},
+    },
+    'content_genres': {
+        'columns': {
+            'content_id': {'type': 'text', 'required': True, 'max_length': 50},
+            'genre': {'type': 'text', 'required': True, 'max_length': 50},
+        },
+        'primary_key': ['content_id', 'genre'],
+        'foreign_keys': {'content_id': ('content', 'content_id')},
+    },
+    'series_episodes': {
+        'columns': {
+            'content_id': {'type': 'text', 'required': True, 'max_length': 50},
+            'season': {'type': 'int', 'required': True, 'exclusive_min': 0},
+            'episode_count': {'type': 'int', 'exclusive_min': 0},
+        },
+        'primary_key': ['content_id', 'season'],
+        'foreign_keys': {'content_id': ('content', 'content_id')},
+    },
+}
+
+INTEGER_LIMITS = {'int': 2 ** 31 - 1, 'bigint': 2 ** 63 - 1}
+INTEGER_PATTERN = r'[+-]?\d+'
+
+
+class ValidationResult:
+    """
+    Outcome of validating one CSV: where the clean rows went and what was rejected.
+    Like RejectLog, rejected rows go to a temporary file: record() adds them to etl_quarantine
+    in the load's transaction and publish() moves the file to quarantine_path once that
+    transaction committed, so a rolled-back load leaves no quarantine behind.
+    """
+
+    def __init__(self, table: str, source_path: Path, clean_path: Path, quarantine_path: Path):
+        self.table = table
+        self.source_path = source_path
+        self.clean_path = clean_path
+        self.quarantine_path = quarantine_path
+        self._tmp_quarantine_path = quarantine_path.with_name(quarantine_path.name + ".tmp")
+        self.rows_ok = 0
+        self.rows_rejected = 0
+        self.reasons: Dict[str, int] = {}
+        self.keys: Dict[str, Set[str]] = {}  # Values of each single-column key in the clean rows
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-serializable form (without the keys), e.g. to hand the result to another Airflow task."""
+        return {
+            'table': self.table,
+            'source_path': str(self.source_path),
+            'clean_path': str(self.clean_path),
+            'quarantine_path': str(self.quarantine_path),
+            'rows_rejected': self.rows_rejected,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ValidationResult":
+        result = cls(data['table'], Path(data['source_path']), Path(data['clean_path']), Path(data['quarantine_path']))
+        result.rows_rejected = data['rows_rejected']
+        return result
+
+    def record(self, cursor) -> None:
+        """Insert the quarantined rows into etl_quarantine. Runs in the caller's transaction."""
+        if not self.rows_rejected:
+            return
+        import pandas as pd
+
+        for rejected in pd.read_csv(self._tmp_quarantine_path, dtype=str, keep_default_na=False,
+                                    chunksize=VALIDATION_CHUNK_ROWS):
+            record_quarantine(cursor, self.table, self.source_path, rejected, TABLE_RULES[self.table]['columns'])
+
+    def publish(self) -> None:
+        """Move the quarantine file into place. Call after the transaction holding record() committed."""
+        if self.rows_rejected:
+            os.replace(self._tmp_quarantine_path, self.quarantine_path)
+
+    def discard(self) -> None:
+        """Drop the quarantine file of a load that rolled back."""
+        self._tmp_quarantine_path.unlink(missing_ok=True)
+
+
+def _column_failures(values: "pd.Series", rule: Dict[str, Any]) -> Dict[str, "np.ndarray"]:
+    """Boolean failure masks per rule for one column of raw CSV strings."""
+    import pandas as pd
+
+    failures = {}
+    present = values != ''
+    if rule.get('required'):
+        failures['required'] = ~present.to_numpy()
+    kind = rule.get('type', 'text')
+    if kind in ('int', 'bigint', 'float'):
+        numbers = pd.to_numeric(values.where(present), errors='coerce')
+        invalid = present & numbers.isna()
+        if kind in INTEGER_LIMITS:
+            # COPY takes plain digits only ('1.0' and '1e3' fail); the range check compares the
+            # digit strings, which floats cannot do exactly near the bigint limit
+            limit = str(INTEGER_LIMITS[kind])
+            digits = values.str.lstrip('+-').str.lstrip('0')
+            too_large = (digits.str.len() > len(limit)) | ((digits.str.len() == len(limit)) & (digits > limit))
+            invalid = present & (~values.str.fullmatch(INTEGER_PATTERN) | too_large)
+        failures['type'] = invalid.to_numpy()
+        if 'min' in rule:
+            failures['min'] = (numbers < rule['min']).to_numpy()
+        if 'exclusive_min' in rule:
+            failures['min'] = (numbers <= rule['exclusive_min']).to_numpy()
+        if 'max' in rule:
+            failures['max'] = (numbers > rule['max']).to_numpy()
+    elif kind == 'date':
+        dates = pd.to_datetime(values.where(present), format='%Y-%m-%d', errors='coerce')
+        failures['type'] = (present & dates.isna()).to_numpy()
+    if 'max_length' in rule:
+        failures['length'] = (values.str.len() > rule['max_length']).to_numpy()
+    if 'allowed' in rule:
+        failures['allowed'] = (present & ~values.isin(rule['allowed'])).to_numpy()
+    return failures
+
+
+def _reason_strings(masks: Dict[str, "np.ndarray"], size: int) -> "np.ndarray":
+    """Join the names of the failed rules per row ('' for rows that passed)."""
+    import numpy as np
+
+    reasons = np.full(size, '', dtype=object)
+    for name, mask in masks.items():
+        if mask.any():
+            reasons[mask] = np.where(reasons[mask] == '', name, reasons[mask] + ';' + name)
+    return reasons
+
+
+def _key_tracker(cursor, table: str, primary_key: List[str]) -> Callable[["pd.Series", "np.ndarray"], "np.ndarray"]:
+    """
+    Primary-key duplicate detection across chunks. With a cursor the keys accepted so far live in
+    a temporary table (memory stays bounded by one chunk); without one they are kept in a set.
+    The returned function takes a chunk's keys and the rows that passed every other check, records
+    the new keys among those and returns the duplicate mask.
+    """
+    import numpy as np
+
+    if cursor is None:
+        seen: Set[Any] = set()
+
+        def track_in_memory(keys: "pd.Series", candidates: "np.ndarray") -> "np.ndarray":
+            duplicate = keys.duplicated().to_numpy() | keys.isin(seen).to_numpy()
+            seen.update(keys[candidates & ~duplicate])
+            return duplicate
+        return track_in_memory
+
+    key_table = f"validation_keys_{table}"
+    key_columns = ', '.join(primary_key)
+    cursor.execute(f"DROP TABLE IF EXISTS {key_table}, {key_table}_chunk")
+    cursor.execute(
+        f"CREATE TEMP TABLE {key_table} ({', '.join(f'{c} TEXT' for c in primary_key)}, position BIGINT, "
+        f"PRIMARY KEY ({key_columns})) ON COMMIT DROP"
+    )
+    cursor.execute(f"CREATE TEMP TABLE {key_table}_chunk (LIKE {key_table}) ON COMMIT DROP")
+
+    def track_in_database(keys: "pd.Series", candidates: "np.ndarray") -> "np.ndarray":
+        import pandas as pd
+
+        duplicate = keys.duplicated().to_numpy().copy()
+        positions = np.flatnonzero(candidates & ~duplicate)
+        if len(positions):
+            rows = pd.DataFrame(keys.iloc[positions].tolist(), columns=primary_key)
+            rows['position'] = positions
+            buffer = io.StringIO()
+            # Quoted, so an empty key stays '' instead of becoming NULL
+            rows.to_csv(buffer, index=False, header=False, quoting=csv.QUOTE_ALL)
+            buffer.seek(0)
+            cursor.execute(f"TRUNCATE {key_table}_chunk")
+            cursor.copy_expert(f"COPY {key_table}_chunk FROM STDIN WITH CSV", buffer)
+            cursor.execute(
+                f"INSERT INTO {key_table} SELECT * FROM {key_table}_chunk "
+                f"ON CONFLICT DO NOTHING RETURNING position"
+            )
+            inserted = np.array([row[0] for row in cursor.fetchall()], dtype=np.int64)
+            duplicate[np.setdiff1d(positions, inserted)] = True
+        return duplicate
+    return track_in_database
+
+
+def validate_csv(csv_path: Path, table: str, output_dir: Path, quarantine_dir: Path,
+                 reference_keys: Optional[Callable[[str, str], Set[str]]] = None,
+                 extra_checks: Optional[Callable[["pd.DataFrame"], Dict[str, "np.ndarray"]]] = None,
+                 cursor=None, logger=None, chunk_rows: int = VALIDATION_CHUNK_ROWS) -> ValidationResult:
+    """
+    Validate a CSV against TABLE_RULES[table] in pandas chunks. Passing rows are written to
+    output_dir/<file>, failing rows to a temporary quarantine file with a `reasons` column;
+    the caller records and publishes it with the load (see ValidationResult).
+    reference_keys(table, column) supplies the valid values for each foreign key;
+    extra_checks(chunk) may add table-specific failure masks (see series_checks).
+    Duplicate primary keys are found through a temporary table when a cursor is given.
+    """
+    import numpy as np
+    import pandas as pd
+
+    rules = TABLE_RULES[table]
+    columns = rules['columns']
+    primary_key = rules.get('primary_key', [])
+    foreign_keys = {
+        column: reference_keys(*reference) for column, reference in rules.get('foreign_keys', {}).items()
+    } if reference_keys else {}
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    quarantine_dir.mkdir(parents=True, exist_ok=True)
+    clean_path = output_dir / csv_path.name
+    quarantine_path = quarantine_dir / f"{table}_{datetime.now():%Y%m%dT%H%M%S}.csv"
+    result = ValidationResult(table, csv_path, clean_path, quarantine_path)
+    result.keys = {column: set() for column in columns if [column] == primary_key}
+    track_keys = _key_tracker(cursor, table, primary_key) if primary_key else None
+
+    start = time.perf_counter()
+    tmp_path = clean_path.with_name(clean_path.name + ".tmp")
+    reader = pd.read_csv(csv_path, dtype=str, keep_default_na=False, chunksize=chunk_rows)
+    first_line = 2  # line 1 is the header
+    try:
+        with open(tmp_path, 'w', newline='', encoding='utf-8') as clean_file:
+            header_written = False
+            for chunk in reader:
+                missing = [c for c in columns if c not in chunk.columns]
+                if missing:
+                    raise ValueError(f"{csv_path.name} is missing columns {missing}")
+                masks: Dict[str, np.ndarray] = {}
+                for column, rule in columns.items():
+                    for name, mask in _column_failures(chunk[column], rule).items():
+                        masks[f"{column}:{name}"] = mask
+                for column, valid in foreign_keys.items():
+                    values = chunk[column]
+                    masks[f"{column}:foreign_key"] = ((values != '') & ~values.isin(valid)).to_numpy()
+                if extra_checks:
+                    masks.update(extra_checks(chunk))
+                if track_keys:
+                    keys = pd.Series(list(zip(*(chunk[c] for c in primary_key))), index=chunk.index)
+                    masks['primary_key:duplicate'] = track_keys(keys, _reason_strings(masks, len(chunk)) == '')
+
+                reasons = _reason_strings(masks, len(chunk))
+                bad = reasons != ''
+                good_rows = chunk[~bad]
+                for column in result.keys:
+                    result.keys[column].update(good_rows[column])
+                good_rows.to_csv(clean_file, index=False, header=not header_written)
+                header_written = True
+                result.rows_ok += len(good_rows)
+
+                if bad.any():
+                    rejected = chunk[bad].copy()
+                    rejected['reasons'] = reasons[bad]
+                    rejected['line_number'] = np.flatnonzero(bad) + first_line
+                    rejected.to_csv(result._tmp_quarantine_path, mode='a', index=False,
+                                    header=result.rows_rejected == 0)
+                    result.rows_rejected += len(rejected)
+                    for row_reasons in rejected['reasons']:
+                        for reason in row_reasons.split(';'):
+                            result.reasons[reason] = result.reasons.get(reason, 0) + 1
+                first_line += len(chunk)
+            if not header_written:
+                # Empty input: keep a header so COPY ... CSV HEADER still works
+                clean_file.write(','.join(columns) + '\n')
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        result.discard()
+        raise
+    os.replace(tmp_path, clean_path)
+
+    if logger:
+        elapsed = time.perf_counter() - start
+        total = result.rows_ok + result.rows_rejected
+        logger.info(f"Validated {total} rows of {csv_path.name} in {elapsed:.2f}s "
+                    f"({total / max(elapsed, 1e-9):,.0f} rows/sec): {result.rows_rejected} quarantined"
+                    + (f" to {quarantine_path} {result.reasons}" if result.rows_rejected else ""))
+    return result
+
+
+def series_checks(table: str, episodes_path: Path,
+                  series_details_path: Optional[Path] = None) -> Optional[Callable[["pd.DataFrame"], Dict[str, "np.ndarray"]]]:
+    """
+    extra_checks for the season/episode consistency extract_mongo_to_csv only warns about:
+    a series_details row whose `seasons` differs from its number of series_episodes rows, and
+    a series_episodes row beyond its series' (validated) seasons or without series details.
+    episodes_path is the series_episodes CSV; series_details_path the clean series_details file.
+    """
+    import pandas as pd
+
+    if table == 'series_details':
+        episodes = pd.read_csv(episodes_path, dtype=str, keep_default_na=False, usecols=['content_id'])
+        episode_counts = episodes['content_id'].value_counts()
+
+        def seasons_match_episodes(chunk: "pd.DataFrame") -> Dict[str, "np.ndarray"]:
+            seasons = pd.to_numeric(chunk['seasons'], errors='coerce')
+            expected = chunk['content_id'].map(episode_counts).fillna(0)
+            return {'seasons:episodes_mismatch': (seasons.notna() & (seasons != expected)).to_numpy()}
+        return seasons_match_episodes
+
+    if table == 'series_episodes' and series_details_path is not None:
+        details = pd.read_csv(series_details_path, dtype=str, keep_default_na=False, usecols=['content_id', 'seasons'])
+        series_seasons = pd.to_numeric(details.set_index('content_id')['seasons'], errors='coerce')
+
+        def season_within_series(chunk: "pd.DataFrame") -> Dict[str, "np.ndarray"]:
+            season = pd.to_numeric(chunk['season'], errors='coerce')
+            limit = chunk['content_id'].map(series_seasons)
+            return {'season:seasons_mismatch': (limit.isna() | (season > limit)).to_numpy()}
+        return season_within_series
+    return None
+
+
+def reference_keys_from(cursor, results: Dict[str, ValidationResult]) -> Callable[[str, str], Set[str]]:
+    """
+    Foreign-key lookup for validate_csv: keys of tables validated in this run come from their
+    results, anything else is read from the database (the referenced table is not being reloaded).
+    """
+    def lookup(table: str, column: str) -> Set[str]:
+        result = results.get(table)
+        if result is not None and column in result.keys:
+            return result.keys[column]
+        cursor.execute(f"SELECT {column} FROM {table}")
+        return {row[0] for row in cursor.fetchall()}
+    return lookup
+
+
+def record_quarantine(cursor, table: str, csv_path: Path, rejected: "pd.DataFrame", columns: Iterable[str]) -> None:
+    """Insert rejected rows (with their reasons) into etl_quarantine. Runs in the caller's transaction."""
+    columns = list(columns)
+    records = [
+        (table, str(csv_path), int(line), json.dumps(dict(zip(columns, values))), reasons)
+        for line, reasons, *values in rejected[['line_number', 'reasons', *columns]].itertuples(index=False)
+    ]
+    cursor.executemany(
+        """
+        INSERT INTO etl_quarantine (table_name, source_path, line_number, row_data, reasons)
+        VALUES (%s, %s, %s, %s, %s)
+        """,
+        records
+    )